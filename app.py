@@ -1,25 +1,133 @@
 # --- Importación de librerías necesarias ---
 # Flask y extensiones para creación de servidor web, seguridad y manejo de sesiones
-from flask import Flask, jsonify, request, render_template, redirect, url_for, session, send_from_directory, Response
+from flask import Flask, jsonify, request, render_template, redirect, url_for, session, send_from_directory, Response, g, has_request_context, copy_current_request_context, make_response
+import click  # Comandos de línea de órdenes de Flask (migraciones, mantenimiento)
 from flask_cors import CORS  # Para permitir peticiones desde otros dominios (CORS)
 from flask_bcrypt import Bcrypt  # Para encriptar contraseñas
+import flask_bcrypt
 # Conexión a base de datos MySQL
 import mysql.connector
+from mysql.connector import errorcode
 # Utilidades del sistema y manejo de fechas
 import secrets
-from datetime import datetime, timedelta
+import base64
+import hashlib
+from datetime import date, datetime, timedelta, timezone
 import io
 import csv
 import os
 import random
 import string
+import threading
+import time
+import atexit
+import multiprocessing
+import array
+import collections
+import functools
+import itertools
+import json
+import logging
+import re
+import decimal
+import gzip
+import heapq
+import bisect
+import html
+import unicodedata
+import mimetypes
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from werkzeug.utils import secure_filename  # Asegura nombres de archivos válidos al subir
+from flask.json.provider import DefaultJSONProvider
+try:
+    import orjson  # Serializador JSON en C; opcional, sin él se usa el módulo json estándar
+except ImportError:
+    orjson = None
+try:
+    import brotli  # Compresión brotli de las respuestas; opcional, sin él solo se usa gzip
+except ImportError:
+    brotli = None
+try:
+    from gevent import monkey as gevent_monkey  # Solo para saber si /api/stream corre sobre corrutinas
+except ImportError:
+    gevent_monkey = None
 
 # --- Configuración de la aplicación Flask ---
 app = Flask(__name__)  # Crea la instancia principal de la aplicación web
 
+# --- Serialización JSON de las respuestas ---
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson' if orjson else 'json')  # 'orjson' o 'json'
+
+HTTP_DATE_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+HTTP_DATE_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def _http_date(value):
+    """Igual que werkzeug.http.http_date (las fechas sin zona se toman como UTC), sin pasar por email.utils."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        clock = f'{value.hour:02d}:{value.minute:02d}:{value.second:02d}'
+    else:
+        clock = '00:00:00'
+    return (f'{HTTP_DATE_WEEKDAYS[value.weekday()]}, {value.day:02d} '
+            f'{HTTP_DATE_MONTHS[value.month - 1]} {value.year:04d} {clock} GMT')
+
+def _json_default(value):
+    """Tipos que devuelve MySQL y que JSON no conoce; mismo formato que el proveedor por defecto de Flask."""
+    if isinstance(value, date):  # incluye datetime
+        return _http_date(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, timedelta):
+        return str(value)
+    return DefaultJSONProvider.default(value)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de la aplicación: con orjson serializa directamente a bytes las filas de MySQL
+    (fechas, Decimal, timedelta) sin pasar por el codificador de Python; sin orjson, o con
+    JSON_BACKEND=json, se comporta como el proveedor estándar de Flask.
+    """
+    default = staticmethod(_json_default)
+
+    def __init__(self, app, backend=JSON_BACKEND):
+        super().__init__(app)
+        self.use_orjson = backend == 'orjson' and orjson is not None
+
+    def _orjson_options(self, indent=False):
+        # Las fechas pasan por `default` para conservar el formato HTTP que espera el frontend
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=_json_default, option=self._orjson_options()).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_json_default, option=self._orjson_options(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+app.json_provider_class = FastJSONProvider
+app.json = FastJSONProvider(app)
+
 # --- Inicialización de extensiones ---
-bcrypt = Bcrypt(app)  # Inicializa bcrypt para hashing de contraseñas
+bcrypt = Bcrypt(app)  # Inicializa bcrypt para hashing de contraseñas (el cálculo lo hace password_hasher)
 app.secret_key = secrets.token_hex(16)  # Genera una clave secreta aleatoria para manejar sesiones de usuario
 
 # --- Configuración del directorio para cargas de archivos ---
@@ -57,6 +165,89 @@ def add_security_headers(response):
     response.headers['X-XSS-Protection'] = '1; mode=block'
     return response
 
+# --- Compresión de respuestas (gzip / brotli) ---
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # Bytes; por debajo no compensa
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))  # Nivel gzip de las respuestas dinámicas
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))  # Calidad brotli de las respuestas dinámicas
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'text/javascript', 'text/html',
+    'text/css', 'text/plain', 'text/csv', 'image/svg+xml',
+}
+
+def _negotiate_encoding(encodings):
+    """Primera codificación de `encodings` (por orden de preferencia) que acepta el cliente, o None."""
+    for encoding in encodings:
+        if request.accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+@app.after_request
+def compress_response(response):
+    """
+    Comprime con brotli o gzip las respuestas de texto (JSON, HTML, CSV...) a partir de
+    COMPRESSION_MIN_SIZE bytes. Los archivos enviados con send_file y las respuestas en streaming
+    se envían tal cual; los estáticos con huella ya se sirven precomprimidos.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding(('br', 'gzip') if brotli else ('gzip',))
+    if encoding is None:
+        return response
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=COMPRESSION_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = encoding
+    # El cuerpo comprimido no es idéntico byte a byte: el ETag pasa a ser débil
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+# --- Estáticos con huella y precomprimidos (flask build-static) ---
+STATIC_DIST_FOLDER = os.path.join(app.static_folder, 'dist')
+STATIC_MANIFEST_PATH = os.path.join(STATIC_DIST_FOLDER, 'manifest.json')
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+def _load_static_manifest():
+    """Lee el manifiesto {archivo original: dist/archivo con huella}; vacío si no se ha ejecutado build-static."""
+    try:
+        with open(STATIC_MANIFEST_PATH, encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+static_manifest = _load_static_manifest()
+
+@app.url_defaults
+def use_fingerprinted_static(endpoint, values):
+    """url_for('static', filename='script.js') apunta a la copia con huella si existe."""
+    if endpoint == 'static' and values.get('filename') in static_manifest:
+        values['filename'] = static_manifest[values['filename']]
+
+@app.route('/static/dist/<path:filename>')
+def fingerprinted_static(filename):
+    """Sirve los estáticos con huella, precomprimidos si el cliente lo acepta, con caché de un año."""
+    served = filename
+    encoding = _negotiate_encoding(('br', 'gzip'))
+    if encoding and os.path.isfile(os.path.join(STATIC_DIST_FOLDER, filename + PRECOMPRESSED_SUFFIXES[encoding])):
+        served = filename + PRECOMPRESSED_SUFFIXES[encoding]
+    else:
+        encoding = None
+    response = send_from_directory(STATIC_DIST_FOLDER, served, mimetype=mimetypes.guess_type(filename)[0])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # El nombre cambia con el contenido: el navegador no necesita revalidar nunca
+    response.headers['Cache-Control'] = f'public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
 # --- Constantes del sistema para actividad reciente ---
 RECENT_ACTIVITY_DAYS_LIMIT = 1
 RECENT_ACTIVITY_ITEMS_LIMIT = 15
@@ -69,11 +260,1447 @@ db_config = {
     'database': 'project_hub' #ejempplo de base de datos
 }
 
+# --- Configuración del pool de conexiones ---
+# Los valores se pueden ajustar con variables de entorno sin tocar el código.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))  # Conexiones que se mantienen abiertas en reposo
+DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))  # Conexiones extra permitidas en picos
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))  # Segundos máximos de espera por una conexión
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 3600))  # Vida máxima de una conexión en segundos
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'  # Verificar la conexión al prestarla
+
 # --- Función utilitaria para obtener una conexión a la base de datos ---
 def get_db_connection():
-    """Devuelve una conexión activa a la base de datos MySQL usando los parámetros configurados."""
+    """Devuelve una conexión física nueva a la base de datos MySQL usando los parámetros configurados."""
     return mysql.connector.connect(**db_config)
 
+class PoolTimeoutError(mysql.connector.errors.PoolError):
+    """Se lanza cuando no se obtiene una conexión del pool dentro del tiempo de espera."""
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL reutilizables y seguro entre hilos.
+    - Mantiene hasta `size` conexiones en reposo y permite `max_overflow` adicionales en picos.
+    - Verifica cada conexión al prestarla (pre-ping) y recicla las que superan `recycle` segundos.
+    - Lleva contadores de ocupación y tiempo de espera consultables con `stats()`.
+    """
+
+    def __init__(self, factory, size=10, max_overflow=10, timeout=30, recycle=3600, pre_ping=True):
+        self._factory = factory
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._idle = collections.deque()  # Pares (conexión, momento de creación)
+        self._created_at = {}  # id(conexión) -> momento de creación
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._open = 0  # Conexiones físicas abiertas (en uso + en reposo)
+        self._in_use = 0
+        self._counters = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'ping_failures': 0,
+            'peak_in_use': 0,
+        }
+
+    def _discard(self, conn):
+        """Cierra una conexión física ignorando errores (ya no se va a reutilizar)."""
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _connect(self):
+        conn = self._factory()
+        with self._lock:
+            self._created_at[id(conn)] = time.monotonic()
+            self._counters['connections_created'] += 1
+        return conn
+
+    def _is_usable(self, conn, created_at):
+        """Decide si una conexión en reposo puede prestarse de nuevo."""
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._lock:
+                self._counters['connections_recycled'] += 1
+            return False
+        if self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                with self._lock:
+                    self._counters['ping_failures'] += 1
+                return False
+        return True
+
+    def acquire(self):
+        """Presta una conexión del pool, esperando como máximo `timeout` segundos."""
+        started = time.monotonic()
+        waited = False
+        with self._available:
+            while True:
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    conn, created_at = None, None
+                    self._open += 1  # Se reserva el hueco antes de conectar fuera del candado
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"No hay conexiones disponibles tras {self.timeout}s "
+                        f"(en uso: {self._in_use}, máximo: {self.size + self.max_overflow})"
+                    )
+                waited = True
+                self._available.wait(remaining)
+
+            self._in_use += 1
+            wait_seconds = time.monotonic() - started
+            self._counters['checkouts'] += 1
+            self._counters['peak_in_use'] = max(self._counters['peak_in_use'], self._in_use)
+            if waited:
+                self._counters['waits'] += 1
+                self._counters['wait_seconds_total'] += wait_seconds
+                self._counters['wait_seconds_max'] = max(self._counters['wait_seconds_max'], wait_seconds)
+
+        try:
+            if conn is not None and not self._is_usable(conn, created_at):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._available:
+                self._in_use -= 1
+                self._open -= 1
+                self._available.notify()
+            raise
+        return conn
+
+    def release(self, conn):
+        """Devuelve una conexión al pool dejando la sesión limpia para el siguiente uso."""
+        reusable = True
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            # Una transacción abierta (aunque sea solo de lectura) conservaría bloqueos
+            # o una instantánea antigua de los datos en la siguiente petición.
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            reusable = False
+
+        with self._available:
+            self._in_use -= 1
+            if reusable and len(self._idle) < self.size:
+                self._idle.append((conn, self._created_at.get(id(conn), time.monotonic())))
+            else:
+                self._open -= 1
+                reusable = False
+            self._available.notify()
+        if not reusable:
+            self._discard(conn)
+
+    def stats(self):
+        """Devuelve una instantánea de ocupación y contadores del pool."""
+        with self._lock:
+            snapshot = dict(self._counters)
+            snapshot.update({
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+            })
+        return snapshot
+
+db_pool = ConnectionPool(
+    get_db_connection,
+    size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_MAX_OVERFLOW,
+    timeout=DB_POOL_TIMEOUT,
+    recycle=DB_POOL_RECYCLE,
+    pre_ping=DB_POOL_PRE_PING,
+)
+
+@contextmanager
+def db_cursor(dictionary=False):
+    """
+    Presta una conexión del pool y un cursor sobre ella durante el bloque `with`.
+    Al salir cierra el cursor y devuelve la conexión al pool, haya error o no.
+    Uso: `with db_cursor(dictionary=True) as (conn, cursor): ...`
+    """
+    conn = db_pool.acquire()
+    cursor = None
+    try:
+        cursor = InstrumentedCursor(conn.cursor(dictionary=dictionary))
+        yield conn, cursor
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        db_pool.release(conn)
+
+# --- Instrumentación: registro de consultas lentas y detector de N+1 (opcional) ---
+SQL_TRACE_ENABLED = os.environ.get('SQL_TRACE', 'false').lower() == 'true'  # Activa el rastreo de sentencias
+SQL_TRACE_SLOW_MS = float(os.environ.get('SQL_TRACE_SLOW_MS', 200))  # Umbral de consulta lenta en milisegundos
+SQL_TRACE_BUFFER_SIZE = int(os.environ.get('SQL_TRACE_BUFFER_SIZE', 2000))  # Sentencias que conserva el búfer circular
+SQL_TRACE_FILE = os.environ.get('SQL_TRACE_FILE')  # Ruta opcional de un archivo JSONL donde volcar el rastreo
+SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))  # Repeticiones que se consideran N+1
+SQL_N_PLUS_ONE_WINDOW = float(os.environ.get('SQL_N_PLUS_ONE_WINDOW', 2.0))  # Ventana en segundos entre peticiones
+
+_SQL_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_SQL_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SQL_PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s')
+_SQL_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SQL_WHITESPACE_RE = re.compile(r'\s+')
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(statement):
+    """Reduce una sentencia a su forma canónica: sin literales, sin espacios extra y con listas IN colapsadas."""
+    normalized = _SQL_STRING_RE.sub('?', statement)
+    normalized = _SQL_PLACEHOLDER_RE.sub('?', normalized)
+    normalized = _SQL_NUMBER_RE.sub('?', normalized)
+    normalized = _SQL_IN_LIST_RE.sub('IN (...)', normalized)
+    return _SQL_WHITESPACE_RE.sub(' ', normalized).strip().rstrip(';')
+
+def _params_shape(params):
+    """Describe los parámetros por su tipo, sin guardar valores (pueden incluir contraseñas o tokens)."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+class SqlTracer:
+    """
+    Rastreo opcional de sentencias SQL.
+    - Guarda cada sentencia normalizada con duración y filas en un búfer circular en memoria.
+    - Avisa de las consultas que superan el umbral de lentitud.
+    - Detecta N+1: la misma sentencia repetida dentro de una petición o en ráfagas de peticiones del mismo usuario.
+    - Opcionalmente vuelca todo a un archivo JSONL.
+    """
+
+    def __init__(self, enabled, slow_ms, buffer_size, file_path, repeat_threshold, repeat_window):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.file_path = file_path
+        self.repeat_threshold = repeat_threshold
+        self.repeat_window = repeat_window
+        self.statements = collections.deque(maxlen=buffer_size)
+        self.findings = collections.deque(maxlen=max(buffer_size // 10, 100))
+        self._recent = {}  # (usuario, ruta, sentencia) -> deque de marcas de tiempo entre peticiones
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    def record(self, statement, params, elapsed, rowcount):
+        """Registra una sentencia ejecutada y devuelve la entrada para completar las filas al leerlas."""
+        entry = {
+            'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+            'sql': normalize_sql(statement),
+            'params_shape': _params_shape(params),
+            'duration_ms': round(elapsed * 1000, 3),
+            'rows': rowcount if rowcount is not None and rowcount >= 0 else None,
+        }
+        if has_request_context():
+            entry['route'] = request.url_rule.rule if request.url_rule else request.path
+            entry['method'] = request.method
+            entry['user_id'] = session.get('user_id')
+            g.setdefault('sql_trace', []).append(entry)
+        else:
+            self._store([entry])
+
+        if entry['duration_ms'] >= self.slow_ms:
+            app.logger.warning("Consulta lenta (%.1f ms) en %s: %s", entry['duration_ms'], entry.get('route', '-'), entry['sql'])
+            self._add_finding({'type': 'slow_query', 'timestamp': entry['timestamp'], 'route': entry.get('route'),
+                               'sql': entry['sql'], 'duration_ms': entry['duration_ms']})
+        return entry
+
+    def finish_request(self):
+        """Cierra el rastreo de la petición actual: guarda sus sentencias y busca patrones N+1."""
+        entries = g.pop('sql_trace', None)
+        if not entries:
+            return
+        self._store(entries)
+
+        route = entries[0].get('route')
+        user_id = entries[0].get('user_id')
+        repeated = collections.Counter(entry['sql'] for entry in entries)
+        now = time.monotonic()
+        for statement, count in repeated.items():
+            if count >= self.repeat_threshold:
+                self._add_finding({'type': 'n_plus_one', 'scope': 'request', 'timestamp': entries[0]['timestamp'],
+                                   'route': route, 'user_id': user_id, 'sql': statement, 'count': count})
+            self._track_across_requests(user_id, route, statement, now, entries[0]['timestamp'])
+
+    def _track_across_requests(self, user_id, route, statement, now, timestamp):
+        # Detecta clientes que piden lo mismo muchas veces seguidas (p. ej. un GET por cada tarea)
+        key = (user_id, route, statement)
+        with self._lock:
+            hits = self._recent.setdefault(key, collections.deque())
+            hits.append(now)
+            while hits and now - hits[0] > self.repeat_window:
+                hits.popleft()
+            flagged = len(hits) >= self.repeat_threshold
+            if flagged:
+                count = len(hits)
+                hits.clear()
+            if len(self._recent) > 10000:
+                self._recent = {k: v for k, v in self._recent.items() if v and now - v[-1] <= self.repeat_window}
+        if flagged:
+            self._add_finding({'type': 'n_plus_one', 'scope': 'client', 'timestamp': timestamp, 'route': route,
+                               'user_id': user_id, 'sql': statement, 'count': count,
+                               'window_seconds': self.repeat_window})
+
+    def _add_finding(self, finding):
+        with self._lock:
+            self.findings.append(finding)
+        if finding['type'] == 'n_plus_one':
+            app.logger.warning("Posible N+1 (%s) en %s: %d repeticiones de %s",
+                               finding['scope'], finding['route'], finding['count'], finding['sql'])
+        self._write([dict(finding, kind='finding')])
+
+    def _store(self, entries):
+        with self._lock:
+            self.statements.extend(entries)
+        self._write([dict(entry, kind='statement') for entry in entries])
+
+    def _write(self, records):
+        if not self.file_path:
+            return
+        try:
+            with self._file_lock, open(self.file_path, 'a', encoding='utf-8') as sink:
+                for record in records:
+                    sink.write(json.dumps(record, default=str, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"Warning: Could not write SQL trace to {self.file_path}: {e}")
+
+    def snapshot(self, slow_only=False, limit=None):
+        with self._lock:
+            statements = list(self.statements)
+            findings = list(self.findings)
+        if slow_only:
+            statements = [entry for entry in statements if entry['duration_ms'] >= self.slow_ms]
+        if limit:
+            statements = statements[-limit:]
+        return {
+            'enabled': self.enabled,
+            'slow_threshold_ms': self.slow_ms,
+            'n_plus_one_threshold': self.repeat_threshold,
+            'statements': statements,
+            'findings': findings,
+        }
+
+sql_tracer = SqlTracer(
+    SQL_TRACE_ENABLED,
+    slow_ms=SQL_TRACE_SLOW_MS,
+    buffer_size=SQL_TRACE_BUFFER_SIZE,
+    file_path=SQL_TRACE_FILE,
+    repeat_threshold=SQL_N_PLUS_ONE_THRESHOLD,
+    repeat_window=SQL_N_PLUS_ONE_WINDOW,
+)
+
+# --- Hashing de contraseñas en un pool de procesos ---
+# bcrypt ocupa la CPU entre 100 y 300 ms por llamada: en procesos aparte no retiene los hilos de las peticiones
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))  # 0 = en el hilo de la petición
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 64))  # Operaciones en cola o en curso
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # Segundos máximos por operación, cola incluida
+# Los procesos del pool no se crean con fork desde este proceso, que ya tiene hilos (uno de ellos podría tener
+# tomado un lock que el hijo heredaría cerrado): forkserver los crea desde un proceso limpio; spawn donde no existe
+PASSWORD_HASH_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+class PasswordHasherBusy(Exception):
+    """Se lanza cuando el pool de hashing tiene la cola llena o una operación agota el tiempo de espera."""
+
+class PasswordHasher:
+    """
+    Calcula y verifica hashes bcrypt en un pool de procesos.
+    - Admite como mucho `queue_limit` operaciones en cola o en curso; las demás se rechazan en el acto.
+    - Cada operación espera como mucho `timeout` segundos, contando la cola.
+    - Los procesos se crean con la primera operación, no al importar (los comandos CLI no los necesitan y,
+      con gunicorn --preload, el pool no debe crearse antes de que el maestro haga fork de los workers).
+      Se crean con PASSWORD_HASH_START_METHOD y se cierran al salir del proceso (`shutdown`).
+    - Lleva contadores de ocupación y tiempos consultables con `stats()`.
+    Con `workers=0` calcula en el propio hilo, sin límite de cola ni tiempo.
+    """
+
+    def __init__(self, workers, queue_limit, timeout, rounds):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.rounds = rounds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0  # Operaciones en cola o en curso
+        self._counters = {
+            'operations': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'failures': 0,
+            'seconds_total': 0.0,
+            'seconds_max': 0.0,
+            'peak_in_flight': 0,
+        }
+
+    def generate(self, password):
+        """Hash bcrypt de `password` como texto, con las rondas configuradas."""
+        return self._run(flask_bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def check(self, pw_hash, password):
+        """True si `password` corresponde a `pw_hash`. Lanza ValueError si `pw_hash` no es un hash bcrypt."""
+        return self._run(flask_bcrypt.check_password_hash, pw_hash, password)
+
+    def _run(self, func, *args):
+        with self._lock:
+            if self.workers and self._in_flight >= self.queue_limit:
+                self._counters['rejected'] += 1
+                raise PasswordHasherBusy('Demasiadas operaciones de contraseña en curso')
+            self._in_flight += 1
+            self._counters['operations'] += 1
+            self._counters['peak_in_flight'] = max(self._counters['peak_in_flight'], self._in_flight)
+            if self.workers and self._executor is None:
+                context = multiprocessing.get_context(PASSWORD_HASH_START_METHOD)
+                if PASSWORD_HASH_START_METHOD == 'forkserver':
+                    context.set_forkserver_preload(['flask_bcrypt'])  # Cada proceso nuevo arranca ya con bcrypt importado
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            executor = self._executor
+        started = time.perf_counter()
+        future = None
+        try:
+            if not self.workers:
+                return func(*args)
+            future = executor.submit(func, *args)
+            # La operación sigue ocupando el pool aunque se deje de esperar: se descuenta al terminar
+            future.add_done_callback(self._release)
+            try:
+                return future.result(timeout=self.timeout)
+            except FuturesTimeoutError:
+                future.cancel()  # Si aún no ha empezado, deja de ocupar la cola
+                with self._lock:
+                    self._counters['timeouts'] += 1
+                raise PasswordHasherBusy('La operación de contraseña agotó el tiempo de espera')
+        except BrokenProcessPool:
+            # Un proceso murió (p. ej. por falta de memoria): el pool se vuelve a crear en la siguiente operación
+            with self._lock:
+                self._counters['failures'] += 1
+                if self._executor is executor:
+                    self._executor = None
+            raise PasswordHasherBusy('El pool de hashing de contraseñas no está disponible')
+        finally:
+            if future is None:
+                self._release()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._counters['seconds_total'] += elapsed
+                self._counters['seconds_max'] = max(self._counters['seconds_max'], elapsed)
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def shutdown(self):
+        """Cierra los procesos del pool; las operaciones en cola se cancelan."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Instantánea de los contadores y de la ocupación actual del pool."""
+        with self._lock:
+            snapshot = dict(self._counters)
+            snapshot.update({
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'in_flight': self._in_flight,
+            })
+        return snapshot
+
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASH_WORKERS,
+    queue_limit=PASSWORD_HASH_QUEUE_LIMIT,
+    timeout=PASSWORD_HASH_TIMEOUT,
+    rounds=app.config.get('BCRYPT_LOG_ROUNDS', 12),
+)
+atexit.register(password_hasher.shutdown)
+
+def _password_busy_response(err):
+    """Respuesta 503 para PasswordHasherBusy: el cliente puede reintentar en un momento."""
+    report_failure('password_hash_busy', "Pool de hashing de contraseñas saturado: %s", err, level=logging.WARNING)
+    return jsonify({'error': 'El servidor está ocupado, inténtalo de nuevo en unos segundos'}), 503, {'Retry-After': '1'}
+
+# --- Instrumentación: métricas por petición (formato Prometheus) ---
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Si se define, /metrics exige "Authorization: Bearer <token>"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+class InstrumentedCursor:
+    """
+    Envoltorio de un cursor MySQL que mide cada sentencia ejecutada.
+    Acumula el número de sentencias y el tiempo de base de datos en `g` para la petición en curso
+    y, si el rastreo SQL está activo, registra cada sentencia en `sql_tracer`.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._trace = None  # Entrada de rastreo de la última sentencia, para completar sus filas
+
+    def _record(self, elapsed, statements=0):
+        if has_request_context():
+            g.sql_count = g.get('sql_count', 0) + statements
+            g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+
+    def _run(self, method, operation, params, traced_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(operation, params, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._record(elapsed, statements=1)
+            if has_request_context() and 'taskmanager.capture_sql' in request.environ:
+                # Usado por `flask check-query-plans` para revisar el SQL real de cada ruta
+                request.environ['taskmanager.capture_sql'].append((operation, params))
+            if sql_tracer.enabled:
+                self._trace = sql_tracer.record(operation, traced_params, elapsed, self._cursor.rowcount)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._run(self._cursor.execute, operation, params, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        # Para el rastreo basta la forma de la primera fila, no la lista completa
+        seq_params = list(seq_params)
+        first_row = seq_params[0] if seq_params else None
+        return self._run(self._cursor.executemany, operation, seq_params, first_row, *args, **kwargs)
+
+    def _timed_fetch(self, method, *args, single=False):
+        # En cursores no almacenados las filas viajan al leerlas, así que también cuentan como tiempo de BD
+        started = time.perf_counter()
+        result = None
+        try:
+            result = method(*args)
+            return result
+        finally:
+            self._record(time.perf_counter() - started)
+            if self._trace is not None and result is not None:
+                self._trace['rows'] = (self._trace['rows'] or 0) + (1 if single else len(result))
+
+    def fetchone(self):
+        return self._timed_fetch(self._cursor.fetchone, single=True)
+
+    def fetchmany(self, *args):
+        return self._timed_fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed_fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class Histogram:
+    """Histograma acumulativo con cubetas fijas, al estilo de Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+class MetricsRegistry:
+    """Almacena contadores e histogramas por ruta y los exporta en formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = collections.Counter()  # (ruta, método, estado) -> peticiones
+        self._histograms = {}  # (nombre, ruta, método) -> Histogram
+        self._failures = collections.Counter()  # componente -> fallos (ver report_failure)
+
+    def _histogram(self, name, route, method, buckets):
+        key = (name, route, method)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe_request(self, route, method, status, duration, size, sql_count, sql_seconds):
+        with self._lock:
+            self._requests[(route, method, str(status))] += 1
+            self._histogram('http_request_duration_seconds', route, method, LATENCY_BUCKETS).observe(duration)
+            if size is not None:
+                self._histogram('http_response_size_bytes', route, method, SIZE_BUCKETS).observe(size)
+            self._histogram('db_statements_per_request', route, method, SQL_COUNT_BUCKETS).observe(sql_count)
+            self._histogram('db_seconds_per_request', route, method, LATENCY_BUCKETS).observe(sql_seconds)
+
+    def record_failure(self, component):
+        with self._lock:
+            self._failures[component] += 1
+
+    def render(self, extra_gauges=None):
+        """Genera la exposición completa de métricas en formato de texto de Prometheus."""
+        descriptions = {
+            'http_request_duration_seconds': 'Latencia de las peticiones HTTP por ruta.',
+            'http_response_size_bytes': 'Tamaño del cuerpo de las respuestas por ruta.',
+            'db_statements_per_request': 'Sentencias SQL ejecutadas por petición.',
+            'db_seconds_per_request': 'Tiempo acumulado en la base de datos por petición.',
+        }
+        lines = [
+            '# HELP taskmanager_http_requests_total Peticiones HTTP atendidas por ruta, método y estado.',
+            '# TYPE taskmanager_http_requests_total counter',
+        ]
+        with self._lock:
+            for (route, method, status), count in sorted(self._requests.items()):
+                labels = _format_labels(route=route, method=method, status=status)
+                lines.append(f'taskmanager_http_requests_total{{{labels}}} {count}')
+
+            for name, help_text in descriptions.items():
+                metric = f'taskmanager_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (hist_name, route, method), histogram in sorted(self._histograms.items()):
+                    if hist_name != name:
+                        continue
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        labels = _format_labels(route=route, method=method, le=_format_number(bound))
+                        lines.append(f'{metric}_bucket{{{labels}}} {count}')
+                    labels = _format_labels(route=route, method=method, le='+Inf')
+                    lines.append(f'{metric}_bucket{{{labels}}} {histogram.total}')
+                    labels = _format_labels(route=route, method=method)
+                    lines.append(f'{metric}_sum{{{labels}}} {_format_number(histogram.sum)}')
+                    lines.append(f'{metric}_count{{{labels}}} {histogram.total}')
+
+            lines.append('# HELP taskmanager_failures_total Fallos registrados fuera de la respuesta (hilos, degradaciones) por componente.')
+            lines.append('# TYPE taskmanager_failures_total counter')
+            for component, count in sorted(self._failures.items()):
+                lines.append(f'taskmanager_failures_total{{{_format_labels(component=component)}}} {count}')
+
+        for name, (help_text, value) in (extra_gauges or {}).items():
+            metric = f'taskmanager_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(**labels):
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+    return ','.join(f'{key}="{value}"' for key, value in escaped)
+
+metrics = MetricsRegistry()
+
+def report_failure(component, message, *args, level=logging.ERROR, exc_info=False):
+    """
+    Registra un fallo que no llega al cliente como error (hilos en segundo plano, respuestas degradadas):
+    lo escribe en el log de la aplicación y lo cuenta en /metrics como taskmanager_failures_total.
+    """
+    metrics.record_failure(component)
+    app.logger.log(level, message, *args, exc_info=exc_info)
+
+@app.before_request
+def start_request_metrics():
+    """Marca el inicio de la petición y reinicia los contadores de SQL."""
+    g.request_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+
+@app.after_request
+def record_request_metrics(response):
+    """Registra latencia, tamaño de respuesta y consumo de base de datos de la petición."""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'sin_ruta'
+        metrics.observe_request(
+            route,
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            # Las respuestas en streaming (/api/stream) no tienen tamaño conocido: calcularlo las consumiría
+            None if response.is_streamed else response.calculate_content_length(),
+            g.get('sql_count', 0),
+            g.get('sql_seconds', 0.0),
+        )
+    if sql_tracer.enabled:
+        sql_tracer.finish_request()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expone las métricas de la aplicación y del pool de conexiones para Prometheus."""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'error': 'No autorizado'}), 401
+
+    pool_stats = db_pool.stats()
+    gauges = {
+        'db_pool_size': ('Conexiones que el pool mantiene en reposo.', pool_stats['size']),
+        'db_pool_max_overflow': ('Conexiones adicionales permitidas en picos.', pool_stats['max_overflow']),
+        'db_pool_open_connections': ('Conexiones físicas abiertas.', pool_stats['open']),
+        'db_pool_in_use_connections': ('Conexiones prestadas en este momento.', pool_stats['in_use']),
+        'db_pool_idle_connections': ('Conexiones disponibles en reposo.', pool_stats['idle']),
+        'db_pool_peak_in_use_connections': ('Máximo de conexiones prestadas a la vez.', pool_stats['peak_in_use']),
+        'db_pool_checkouts_total': ('Préstamos de conexión realizados.', pool_stats['checkouts']),
+        'db_pool_waits_total': ('Préstamos que tuvieron que esperar.', pool_stats['waits']),
+        'db_pool_wait_seconds_total': ('Tiempo total esperando conexiones.', pool_stats['wait_seconds_total']),
+        'db_pool_wait_seconds_max': ('Espera más larga por una conexión.', pool_stats['wait_seconds_max']),
+        'db_pool_timeouts_total': ('Préstamos que agotaron el tiempo de espera.', pool_stats['timeouts']),
+        'db_pool_connections_created_total': ('Conexiones físicas creadas.', pool_stats['connections_created']),
+        'db_pool_connections_recycled_total': ('Conexiones recicladas por antigüedad.', pool_stats['connections_recycled']),
+        'db_pool_ping_failures_total': ('Conexiones descartadas por fallar el pre-ping.', pool_stats['ping_failures']),
+    }
+    hasher_stats = password_hasher.stats()
+    gauges.update({
+        'password_hash_workers': ('Procesos del pool de hashing de contraseñas.', hasher_stats['workers']),
+        'password_hash_queue_limit': ('Operaciones de contraseña admitidas a la vez (cola y en curso).', hasher_stats['queue_limit']),
+        'password_hash_in_flight': ('Operaciones de contraseña en cola o en curso.', hasher_stats['in_flight']),
+        'password_hash_peak_in_flight': ('Máximo de operaciones de contraseña a la vez.', hasher_stats['peak_in_flight']),
+        'password_hash_operations_total': ('Operaciones de contraseña admitidas.', hasher_stats['operations']),
+        'password_hash_rejected_total': ('Operaciones rechazadas por tener la cola llena.', hasher_stats['rejected']),
+        'password_hash_timeouts_total': ('Operaciones que agotaron el tiempo de espera.', hasher_stats['timeouts']),
+        'password_hash_failures_total': ('Operaciones perdidas porque murió un proceso del pool.', hasher_stats['failures']),
+        'password_hash_seconds_total': ('Tiempo total de las operaciones de contraseña, cola incluida.', hasher_stats['seconds_total']),
+        'password_hash_seconds_max': ('Operación de contraseña más lenta, cola incluida.', hasher_stats['seconds_max']),
+        'stream_connections': ('Conexiones de /api/stream abiertas en este proceso (modo stream).', event_bus.connection_count()),
+    })
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/sql_trace', methods=['GET'])
+def get_sql_trace():
+    """
+    Muestra el rastreo SQL reciente (solo administradores).
+    Parámetros opcionales:
+    - slow: 'true' para ver solo las consultas lentas
+    - limit: número máximo de sentencias a devolver
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    if session.get('role') != 'Administrador':
+        return jsonify({'error': 'No tienes permiso para realizar esta acción'}), 403
+
+    slow_only = request.args.get('slow', 'false').lower() == 'true'
+    limit = request.args.get('limit', type=int)
+    return jsonify(sql_tracer.snapshot(slow_only=slow_only, limit=limit))
+
+# --- Versiones de datos y caché de resultados ---
+class DataVersions:
+    """
+    Contadores de versión por tabla y por (tabla, usuario), incrementados por las rutas de escritura.
+    Permiten saber con una consulta por clave primaria si un resultado calculado antes sigue vigente.
+    Las tareas llevan dos series: 'tasks' (global, cualquier cambio de cualquier tarea) para las vistas
+    que abarcan todas las tareas, y 'assigned_tasks' por asignado para la lista y la analítica de cada
+    usuario, que así no se invalidan con las escrituras sobre tareas de otros.
+    Viven en la tabla `data_versions` (migración 0008), así que una escritura atendida por un proceso
+    invalida los ETag y la caché de analítica de todos los demás.
+    - Las rutas incrementan el contador dentro de la transacción que escribe los datos (`cursor`),
+      como última sentencia antes del commit: o se confirman los dos o ninguno, y la fila del contador
+      queda bloqueada solo hasta ese commit.
+    - Sin `cursor` (trabajos en segundo plano, tras varias transacciones) se escriben en el acto.
+    """
+
+    def bump(self, table, user_id=None, cursor=None):
+        """Marca un cambio en la tabla; con `user_id` solo afecta a los datos de ese usuario."""
+        self.bump_all([(table, user_id)], cursor)
+
+    def bump_all(self, pairs, cursor=None):
+        """Incrementa a la vez los contadores de `pairs` [(tabla, user_id o None)]."""
+        keys = {(table, int(user_id or 0)) for table, user_id in pairs}
+        if not keys:
+            return
+        if cursor is not None:
+            self._write(cursor, keys)
+            return
+        with db_cursor() as (conn, cursor):
+            self._write(cursor, keys)
+            conn.commit()
+
+    @staticmethod
+    def _write(cursor, keys):
+        # Orden fijo de claves: dos escrituras concurrentes bloquean las filas en el mismo orden
+        keys = sorted(keys)
+        placeholders = ', '.join(['(%s, %s, 1)'] * len(keys))
+        cursor.execute(
+            f"INSERT INTO data_versions (table_name, user_id, version) VALUES {placeholders} "
+            "ON DUPLICATE KEY UPDATE version = version + 1",
+            tuple(value for key in keys for value in key)
+        )
+
+    def stamp(self, *pairs):
+        """
+        Versiones vigentes para un lector, una tupla por (tabla, user_id) de `pairs`: la versión global
+        de la tabla y, si se indica usuario, también la suya. Se leen todas en una sola consulta.
+        """
+        keys = {(table, 0) for table, _ in pairs} | {(table, user_id) for table, user_id in pairs if user_id}
+        placeholders = ', '.join(['(%s, %s)'] * len(keys))
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"SELECT table_name, user_id, version FROM data_versions WHERE (table_name, user_id) IN ({placeholders})",
+                tuple(value for key in sorted(keys) for value in key)
+            )
+            versions = {(table, user_id): version for table, user_id, version in cursor.fetchall()}
+        return tuple(
+            (versions.get((table, 0), 0), versions.get((table, user_id), 0)) if user_id else (versions.get((table, 0), 0),)
+            for table, user_id in pairs
+        )
+
+data_versions = DataVersions()
+
+def _task_bumps(assignees):
+    """
+    Contadores a incrementar al escribir tareas: el global 'tasks' y 'assigned_tasks' de cada usuario
+    de `assignees` (asignados antes y después del cambio) que sea un identificador válido.
+    """
+    user_ids = {int(user_id) for user_id in assignees if str(user_id or '').isdigit()}
+    return [('tasks', None)] + [('assigned_tasks', user_id) for user_id in sorted(user_ids)]
+
+class ResultCache:
+    """
+    Caché LRU de resultados con caducidad. Cada entrada guarda el sello de versiones con el que se
+    calculó y solo se sirve si el sello actual coincide (es decir, si no hubo escrituras desde entonces).
+    Las entradas viven en cada proceso, pero el sello se lee de `data_versions` en la base de datos:
+    una escritura atendida por otro worker invalida también las entradas de este, sin esperar al TTL.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # clave -> (sello, caduca_en, valor)
+        self._lock = threading.Lock()
+
+    def get(self, key, stamp):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_stamp, expires_at, value = entry
+            if entry_stamp != stamp or expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, stamp, value):
+        with self._lock:
+            self._entries[key] = (stamp, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 60))  # Segundos que vive un resumen en caché sin escrituras
+analytics_cache = ResultCache(maxsize=10000, ttl=ANALYTICS_CACHE_TTL)
+
+def conditional_get(*tables, per_user=(), by_ids=None):
+    """
+    Decorador para listas GET: calcula un ETag a partir de las versiones de `tables` (globales) y
+    `per_user` (del usuario de la sesión) y, si coincide con If-None-Match, responde 304 sin ejecutar
+    la ruta. `by_ids` son las tablas (globales) de la variante `?ids=` de la ruta, que devuelve filas
+    de cualquier usuario en lugar de las de la sesión. Las versiones se leen antes de la consulta, así que una escritura concurrente solo puede
+    provocar que el siguiente GET vuelva a descargar la lista; una escritura se refleja en el ETag, en
+    cualquier proceso, en cuanto se confirma, porque su versión va en la misma transacción. Sin sesión, o si no se pueden leer las
+    versiones, se ejecuta la ruta sin ETag (y ella responde 401 o su propio error).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get('user_id')
+            if user_id is None:
+                return view(*args, **kwargs)
+            try:
+                if by_ids is not None and 'ids' in request.args:
+                    stamp = data_versions.stamp(*[(table, None) for table in by_ids])
+                else:
+                    stamp = data_versions.stamp(*[(table, None) for table in tables], *[(table, user_id) for table in per_user])
+            except mysql.connector.Error as err:
+                print(f"Error leyendo data_versions para el ETag: {err}")
+                return view(*args, **kwargs)
+            raw = f"{user_id}|{request.full_path}|{stamp}"
+            etag = hashlib.sha1(raw.encode()).hexdigest()[:20]
+            # Comparación débil: al comprimir la respuesta el ETag se marca como débil (W/"...")
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Cada usuario ve su propia lista: el navegador debe revalidar siempre con el servidor
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# --- Sincronización incremental: versiones de fila y lápidas ---
+ROW_VERSION_KEYS = {'tasks': 'task_id', 'projects': 'project_id', 'notes': 'note_id'}
+# row_version provisional de las filas insertadas hasta _commit_row_version: ninguna fila confirmada la lleva
+ROW_VERSION_PENDING = 2 ** 64 - 1
+
+def _next_row_version(cursor):
+    """
+    Reserva la siguiente versión global para los cambios de la transacción actual.
+    La fila de `sync_state` queda bloqueada hasta el commit, así que las transacciones que
+    escriben versiones se confirman en el mismo orden en que las reservan y /api/sync nunca
+    puede saltarse una versión menor que se confirme más tarde. Por eso se reserva como último
+    paso antes del commit (ver _commit_row_version): el bloqueo serializa solo ese final.
+    """
+    cursor.execute("UPDATE sync_state SET current_version = LAST_INSERT_ID(current_version + 1) WHERE id = 1")
+    cursor.execute("SELECT LAST_INSERT_ID() AS version")
+    row = cursor.fetchone()
+    return row['version'] if isinstance(row, dict) else row[0]
+
+def _commit_row_version(conn, cursor, rows=None, tombstones=None, bumps=()):
+    """
+    Confirma la transacción con una versión global reservada justo antes del commit. Bloquea antes las
+    filas de `rows` ({tabla: ids}) que la transacción no tenga ya bloqueadas, así, mientras se tiene
+    `sync_state`, no se espera por ninguna otra fila y no hay interbloqueos. Después escribe la versión
+    en esas filas y las lápidas `tombstones` ({entidad: [(entity_id, user_id afectado o None)]}).
+    `bumps` son los contadores de data_versions [(tabla, user_id o None)] que se incrementan en la misma
+    transacción. Devuelve la versión.
+    """
+    rows = {table: sorted({row_id for row_id in ids if row_id is not None}) for table, ids in (rows or {}).items()}
+    rows = {table: ids for table, ids in rows.items() if ids}
+    for table, ids in rows.items():
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"SELECT {ROW_VERSION_KEYS[table]} FROM {table} WHERE {ROW_VERSION_KEYS[table]} IN ({placeholders}) FOR UPDATE", tuple(ids))
+        cursor.fetchall()
+    data_versions.bump_all(bumps, cursor)
+    version = _next_row_version(cursor)
+    for table, ids in rows.items():
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"UPDATE {table} SET row_version = %s WHERE {ROW_VERSION_KEYS[table]} IN ({placeholders})", (version, *ids))
+    for entity, entity_rows in (tombstones or {}).items():
+        _record_tombstones(cursor, version, entity, entity_rows)
+    conn.commit()
+    return version
+
+def _record_tombstones(cursor, version, entity, rows):
+    """Registra lápidas para `rows`, una lista de (entity_id, user_id afectado o None)."""
+    if not rows:
+        return
+    deleted_at = datetime.now()
+    cursor.executemany(
+        "INSERT INTO sync_tombstones (version, entity, entity_id, user_id, deleted_at) VALUES (%s, %s, %s, %s, %s)",
+        [(version, entity, entity_id, user_id, deleted_at) for entity_id, user_id in rows]
+    )
+
+# --- Bus de eventos para /api/stream (Server-Sent Events) ---
+STREAM_MODE = os.environ.get('STREAM_MODE', 'auto')  # auto | stream | poll (ver _stream_mode)
+STREAM_HISTORY_SECONDS = int(os.environ.get('STREAM_HISTORY_SECONDS', 3600))  # Eventos que se conservan para reanudar con Last-Event-ID
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', 100))  # Eventos pendientes por conexión antes de pedir un reset
+STREAM_MAX_CONNECTIONS = int(os.environ.get('STREAM_MAX_CONNECTIONS', 5000))  # Conexiones abiertas por proceso en modo stream
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get('STREAM_HEARTBEAT_SECONDS', 25))
+STREAM_POLL_SECONDS = float(os.environ.get('STREAM_POLL_SECONDS', 1))  # Cada cuánto lee cada proceso los eventos nuevos
+STREAM_POLL_RETRY_MS = int(os.environ.get('STREAM_POLL_RETRY_MS', 5000))  # En modo poll, espera del navegador entre consultas
+STREAM_READ_LIMIT = 1000  # Eventos por lectura del proceso
+STREAM_PRUNE_SECONDS = 60  # Cada cuánto purga cada proceso los eventos caducados al publicar
+# Un evento se entrega cuando tiene al menos esta antigüedad. Cada INSERT se confirma en microsegundos,
+# así que para entonces los de event_id menor ya son visibles y leer por event_id no se salta ninguno.
+STREAM_SETTLE_SQL = "created_at <= NOW(6) - INTERVAL 1 SECOND"
+
+def _stream_mode():
+    """
+    'stream' si el proceso atiende cada conexión con una corrutina (gunicorn -k gevent): las conexiones
+    quedan abiertas y reciben los eventos en cuanto llegan. 'poll' con workers de hilos (o el servidor
+    de desarrollo): cada petición devuelve los eventos pendientes y se cierra, y el navegador vuelve a
+    conectar con Last-Event-ID, así ninguna conexión inactiva retiene un hilo. STREAM_MODE lo fuerza.
+    """
+    if STREAM_MODE in ('stream', 'poll'):
+        return STREAM_MODE
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        return 'stream'
+    return 'poll'
+
+class StreamSubscription:
+    """Cola acotada de eventos de una conexión SSE. Sin hilos ni temporizadores propios."""
+    __slots__ = ('user_id', 'events', 'overflowed', 'ready')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.events = collections.deque()
+        self.overflowed = False
+        self.ready = threading.Event()
+
+    def push(self, event):
+        if len(self.events) >= STREAM_QUEUE_SIZE:
+            # Cliente demasiado lento: se descarta lo pendiente y se le pide que vuelva a cargar
+            self.events.clear()
+            self.overflowed = True
+        else:
+            self.events.append(event)
+        self.ready.set()
+
+    def wait(self, timeout):
+        """Espera hasta `timeout` segundos y devuelve (eventos pendientes, hubo_desbordamiento)."""
+        self.ready.wait(timeout)
+        self.ready.clear()
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        overflowed, self.overflowed = self.overflowed, False
+        return events, overflowed
+
+class EventBus:
+    """
+    Publicación/suscripción entre procesos sobre la tabla `stream_events` (migración 0010).
+    - Las rutas de escritura publican tras el commit. Dentro de una petición los eventos se acumulan y
+      se insertan juntos al terminar la vista (`flush`); fuera de ella se insertan en el acto.
+    - Cada evento va dirigido a unos usuarios concretos (o a todos con user_ids=None) y solo se entrega
+      a las conexiones de esos usuarios. Su identificador es `event_id`, común a todos los procesos,
+      así que un cliente puede reanudar con Last-Event-ID en cualquiera de ellos.
+    - En modo stream, un único hilo por proceso lee los eventos nuevos cada STREAM_POLL_SECONDS
+      (solo mientras haya conexiones abiertas) y los reparte a sus suscripciones en memoria.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = collections.defaultdict(set)  # user_id -> {StreamSubscription}
+        self._count = 0
+        self._last_id = None  # Último evento repartido; None mientras no hay conexiones
+        self._poller = None
+        self._next_prune = 0.0
+
+    def publish(self, event_type, data, user_ids=None):
+        """Publica un evento para `user_ids` (iterable de ids) o para todos los usuarios si es None."""
+        audience = None if user_ids is None else sorted({user_id for user_id in user_ids if user_id is not None})
+        row = (event_type, None if audience is None else app.json.dumps(audience), app.json.dumps(data))
+        if has_request_context():
+            g.setdefault('pending_events', []).append(row)
+        else:
+            self._write([row])
+
+    def flush(self):
+        """Inserta los eventos publicados en la petición actual."""
+        pending = g.pop('pending_events', None)
+        if pending:
+            self._write(pending)
+
+    def _write(self, rows):
+        placeholders = ', '.join(['(%s, %s, %s)'] * len(rows))
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"INSERT INTO stream_events (event_type, audience, payload) VALUES {placeholders}",
+                tuple(value for row in rows for value in row)
+            )
+            conn.commit()
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + STREAM_PRUNE_SECONDS
+                cursor.execute(
+                    "DELETE FROM stream_events WHERE created_at < NOW(6) - INTERVAL %s SECOND LIMIT 10000",
+                    (STREAM_HISTORY_SECONDS,)
+                )
+                conn.commit()
+
+    def _read(self, after, until=None, user_id=None, limit=STREAM_READ_LIMIT):
+        """
+        Eventos entregables con event_id > `after` (y <= `until`), en orden, como (event_id, audiencia, evento).
+        Con `user_id`, solo los dirigidos a ese usuario.
+        """
+        sql = f"SELECT event_id, event_type, audience, payload FROM stream_events WHERE event_id > %s AND {STREAM_SETTLE_SQL}"
+        params = [after]
+        if until is not None:
+            sql += " AND event_id <= %s"
+            params.append(until)
+        if user_id is not None:
+            sql += " AND (audience IS NULL OR JSON_CONTAINS(audience, %s))"
+            params.append(str(user_id))
+        sql += " ORDER BY event_id LIMIT %s"
+        params.append(limit)
+        with db_cursor() as (conn, cursor):
+            cursor.execute(sql, tuple(params))
+            rows = cursor.fetchall()
+        return [
+            (event_id, None if audience is None else frozenset(json.loads(audience)), (str(event_id), event_type, payload))
+            for event_id, event_type, audience, payload in rows
+        ]
+
+    def _position(self, last_event_id):
+        """
+        Punto desde el que seguir a un cliente: (último event_id entregable, event_id desde el que
+        reanudar o None si debe recargar sus datos). Sin `last_event_id`, el cliente empieza ahora.
+        """
+        with db_cursor() as (conn, cursor):
+            cursor.execute(f"""
+                SELECT COALESCE(MAX(CASE WHEN {STREAM_SETTLE_SQL} THEN event_id END), 0), MIN(event_id)
+                FROM stream_events
+            """)
+            newest, oldest = cursor.fetchone()
+        if not last_event_id:
+            return newest, newest
+        if not last_event_id.isdigit():
+            return newest, None  # Identificador de otra versión del servidor
+        resume_from = int(last_event_id)
+        if oldest is not None and resume_from + 1 < oldest:
+            return newest, None  # Los eventos siguientes ya se purgaron
+        return newest, min(resume_from, newest)
+
+    def read_since(self, user_id, last_event_id):
+        """
+        Modo poll: eventos del usuario posteriores a `last_event_id`. Devuelve (eventos, reset, último
+        event_id) donde `reset` indica que el cliente debe recargar sus datos.
+        """
+        newest, resume_from = self._position(last_event_id)
+        if resume_from is None:
+            return [], True, newest
+        if resume_from >= newest:
+            return [], False, newest
+        rows = self._read(resume_from, until=newest, user_id=user_id, limit=STREAM_QUEUE_SIZE + 1)
+        if len(rows) > STREAM_QUEUE_SIZE:
+            return [], True, newest
+        return [event for _, _, event in rows], False, newest
+
+    def subscribe(self, user_id, last_event_id=None):
+        """
+        Modo stream: registra una conexión. Con `last_event_id` le encola los eventos posteriores que
+        sigan guardados, o un `reset` si ya no es posible. Devuelve None si se alcanzó STREAM_MAX_CONNECTIONS.
+        """
+        newest, resume_from = self._position(last_event_id)
+        subscription = StreamSubscription(user_id)
+        with self._lock:
+            if self._count >= STREAM_MAX_CONNECTIONS:
+                return None
+            if self._last_id is None:
+                self._last_id = newest
+            # El hilo lector reparte lo posterior a `until`; lo anterior se recupera aquí
+            until = self._last_id
+            self._subscribers[user_id].add(subscription)
+            self._count += 1
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll_loop, name='stream-events', daemon=True)
+                self._poller.start()
+        if resume_from is None:
+            subscription.overflowed = True
+            subscription.ready.set()
+        elif resume_from < until:
+            try:
+                rows = self._read(resume_from, until=until, user_id=user_id, limit=STREAM_QUEUE_SIZE + 1)
+            except Exception:
+                self.unsubscribe(subscription)
+                raise
+            for _, _, event in rows:
+                subscription.push(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+                if not self._count:
+                    self._last_id = None  # Sin conexiones no se lee; la siguiente empieza desde el final
+
+    def _poll_loop(self):
+        while True:
+            with self._lock:
+                after = self._last_id
+            rows = []
+            if after is not None:
+                try:
+                    rows = self._read(after)
+                except Exception as err:  # El hilo debe seguir vivo: se reintenta en la siguiente vuelta
+                    report_failure('event_bus_poll', "Error leyendo stream_events: %s", err,
+                                   exc_info=not isinstance(err, mysql.connector.Error))
+            with self._lock:
+                if rows and self._last_id == after:
+                    for _, audience, event in rows:
+                        if audience is None:
+                            targets = [sub for subscriptions in self._subscribers.values() for sub in subscriptions]
+                        else:
+                            targets = [sub for user_id in audience for sub in self._subscribers.get(user_id, ())]
+                        for subscription in targets:
+                            subscription.push(event)
+                    self._last_id = rows[-1][0]
+            if len(rows) < STREAM_READ_LIMIT:
+                time.sleep(STREAM_POLL_SECONDS)
+
+    def connection_count(self):
+        with self._lock:
+            return self._count
+
+event_bus = EventBus()
+
+@app.after_request
+def flush_pending_changes(response):
+    """
+    Publica los eventos de las escrituras de la petición antes de que el cliente reciba la respuesta.
+    Las versiones de datos ya se confirmaron con cada escritura, así que quien reaccione a un evento
+    obtiene listas con ETag nuevo.
+    """
+    try:
+        event_bus.flush()
+    except Exception as err:
+        # Los datos y sus versiones ya están confirmados: los demás clientes lo verán al recargar o reconectar
+        report_failure('event_publish', "Error al publicar los eventos de la petición: %s", err,
+                       exc_info=not isinstance(err, mysql.connector.Error))
+    return response
+
+# --- Trabajos en segundo plano: borrados por bloques ---
+BACKGROUND_JOB_WORKERS = int(os.environ.get('BACKGROUND_JOB_WORKERS', 2))  # Trabajos que se ejecutan a la vez
+BACKGROUND_JOB_RETENTION = int(os.environ.get('BACKGROUND_JOB_RETENTION', 3600))  # Segundos que se conserva un trabajo terminado
+BACKGROUND_JOB_STALE_SECONDS = int(os.environ.get('BACKGROUND_JOB_STALE_SECONDS', 600))  # Sin progreso durante este tiempo, el trabajo se da por abandonado
+DELETION_CHUNK_SIZE = int(os.environ.get('DELETION_CHUNK_SIZE', 1000))  # Filas por transacción en los borrados grandes
+
+class BackgroundJobRegistry:
+    """
+    Ejecuta trabajos largos en hilos propios y guarda su estado en la tabla `background_jobs`
+    (migración 0012) para consultarlo con /api/jobs/<job_id> desde cualquier proceso. El índice único
+    sobre `active_key` impide que haya dos trabajos pendientes o en curso del mismo tipo y objetivo,
+    aunque se pidan a procesos distintos.
+    """
+
+    _COLUMNS = ("job_id, kind, target_id, requested_by, status, step, row_counts, error, "
+                "created_at, started_at, finished_at")
+
+    def __init__(self, max_workers, retention, stale_after):
+        self.retention = retention
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jobs')
+        self._lock = threading.Lock()
+        self._rows = {}  # job_id -> {tabla: filas} de los trabajos que ejecuta este proceso
+
+    def submit(self, kind, target_id, requested_by, func, *args):
+        """
+        Encola `func(job_id, *args)` y devuelve (trabajo, creado). Si ya hay un trabajo pendiente o en
+        curso del mismo tipo sobre el mismo objetivo, devuelve ese en lugar de crear otro. Un trabajo sin
+        señales de su proceso en `stale_after` segundos (el proceso terminó) se da por fallido y se
+        sustituye: los pasos por bloques se pueden repetir. Lanza mysql.connector.Error.
+        """
+        job_id = secrets.token_hex(8)
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute(
+                "DELETE FROM background_jobs WHERE finished_at < NOW() - INTERVAL %s SECOND", (self.retention,)
+            )
+            cursor.execute("""
+                UPDATE background_jobs SET status = 'failed', error = 'El proceso que lo ejecutaba se detuvo', finished_at = NOW()
+                WHERE active_key = %s AND heartbeat_at < NOW() - INTERVAL %s SECOND
+            """, (f"{kind}:{target_id}", self.stale_after))
+            try:
+                cursor.execute("""
+                    INSERT INTO background_jobs (job_id, kind, target_id, requested_by, row_counts, created_at, heartbeat_at)
+                    VALUES (%s, %s, %s, %s, '{}', NOW(), NOW())
+                """, (job_id, kind, target_id, requested_by))
+            except mysql.connector.IntegrityError as err:
+                if err.errno != errorcode.ER_DUP_ENTRY:
+                    raise
+                conn.commit()  # La purga y los trabajos abandonados sí se confirman
+                cursor.execute(f"SELECT {self._COLUMNS} FROM background_jobs WHERE active_key = %s", (f"{kind}:{target_id}",))
+                existing = cursor.fetchone()
+                if existing is not None:
+                    return self._job(existing), False
+                # Terminó entre la inserción y la lectura: se crea uno nuevo
+                cursor.execute("""
+                    INSERT INTO background_jobs (job_id, kind, target_id, requested_by, row_counts, created_at, heartbeat_at)
+                    VALUES (%s, %s, %s, %s, '{}', NOW(), NOW())
+                """, (job_id, kind, target_id, requested_by))
+            conn.commit()
+            cursor.execute(f"SELECT {self._COLUMNS} FROM background_jobs WHERE job_id = %s", (job_id,))
+            created = self._job(cursor.fetchone())
+        with self._lock:
+            self._rows[job_id] = {}
+        self._executor.submit(self._run, job_id, func, args)
+        return created, True
+
+    def _run(self, job_id, func, args):
+        try:
+            self._update(job_id, "status = 'running', started_at = NOW()")
+            func(job_id, *args)
+        except Exception as err:  # El hilo no tiene a quién propagar el error: queda en el estado del trabajo
+            report_failure('background_job', "Error en el trabajo %s: %s", job_id, err, exc_info=True)
+            try:
+                self._update(job_id, "status = 'failed', error = %s, finished_at = NOW()", (str(err),))
+            except mysql.connector.Error as update_err:
+                # Sin señales, el trabajo se dará por abandonado pasados stale_after segundos
+                report_failure('background_job_state', "Error guardando el fallo del trabajo %s: %s", job_id, update_err)
+        else:
+            self._update(job_id, "status = 'completed', step = NULL, finished_at = NOW()")
+        finally:
+            with self._lock:
+                self._rows.pop(job_id, None)
+
+    def _update(self, job_id, assignments, params=()):
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"UPDATE background_jobs SET {assignments}, heartbeat_at = NOW() WHERE job_id = %s",
+                (*params, job_id)
+            )
+            conn.commit()
+
+    def progress(self, job_id, step, table, rows):
+        """Anota el paso actual y suma las filas procesadas en `table`. Solo lo llama el proceso que ejecuta el trabajo."""
+        with self._lock:
+            counts = self._rows.setdefault(job_id, {})
+            counts[table] = counts.get(table, 0) + rows
+            row_counts = json.dumps(counts)
+        self._update(job_id, "step = %s, row_counts = %s", (step, row_counts))
+
+    def get(self, job_id):
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute(f"SELECT {self._COLUMNS} FROM background_jobs WHERE job_id = %s", (job_id,))
+            job = cursor.fetchone()
+        return self._job(job) if job else None
+
+    @staticmethod
+    def _job(row):
+        job = dict(row)
+        job['rows'] = json.loads(job.pop('row_counts') or '{}')
+        return job
+
+background_jobs = BackgroundJobRegistry(BACKGROUND_JOB_WORKERS, BACKGROUND_JOB_RETENTION, BACKGROUND_JOB_STALE_SECONDS)
+
+def _delete_tasks_chunk(cursor, task_ids):
+    """Borra un bloque acotado de tareas con sus objetivos, sesiones y resumen diario. Devuelve las filas por tabla."""
+    placeholders = ', '.join(['%s'] * len(task_ids))
+    rows = {}
+    for table in ('focus_objectives', 'focus_sessions', 'focus_daily_rollup', 'tasks'):
+        cursor.execute(f"DELETE FROM {table} WHERE task_id IN ({placeholders})", tuple(task_ids))
+        rows[table] = cursor.rowcount
+    return rows
+
+def _delete_task_chunks(job_id, step, where_sql, params):
+    """
+    Borra por bloques de DELETION_CHUNK_SIZE las tareas que cumplen `where_sql`, cada bloque en su
+    propia transacción, con sus lápidas de sincronización. La versión se reserva al final de cada
+    bloque, así el bloqueo de `sync_state` no dura lo que los borrados. Devuelve los proyectos afectados.
+    """
+    projects = set()
+    while True:
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"SELECT task_id, assigned_to, project_id FROM tasks WHERE {where_sql} ORDER BY task_id LIMIT %s FOR UPDATE",
+                params + (DELETION_CHUNK_SIZE,)
+            )
+            chunk = cursor.fetchall()
+            if not chunk:
+                conn.rollback()
+                return projects
+            task_ids = [task_id for task_id, _, _ in chunk]
+            rows = _delete_tasks_chunk(cursor, task_ids)
+            _commit_row_version(conn, cursor, tombstones={'task': [(task_id, assigned_to) for task_id, assigned_to, _ in chunk]},
+                                bumps=_task_bumps(assigned_to for _, assigned_to, _ in chunk)
+                                + [('focus_sessions', None), ('focus_objectives', None)])
+        projects.update(project_id for _, _, project_id in chunk)
+        for table, count in rows.items():
+            background_jobs.progress(job_id, step, table, count)
+
+def _run_in_chunks(job_id, step, table, statement, params):
+    """
+    Repite `statement` con `LIMIT DELETION_CHUNK_SIZE`, una transacción por bloque, hasta que no
+    afecte a ninguna fila.
+    """
+    while True:
+        with db_cursor() as (conn, cursor):
+            cursor.execute(f"{statement} LIMIT %s", params + (DELETION_CHUNK_SIZE,))
+            affected = cursor.rowcount
+            conn.commit()
+        background_jobs.progress(job_id, step, table, affected)
+        if affected < DELETION_CHUNK_SIZE:
+            return
+
+def _update_in_chunks(job_id, step, counter, table, assignments, assignment_params, where_sql, where_params):
+    """
+    Aplica `assignments` a las filas de `table` (con versión de sincronización) que cumplen `where_sql`,
+    que deben dejar de cumplirlo, por bloques de DELETION_CHUNK_SIZE. Cada bloque va en su transacción
+    y su versión se reserva al final, con _commit_row_version.
+    """
+    key = ROW_VERSION_KEYS[table]
+    while True:
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"SELECT {key} FROM {table} WHERE {where_sql} ORDER BY {key} LIMIT %s FOR UPDATE",
+                where_params + (DELETION_CHUNK_SIZE,)
+            )
+            row_ids = [row[0] for row in cursor.fetchall()]
+            if not row_ids:
+                conn.rollback()
+                return
+            placeholders = ', '.join(['%s'] * len(row_ids))
+            cursor.execute(f"UPDATE {table} SET {assignments} WHERE {key} IN ({placeholders})", assignment_params + tuple(row_ids))
+            _commit_row_version(conn, cursor, {table: row_ids})
+        background_jobs.progress(job_id, step, counter, len(row_ids))
+        if len(row_ids) < DELETION_CHUNK_SIZE:
+            return
+
+def _delete_project_job(job_id, project_id):
+    """Borra un proyecto: primero sus tareas por bloques y al final el propio proyecto."""
+    _delete_task_chunks(job_id, 'tasks', 'project_id = %s', (project_id,))
+    with db_cursor() as (conn, cursor):
+        cursor.execute("DELETE FROM projects WHERE project_id = %s", (project_id,))
+        version = _commit_row_version(conn, cursor, tombstones={'project': [(project_id, None)]}, bumps=[('projects', None)])
+    event_bus.publish('project.deleted', {'project_id': project_id, 'version': version})
+    background_jobs.progress(job_id, 'project', 'projects', 1)
+
+def _delete_user_job(job_id, user_id, successor_id):
+    """
+    Borra un usuario y lo que depende de él, por bloques: sus sesiones de enfoque y su resumen diario,
+    las tareas asignadas (con sus objetivos y sesiones), sus notas y recursos. Las tareas que creó
+    quedan sin creador y sus proyectos pasan al administrador que solicitó el borrado (`successor_id`).
+    """
+    _run_in_chunks(job_id, 'focus_sessions', 'focus_sessions', "DELETE FROM focus_sessions WHERE user_id = %s", (user_id,))
+    _run_in_chunks(job_id, 'focus_sessions', 'focus_daily_rollup', "DELETE FROM focus_daily_rollup WHERE user_id = %s", (user_id,))
+    data_versions.bump('focus_sessions', user_id)
+
+    projects = _delete_task_chunks(job_id, 'tasks', 'assigned_to = %s', (user_id,))
+    if projects:
+        # Cambia el número de tareas de esos proyectos
+        with db_cursor() as (conn, cursor):
+            _commit_row_version(conn, cursor, {'projects': projects})
+
+    _update_in_chunks(job_id, 'created_tasks', 'tasks_created_by',
+                      'tasks', "created_by = NULL", (), "created_by = %s", (user_id,))
+    # Cambia el autor en las listas de sus asignados, que no se conocen: se invalidan todas
+    data_versions.bump_all([('tasks', None), ('assigned_tasks', None)])
+    _update_in_chunks(job_id, 'projects', 'projects_transferred',
+                      'projects', "created_by = %s", (successor_id,), "created_by = %s", (user_id,))
+    data_versions.bump('projects')
+    _run_in_chunks(job_id, 'notes', 'notes', "DELETE FROM notes WHERE user_id = %s", (user_id,))
+    data_versions.bump('notes', user_id)
+    _run_in_chunks(job_id, 'resources', 'resources', "DELETE FROM resources WHERE user_id = %s", (user_id,))
+    data_versions.bump('resources', user_id)
+
+    with db_cursor() as (conn, cursor):
+        cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+        data_versions.bump('users', cursor=cursor)
+        conn.commit()
+    background_jobs.progress(job_id, 'user', 'users', 1)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Estado y progreso de un trabajo en segundo plano (solo para quien lo pidió o un administrador)."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+
+    try:
+        job = background_jobs.get(job_id)
+    except mysql.connector.Error as err:
+        print(f"Error consultando el trabajo {job_id}: {err}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+    if job is None or (job['requested_by'] != session['user_id'] and session.get('role') != 'Administrador'):
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(job), 200
+
 # --- Rutas web principales (frontend HTML) ---
 
 @app.route('/')
@@ -136,15 +1763,13 @@ def api_login():
     if not email or not password:
         return jsonify({'error': 'Email y contraseña son requeridos'}), 400
 
-    conn = None
     try:
         print(f"Intentando login para email: {email}")
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Buscar usuario por email
-        cursor.execute("SELECT * FROM users WHERE Email = %s", (email,))
-        user = cursor.fetchone()
+        # La conexión se devuelve al pool antes de verificar la contraseña, que es lo lento
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Buscar usuario por email
+            cursor.execute("SELECT * FROM users WHERE Email = %s", (email,))
+            user = cursor.fetchone()
 
         if not user:
             print(f"Usuario no encontrado para email: {email}")
@@ -154,7 +1779,7 @@ def api_login():
 
         try:
             # Verificar si la contraseña ya está hasheada
-            if bcrypt.check_password_hash(user['Password'], password):
+            if password_hasher.check(user['Password'], password):
                 password_is_correct = True
         except ValueError:
             # Si falla, es posible que la contraseña esté sin hash (en texto plano)
@@ -163,12 +1788,13 @@ def api_login():
                 password_is_correct = True
                 # Se actualiza la contraseña a formato hash
                 print(f"Contraseña en texto plano correcta. Actualizando a hash para el usuario {user['user_id']}...")
-                new_hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-                cursor.execute(
-                    "UPDATE users SET Password = %s WHERE user_id = %s",
-                    (new_hashed_password, user['user_id'])
-                )
-                conn.commit()
+                new_hashed_password = password_hasher.generate(password)
+                with db_cursor() as (conn, cursor):
+                    cursor.execute(
+                        "UPDATE users SET Password = %s WHERE user_id = %s",
+                        (new_hashed_password, user['user_id'])
+                    )
+                    conn.commit()
                 print(f"Contraseña actualizada exitosamente para el usuario {user['user_id']}.")
 
         if password_is_correct:
@@ -190,14 +1816,11 @@ def api_login():
         else:
             return jsonify({'error': 'Email o contraseña incorrectos'}), 401
 
+    except PasswordHasherBusy as err:
+        return _password_busy_response(err)
     except Exception as err:
         print(f"Error en la API de login: {err}")
         return jsonify({'error': f'Error interno del servidor: {err}'}), 500
-
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 @app.route('/logout')
 def logout():
     """
@@ -226,42 +1849,39 @@ def api_register():
     if len(data['password']) < 8:
         return jsonify({'error': 'La contraseña debe tener al menos 8 caracteres.'}), 400
 
-    conn = None
+    # Hashear la contraseña antes de pedir una conexión, para no retenerla mientras dura bcrypt
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        hashed_password = password_hasher.generate(data['password'])
+    except PasswordHasherBusy as err:
+        return _password_busy_response(err)
 
-        # Verificar duplicados de email o nombre de usuario
-        cursor.execute("SELECT user_id FROM users WHERE Email = %s OR username = %s", (data['email'], data['username']))
-        if cursor.fetchone():
-            return jsonify({'error': 'El email o el nombre de usuario ya están en uso.'}), 409
-
-        # Hashear la contraseña
-        hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+    try:
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Verificar duplicados de email o nombre de usuario
+            cursor.execute("SELECT user_id FROM users WHERE Email = %s OR username = %s", (data['email'], data['username']))
+            if cursor.fetchone():
+                return jsonify({'error': 'El email o el nombre de usuario ya están en uso.'}), 409
 
-        # Insertar nuevo usuario
-        cursor.execute("""
-            INSERT INTO users (first_name, last_name, username, Email, Password, role, is_email_verified)
-            VALUES (%s, %s, %s, %s, %s, %s, TRUE)
-        """, (
-            data['first_name'],
-            data.get('last_name', ''),
-            data['username'],
-            data['email'],
-            hashed_password,
-            'Colaborador'  # Rol por defecto
-        ))
-        conn.commit()
+            # Insertar nuevo usuario
+            cursor.execute("""
+                INSERT INTO users (first_name, last_name, username, Email, Password, role, is_email_verified)
+                VALUES (%s, %s, %s, %s, %s, %s, TRUE)
+            """, (
+                data['first_name'],
+                data.get('last_name', ''),
+                data['username'],
+                data['email'],
+                hashed_password,
+                'Colaborador'  # Rol por defecto
+            ))
+            data_versions.bump('users', cursor=cursor)
+            conn.commit()
 
-        return jsonify({'message': 'Registro exitoso. Ahora puedes iniciar sesión.'}), 201
+            return jsonify({'message': 'Registro exitoso. Ahora puedes iniciar sesión.'}), 201
 
     except mysql.connector.Error as err:
         print(f"Error durante el registro: {err}")
         return jsonify({'error': f'Error de base de datos: {err}'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # --- Solicitud para restablecimiento de contraseña (sin envío de correo) ---
 @app.route('/api/forgot-password', methods=['POST'])
@@ -278,37 +1898,30 @@ def api_forgot_password():
     if not email:
         return jsonify({'error': 'Email es requerido'}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Buscar usuario con ese email
+            cursor.execute("SELECT user_id, Email FROM users WHERE Email = %s", (email,))
+            user = cursor.fetchone()
 
-        # Buscar usuario con ese email
-        cursor.execute("SELECT user_id, Email FROM users WHERE Email = %s", (email,))
-        user = cursor.fetchone()
+            if user:
+                token = secrets.token_urlsafe(32)  # Token seguro
+                expiration = datetime.now() + timedelta(hours=1)  # Validez de 1 hora
 
-        if user:
-            token = secrets.token_urlsafe(32)  # Token seguro
-            expiration = datetime.now() + timedelta(hours=1)  # Validez de 1 hora
-
-            # Guardar token y fecha de expiración en la base de datos
-            cursor.execute(
-                "UPDATE users SET password_reset_token = %s, reset_token_expiration = %s WHERE user_id = %s",
-                (token, expiration, user['user_id'])
-            )
-            conn.commit()
-            # NOTA: El envío de correo fue removido intencionalmente
+                # Guardar token y fecha de expiración en la base de datos
+                cursor.execute(
+                    "UPDATE users SET password_reset_token = %s, reset_token_expiration = %s WHERE user_id = %s",
+                    (token, expiration, user['user_id'])
+                )
+                conn.commit()
+                # NOTA: El envío de correo fue removido intencionalmente
 
-        # Respuesta genérica siempre, aunque el email no exista
-        return jsonify({'message': 'Si existe una cuenta con ese email, se ha generado un enlace de restablecimiento.'}), 200
+            # Respuesta genérica siempre, aunque el email no exista
+            return jsonify({'message': 'Si existe una cuenta con ese email, se ha generado un enlace de restablecimiento.'}), 200
 
     except Exception as e:
         print(f"Error en forgot-password: {e}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # --- Restablecimiento de contraseña usando el token ---
 @app.route('/api/reset-password', methods=['POST'])
@@ -329,41 +1942,142 @@ def api_reset_password():
     if len(password) < 8:
         return jsonify({'error': 'La contraseña debe tener al menos 8 caracteres.'}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Buscar usuario con el token
-        cursor.execute(
-            "SELECT user_id, reset_token_expiration FROM users WHERE password_reset_token = %s",
-            (token,)
-        )
-        user = cursor.fetchone()
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Buscar usuario con el token
+            cursor.execute(
+                "SELECT user_id, reset_token_expiration FROM users WHERE password_reset_token = %s",
+                (token,)
+            )
+            user = cursor.fetchone()
 
         # Validación de token y expiración
         if not user or user['reset_token_expiration'] < datetime.now():
             return jsonify({'error': 'El enlace es inválido o ha expirado.'}), 400
 
-        # Hashear nueva contraseña y limpiar el token
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-        cursor.execute(
-            "UPDATE users SET Password = %s, password_reset_token = NULL, reset_token_expiration = NULL WHERE user_id = %s",
-            (hashed_password, user['user_id'])
-        )
-        conn.commit()
+        # Hashear la nueva contraseña sin retener una conexión del pool
+        hashed_password = password_hasher.generate(password)
+
+        with db_cursor() as (conn, cursor):
+            # Limpiar el token; si otra petición lo usó mientras tanto, no se actualiza nada
+            cursor.execute(
+                "UPDATE users SET Password = %s, password_reset_token = NULL, reset_token_expiration = NULL "
+                "WHERE user_id = %s AND password_reset_token = %s",
+                (hashed_password, user['user_id'], token)
+            )
+            conn.commit()
+            if cursor.rowcount == 0:
+                return jsonify({'error': 'El enlace es inválido o ha expirado.'}), 400
 
         return jsonify({'message': 'Contraseña actualizada exitosamente. Ahora puedes iniciar sesión.'}), 200
 
+    except PasswordHasherBusy as err:
+        return _password_busy_response(err)
     except Exception as e:
         print(f"Error en reset-password: {e}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # --- Resumen de análisis del dashboard ---
+def _focus_rollup_bounds(start, end):
+    """
+    Divide el intervalo [start, end) para sumar el tiempo de enfoque: los días completos, [first_day,
+    last_day), salen de `focus_daily_rollup`, y los tramos de día suelto de los bordes, de
+    `focus_sessions`. Devuelve (first_day, last_day, tramos) con dos tramos (inicio, fin), quizá vacíos.
+    """
+    start_midnight = datetime.combine(start.date(), datetime.min.time())
+    first_day = start_midnight if start == start_midnight else start_midnight + timedelta(days=1)
+    last_day = datetime.combine(end.date(), datetime.min.time())
+    if first_day >= last_day:
+        # Sin ningún día completo: todo el intervalo se suma desde las sesiones
+        return first_day.date(), first_day.date(), ((start, end), (end, end))
+    return first_day.date(), last_day.date(), ((start, first_day), (last_day, end))
+
+def _analytics_summary(user_id, start_date_str=None, end_date_str=None):
+    """
+    Calcula el resumen de analítica de un usuario en una sola consulta y lo guarda en caché por
+    (usuario, rango de fechas) hasta que cambian las tareas asignadas, las sesiones de enfoque del
+    usuario o los objetivos. Lanza ValueError si las fechas no tienen formato YYYY-MM-DD.
+    Un acierto de caché no es gratis: cuesta la lectura del sello, una consulta a `data_versions` por
+    clave primaria (seis filas: global y del usuario de cada tabla). Es deliberado, porque es lo que
+    invalida la entrada en cuanto otro proceso confirma una escritura, y sigue siendo mucho más barato
+    que las cuatro subconsultas del resumen.
+    """
+    if start_date_str and end_date_str:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1)
+        # Las tareas se filtran por el rango cerrado, igual que BETWEEN
+        completed_filter_sql = " AND COALESCE(completed_at, due_date) BETWEEN %s AND %s"
+        completed_params = [start_date, end_date]
+        cache_key = (user_id, start_date_str, end_date_str)
+    else:
+        # Por defecto: últimos 7 días
+        start_date = datetime.now() - timedelta(days=7)
+        end_date = datetime.now()
+        completed_filter_sql = " AND COALESCE(completed_at, due_date) >= %s"
+        completed_params = [start_date]
+        cache_key = (user_id, 'last_7_days')
+    first_day, last_day, focus_edges = _focus_rollup_bounds(start_date, end_date)
+
+    stamp = data_versions.stamp(('assigned_tasks', user_id), ('focus_sessions', user_id), ('focus_objectives', user_id))
+    summary = analytics_cache.get(cache_key, stamp)
+    if summary is not None:
+        return summary
+
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute(f"""
+            SELECT
+                -- 1. Tareas completadas
+                (SELECT COUNT(*)
+                 FROM tasks
+                 WHERE assigned_to = %s
+                   AND status = 'completada'
+                   {completed_filter_sql}) AS completed_tasks,
+                -- 2. Tiempo de enfoque (en segundos): días completos desde el resumen diario y
+                --    los días sueltos de los bordes desde las sesiones (idx_focus_sessions_user_start)
+                (SELECT COALESCE(SUM(total_seconds), 0)
+                 FROM focus_daily_rollup
+                 WHERE user_id = %s
+                   AND day >= %s
+                   AND day < %s)
+                + (SELECT COALESCE(SUM(duration_seconds), 0)
+                   FROM focus_sessions
+                   WHERE user_id = %s
+                     AND ((start_time >= %s AND start_time < %s)
+                          OR (start_time >= %s AND start_time < %s))) AS focus_seconds,
+                -- 3. Objetivos completados en el periodo
+                (SELECT COUNT(*)
+                 FROM focus_objectives fo
+                 JOIN tasks t ON fo.task_id = t.task_id
+                 WHERE t.assigned_to = %s
+                   AND fo.completed = 1
+                   AND fo.created_at >= %s AND fo.created_at < %s) AS completed_objectives,
+                -- 4. Proyectos colaborativos (más de un usuario asignado)
+                (SELECT COUNT(*)
+                 FROM (
+                     SELECT project_id
+                     FROM tasks
+                     WHERE project_id IS NOT NULL
+                     GROUP BY project_id
+                     HAVING COUNT(DISTINCT assigned_to) > 1
+                 ) AS collaborative) AS collaborative_projects
+        """, (
+            user_id, *completed_params,
+            user_id, first_day, last_day,
+            user_id, *(bound for edge in focus_edges for bound in edge),
+            user_id, start_date, end_date,
+        ))
+        row = cursor.fetchone()
+
+    summary = {
+        'completedThisWeek': row['completed_tasks'],
+        'productivityChange': 0,  # Productividad (aún no implementada, placeholder)
+        'focusMinutesThisWeek': round(row['focus_seconds'] / 60),
+        'objectivesCompletedThisWeek': row['completed_objectives'],
+        'collaborativeProjectsCount': row['collaborative_projects']
+    }
+    analytics_cache.set(cache_key, stamp, summary)
+    return summary
+
 @app.route('/api/analytics/summary', methods=['GET'])
 def get_analytics_summary():
     """
@@ -382,102 +2096,76 @@ def get_analytics_summary():
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
 
-    date_filter_sql = ""
-    date_params = []
-
-    if start_date_str and end_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1)
-            date_filter_sql = " AND COALESCE(t.completed_at, t.due_date) BETWEEN %s AND %s"
-            date_params = [start_date, end_date]
-        except ValueError:
-            return jsonify({'error': 'Formato de fecha inválido. Usar YYYY-MM-DD.'}), 400
-    else:
-        # Por defecto: últimos 7 días
-        start_date = datetime.now() - timedelta(days=7)
-        date_filter_sql = " AND COALESCE(t.completed_at, t.due_date) >= %s"
-        date_params = [start_date]
-
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        summary = _analytics_summary(user_id, start_date_str, end_date_str)
+        return jsonify(summary)
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido. Usar YYYY-MM-DD.'}), 400
+    except mysql.connector.Error as err:
+        print(f"Error getting analytics summary: {err}")
+        return jsonify({'error': str(err)}), 500
 
-        # 1. Tareas completadas
-        query = f"""
-            SELECT COUNT(*) 
-            FROM tasks 
-            WHERE assigned_to = %s 
-              AND status = 'completada'
-              {date_filter_sql.replace('t.completed_at', 'completed_at').replace('t.due_date', 'due_date')}
-        """
-        cursor.execute(query, (user_id, *date_params))
-        completed_this_week = cursor.fetchone()[0]
-
-        # 2. Productividad (aún no implementada, placeholder)
-        productivity = 0
-
-        # 3. Tiempo de enfoque (en minutos)
-        cursor.execute("""
-            SELECT COALESCE(SUM(duration_seconds), 0) 
-            FROM focus_sessions 
-            WHERE user_id = %s 
-              AND start_time >= %s
-              AND start_time < %s
-              AND end_time IS NOT NULL
-        """, (user_id, start_date, end_date if 'end_date' in locals() else datetime.now()))
-        focus_seconds_this_week = cursor.fetchone()[0]
-        focus_minutes_this_week = round(focus_seconds_this_week / 60)
+# --- Sesión de enfoque activa ---
+# La sesión abierta de cada usuario se busca por el índice único de `active_user_id` (migración 0009),
+# que además impide que un usuario tenga dos abiertas aunque las inicien procesos distintos.
+ACTIVE_FOCUS_SESSION_SQL = """
+    SELECT session_id, task_id, start_time
+    FROM focus_sessions
+    WHERE active_user_id = %s
+"""
+
+def _get_active_focus_session(user_id):
+    """Devuelve la sesión de enfoque abierta del usuario (session_id, task_id, start_time) o None."""
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute(ACTIVE_FOCUS_SESSION_SQL, (user_id,))
+        return cursor.fetchone()
+
+FOCUS_ROLLUP_UPSERT_SQL = """
+    INSERT INTO focus_daily_rollup (user_id, day, task_id, total_seconds, session_count)
+    VALUES (%s, %s, %s, %s, 1)
+    ON DUPLICATE KEY UPDATE
+        total_seconds = total_seconds + VALUES(total_seconds),
+        session_count = session_count + 1
+"""
+
+def _finish_active_session(user_id):
+    """
+    Cierra la sesión activa del usuario registrando su fin y duración.
+    Devuelve (session_id, duration_seconds) o None si no había sesión activa.
+    La fila se bloquea al leerla, así que si dos peticiones la cierran a la vez (en el mismo proceso
+    o en otro) solo la primera la registra; la segunda ya no la encuentra abierta.
+    """
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute(ACTIVE_FOCUS_SESSION_SQL + " FOR UPDATE", (user_id,))
+        active = cursor.fetchone()
+        if not active:
+            conn.rollback()
+            return None
 
-        # 4. Objetivos completados esta semana
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM focus_objectives fo
-            JOIN tasks t ON fo.task_id = t.task_id
-            WHERE t.assigned_to = %s 
-              AND fo.completed = 1
-              AND fo.created_at >= %s AND fo.created_at < %s
-        """, (user_id, start_date, end_date if 'end_date' in locals() else datetime.now()))
-        objectives_completed_this_week = cursor.fetchone()[0]
-
-        # 5. Número de proyectos colaborativos (más de un usuario asignado)
+        end_time = datetime.now()
+        duration_seconds = int((end_time - active['start_time']).total_seconds())
         cursor.execute("""
-            SELECT COUNT(DISTINCT p.project_id)
-            FROM projects p
-            WHERE p.project_id IN (
-                SELECT DISTINCT t.project_id 
-                FROM tasks t 
-                WHERE t.project_id IS NOT NULL
-                GROUP BY t.project_id 
-                HAVING COUNT(DISTINCT t.assigned_to) > 1
-            )
-        """)
-        collaborative_projects_count = cursor.fetchone()[0]
-
-        # Retorna el resumen
-        return jsonify({
-            'completedThisWeek': completed_this_week,
-            'productivityChange': productivity,
-            'focusMinutesThisWeek': focus_minutes_this_week,
-            'objectivesCompletedThisWeek': objectives_completed_this_week,
-            'collaborativeProjectsCount': collaborative_projects_count
-        })
-
-    except mysql.connector.Error as err:
-        print(f"Error getting analytics summary: {err}")
-        return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+            UPDATE focus_sessions 
+            SET end_time = %s, duration_seconds = %s 
+            WHERE session_id = %s
+        """, (end_time, duration_seconds, active['session_id']))
+        # Acumula la sesión en el resumen diario dentro de la misma transacción
+        cursor.execute(FOCUS_ROLLUP_UPSERT_SQL, (
+            user_id, active['start_time'].date(), active['task_id'] or 0, duration_seconds
+        ))
+        data_versions.bump('focus_sessions', user_id, cursor=cursor)
+        conn.commit()
+    event_bus.publish('focus.stopped', {
+        'session_id': active['session_id'], 'task_id': active['task_id'], 'duration_seconds': duration_seconds
+    }, user_ids=[user_id])
+    return active['session_id'], duration_seconds
 
 # --- API Endpoints: Focus Sessions ---
 @app.route('/api/focus/start_session', methods=['POST'])
 def start_focus_session():
     """
     Inicia una nueva sesión de enfoque para una tarea específica.
-    - Verifica que no exista ya una sesión activa.
+    - El índice único de `active_user_id` rechaza una segunda sesión activa del usuario.
     - Registra el `task_id` y la hora de inicio.
     """
     if 'user_id' not in session:
@@ -489,28 +2177,25 @@ def start_focus_session():
     if not task_id:
         return jsonify({'error': 'task_id es requerido'}), 400
 
-    conn = None
+    user_id = session['user_id']
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Verifica si ya hay una sesión activa
-        cursor.execute("""
-            SELECT session_id FROM focus_sessions 
-            WHERE user_id = %s AND end_time IS NULL
-        """, (session['user_id'],))
-        active_session = cursor.fetchone()
-        if active_session:
-            return jsonify({'error': 'Ya hay una sesión activa'}), 400
-
-        # Inicia la sesión
-        start_time = datetime.now()
-        cursor.execute("""
-            INSERT INTO focus_sessions (user_id, task_id, start_time)
-            VALUES (%s, %s, %s)
-        """, (session['user_id'], task_id, start_time))
-        conn.commit()
-        session_id = cursor.lastrowid
+        with db_cursor() as (conn, cursor):
+            # Inicia la sesión; si ya hay una activa, la inserción viola el índice único
+            start_time = datetime.now()
+            try:
+                cursor.execute("""
+                    INSERT INTO focus_sessions (user_id, task_id, start_time)
+                    VALUES (%s, %s, %s)
+                """, (user_id, task_id, start_time))
+            except mysql.connector.IntegrityError as err:
+                if err.errno != errorcode.ER_DUP_ENTRY:
+                    raise
+                conn.rollback()
+                return jsonify({'error': 'Ya hay una sesión activa'}), 400
+            session_id = cursor.lastrowid
+            data_versions.bump('focus_sessions', user_id, cursor=cursor)
+            conn.commit()
+        event_bus.publish('focus.started', {'session_id': session_id, 'task_id': task_id}, user_ids=[user_id])
 
         return jsonify({
             'session_id': session_id,
@@ -521,10 +2206,6 @@ def start_focus_session():
     except mysql.connector.Error as err:
         print(f"Error starting focus session: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 #finalizacion del modo eenfoque
 @app.route('/api/focus/end_session', methods=['POST'])
@@ -536,33 +2217,12 @@ def end_focus_session():
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Buscar sesión activa más reciente
-        cursor.execute("""
-            SELECT session_id, start_time FROM focus_sessions 
-            WHERE user_id = %s AND end_time IS NULL
-            ORDER BY start_time DESC LIMIT 1
-        """, (session['user_id'],))
-        active_session = cursor.fetchone()
-        if not active_session:
+        finished = _finish_active_session(session['user_id'])
+        if not finished:
             return jsonify({'error': 'No hay sesión activa'}), 400
 
-        session_id, start_time = active_session
-        end_time = datetime.now()
-        duration_seconds = int((end_time - start_time).total_seconds())
-
-        # Actualiza la sesión
-        cursor.execute("""
-            UPDATE focus_sessions 
-            SET end_time = %s, duration_seconds = %s 
-            WHERE session_id = %s
-        """, (end_time, duration_seconds, session_id))
-        conn.commit()
-
+        session_id, duration_seconds = finished
         return jsonify({
             'session_id': session_id,
             'duration_seconds': duration_seconds,
@@ -573,31 +2233,15 @@ def end_focus_session():
     except mysql.connector.Error as err:
         print(f"Error ending focus session: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/focus/active_session', methods=['GET'])
 def get_active_session():
-    """Checks for and returns the active focus session."""
+    """Checks for and returns the active focus session (one unique-index lookup)."""
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT session_id, task_id, start_time 
-            FROM focus_sessions 
-            WHERE user_id = %s AND end_time IS NULL
-            ORDER BY start_time DESC LIMIT 1
-        """, (session['user_id'],))
-        
-        active_session = cursor.fetchone()
-        
+        active_session = _get_active_focus_session(session['user_id'])
         if active_session:
             # Convert datetime to ISO format string for JSON compatibility
             active_session['start_time'] = active_session['start_time'].isoformat()
@@ -608,10 +2252,6 @@ def get_active_session():
     except mysql.connector.Error as err:
         print(f"Error checking for active session: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 #Obtener secion activa actual
 @app.route('/api/focus/discard_session', methods=['POST'])
@@ -624,199 +2264,168 @@ def discard_focus_session():
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Find the active session to end it, not delete it.
-        cursor.execute("""
-            SELECT session_id, start_time FROM focus_sessions 
-            WHERE user_id = %s AND end_time IS NULL
-            ORDER BY start_time DESC LIMIT 1
-        """, (session['user_id'],))
-        
-        active_session = cursor.fetchone()
-        
-        if not active_session:
+        if not _finish_active_session(session['user_id']):
             return jsonify({'message': 'No se encontró ninguna sesión activa para descartar.'}), 200
         
-        session_id, start_time = active_session
-        end_time = datetime.now()
-        duration_seconds = int((end_time - start_time).total_seconds())
-        
-        # Registra la sesión correctamente actualizando su hora de finalización y duración.
-        cursor.execute("UPDATE focus_sessions SET end_time = %s, duration_seconds = %s WHERE session_id = %s", (end_time, duration_seconds, session_id))
-        conn.commit()
-        
         return jsonify({'message': 'La sesión activa ha sido finalizada y registrada.'}), 200
     except mysql.connector.Error as err:
         print(f"Error discarding focus session: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/focus/pause_session', methods=['POST'])
 def pause_focus_session():
     """Pauses an active session (by ending it)."""
     return end_focus_session()
 
+FOCUS_SESSION_COLUMNS = {
+    'session_id': 'fs.session_id',
+    'task_id': 'fs.task_id',
+    'task_title': 't.title',
+    'start_time': 'fs.start_time',
+    'end_time': 'fs.end_time',
+    'duration_seconds': 'fs.duration_seconds',
+    'duration_minutes': 'ROUND(fs.duration_seconds / 60.0, 1)',
+}
+
 @app.route('/api/focus/sessions', methods=['GET'])
 def get_focus_sessions():
-    """Gets a list of a user's focus sessions."""
+    """Gets a list of a user's focus sessions. Supports `fields=` and `format=columnar`."""
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
     
     days = request.args.get('days', 7, type=int)
+    try:
+        fields = _parse_fields_arg(FOCUS_SESSION_COLUMNS)
+        response_format = _parse_format_arg()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    join_sql = ''
+    if not fields or 'task_title' in fields:
+        join_sql = "\n                LEFT JOIN tasks t ON fs.task_id = t.task_id"
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        date_filter = datetime.now() - timedelta(days=days)
+        with db_cursor(dictionary=True) as (conn, cursor):
+            date_filter = datetime.now() - timedelta(days=days)
         
-        cursor.execute("""
-            SELECT 
-                fs.session_id,
-                fs.task_id,
-                t.title AS task_title,
-                fs.start_time,
-                fs.end_time,
-                fs.duration_seconds,
-                ROUND(fs.duration_seconds / 60.0, 1) AS duration_minutes
-            FROM focus_sessions fs
-            LEFT JOIN tasks t ON fs.task_id = t.task_id
-            WHERE fs.user_id = %s 
-              AND fs.start_time >= %s
-              AND fs.end_time IS NOT NULL
-            ORDER BY fs.start_time DESC
-        """, (session['user_id'], date_filter))
+            cursor.execute(f"""
+                SELECT 
+                    {_select_sql(FOCUS_SESSION_COLUMNS, fields)}
+                FROM focus_sessions fs{join_sql}
+                WHERE fs.user_id = %s 
+                  AND fs.start_time >= %s
+                  AND fs.end_time IS NOT NULL
+                ORDER BY fs.start_time DESC
+            """, (session['user_id'], date_filter))
         
-        sessions = cursor.fetchall()
+            sessions = cursor.fetchall()
         
-        return jsonify(sessions), 200
+            return _rows_response(sessions, fields or list(FOCUS_SESSION_COLUMNS), response_format), 200
         
     except mysql.connector.Error as err:
         print(f"Error getting focus sessions: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # --- API Endpoints: Focus Stats ---
 @app.route('/api/focus/stats', methods=['GET'])
 def get_focus_stats():
-    """Gets detailed focus mode statistics for a user."""
+    """
+    Obtiene estadísticas detalladas del modo enfoque de un usuario.
+    Los totales de sesiones salen de `focus_daily_rollup` (días completos), así que el coste crece con
+    el número de días del periodo y no con el de sesiones.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
     
     user_id = session['user_id']
     days = request.args.get('days', 30, type=int)
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        date_filter = datetime.now() - timedelta(days=days)
-        
-        # 1. Total focus time (minutes)
-        cursor.execute("""
-            SELECT COALESCE(SUM(duration_seconds), 0) AS total_seconds
-            FROM focus_sessions 
-            WHERE user_id = %s 
-              AND start_time >= %s
-              AND end_time IS NOT NULL
-        """, (user_id, date_filter))
-        total_seconds = cursor.fetchone()['total_seconds']
-        total_minutes = round(total_seconds / 60)
+        with db_cursor(dictionary=True) as (conn, cursor):
+            date_filter = datetime.now() - timedelta(days=days)
+            first_day = date_filter.date()
         
-        # 2. Número de sesiones completadas
-        cursor.execute("""
-            SELECT COUNT(*) AS session_count
-            FROM focus_sessions 
-            WHERE user_id = %s 
-              AND start_time >= %s
-              AND end_time IS NOT NULL
-        """, (user_id, date_filter))
-        session_count = cursor.fetchone()['session_count']
+            # 1. Total focus time (minutes) y 2. número de sesiones completadas
+            cursor.execute("""
+                SELECT
+                    COALESCE(SUM(total_seconds), 0) AS total_seconds,
+                    COALESCE(SUM(session_count), 0) AS session_count
+                FROM focus_daily_rollup
+                WHERE user_id = %s 
+                  AND day >= %s
+            """, (user_id, first_day))
+            totals = cursor.fetchone()
+            total_minutes = round(totals['total_seconds'] / 60)
+            session_count = int(totals['session_count'])
         
-        # 3. Duración media por sesión
-        avg_duration = round(total_minutes / session_count) if session_count > 0 else 0
+            # 3. Duración media por sesión
+            avg_duration = round(total_minutes / session_count) if session_count > 0 else 0
         
-        # 4. Objetivos totales y cumplidos
-        cursor.execute("""
-            SELECT 
-                COUNT(*) AS total_objectives,
-                SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) AS completed_objectives
-            FROM focus_objectives fo
-            JOIN tasks t ON fo.task_id = t.task_id
-            WHERE t.assigned_to = %s 
-              AND fo.created_at >= %s
-        """, (user_id, date_filter))
-        objectives_data = cursor.fetchone()
-        total_objectives = objectives_data['total_objectives']
-        completed_objectives = objectives_data['completed_objectives']
+            # 4. Objetivos totales y cumplidos
+            cursor.execute("""
+                SELECT 
+                    COUNT(*) AS total_objectives,
+                    SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) AS completed_objectives
+                FROM focus_objectives fo
+                JOIN tasks t ON fo.task_id = t.task_id
+                WHERE t.assigned_to = %s 
+                  AND fo.created_at >= %s
+            """, (user_id, date_filter))
+            objectives_data = cursor.fetchone()
+            total_objectives = objectives_data['total_objectives']
+            completed_objectives = objectives_data['completed_objectives']
         
-        # 5. Tasa de finalización del objetivo
-        completion_rate = round((completed_objectives / total_objectives) * 100) if total_objectives > 0 else 0
+            # 5. Tasa de finalización del objetivo
+            completion_rate = round((completed_objectives / total_objectives) * 100) if total_objectives > 0 else 0
         
-        # 6. Las 5 tareas más enfocadas
-        cursor.execute("""
-            SELECT 
-                t.title AS task_title,
-                COUNT(fs.session_id) AS session_count,
-                COALESCE(SUM(fs.duration_seconds), 0) AS total_seconds,
-                ROUND(COALESCE(SUM(fs.duration_seconds), 0) / 60.0, 1) AS total_minutes
-            FROM focus_sessions fs
-            JOIN tasks t ON fs.task_id = t.task_id
-            WHERE fs.user_id = %s 
-              AND fs.start_time >= %s
-              AND fs.end_time IS NOT NULL
-            GROUP BY fs.task_id, t.title
-            ORDER BY total_seconds DESC
-            LIMIT 5
-        """, (user_id, date_filter))
-        top_tasks = cursor.fetchall()
+            # 6. Las 5 tareas más enfocadas
+            cursor.execute("""
+                SELECT 
+                    t.title AS task_title,
+                    CAST(SUM(r.session_count) AS UNSIGNED) AS session_count,
+                    COALESCE(SUM(r.total_seconds), 0) AS total_seconds,
+                    ROUND(COALESCE(SUM(r.total_seconds), 0) / 60.0, 1) AS total_minutes
+                FROM focus_daily_rollup r
+                JOIN tasks t ON r.task_id = t.task_id
+                WHERE r.user_id = %s 
+                  AND r.day >= %s
+                GROUP BY r.task_id, t.title
+                ORDER BY total_seconds DESC
+                LIMIT 5
+            """, (user_id, first_day))
+            top_tasks = cursor.fetchall()
         
-        # 7. Distribución del tiempo por día de la semana
-        cursor.execute("""
-            SELECT 
-                DAYNAME(fs.start_time) AS day_name,
-                COALESCE(SUM(fs.duration_seconds), 0) AS total_seconds,
-                ROUND(COALESCE(SUM(fs.duration_seconds), 0) / 60.0, 1) AS total_minutes
-            FROM focus_sessions fs
-            WHERE fs.user_id = %s 
-              AND fs.start_time >= %s
-              AND fs.end_time IS NOT NULL
-            GROUP BY DAYOFWEEK(fs.start_time), DAYNAME(fs.start_time)
-            ORDER BY DAYOFWEEK(fs.start_time)
-        """, (user_id, date_filter))
-        daily_distribution = cursor.fetchall()
+            # 7. Distribución del tiempo por día de la semana
+            cursor.execute("""
+                SELECT 
+                    DAYNAME(r.day) AS day_name,
+                    COALESCE(SUM(r.total_seconds), 0) AS total_seconds,
+                    ROUND(COALESCE(SUM(r.total_seconds), 0) / 60.0, 1) AS total_minutes
+                FROM focus_daily_rollup r
+                WHERE r.user_id = %s 
+                  AND r.day >= %s
+                GROUP BY DAYOFWEEK(r.day), DAYNAME(r.day)
+                ORDER BY DAYOFWEEK(r.day)
+            """, (user_id, first_day))
+            daily_distribution = cursor.fetchall()
         
-        return jsonify({
-            'period_days': days,
-            'total_focus_minutes': total_minutes,
-            'total_sessions': session_count,
-            'avg_session_duration': avg_duration,
-            'total_objectives': total_objectives,
-            'completed_objectives': completed_objectives,
-            'objective_completion_rate': completion_rate,
-            'top_focused_tasks': top_tasks,
-            'daily_distribution': daily_distribution
-        }), 200
+            return jsonify({
+                'period_days': days,
+                'total_focus_minutes': total_minutes,
+                'total_sessions': session_count,
+                'avg_session_duration': avg_duration,
+                'total_objectives': total_objectives,
+                'completed_objectives': completed_objectives,
+                'objective_completion_rate': completion_rate,
+                'top_focused_tasks': top_tasks,
+                'daily_distribution': daily_distribution
+            }), 200
         
     except mysql.connector.Error as err:
         print(f"Error getting focus stats: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # --- Puntos finales de API: análisis e informes ---
 @app.route('/api/analytics/project_assignments', methods=['GET'])
@@ -835,30 +2444,24 @@ def get_project_assignments_distribution():
         date_filter_sql = " AND t.created_at BETWEEN %s AND %s"
         params.extend([start_date_str, end_date_str])
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        query = f"""
-            SELECT 
-                u.username,
-                COUNT(DISTINCT t.project_id) AS project_count
-            FROM tasks t
-            JOIN users u ON t.assigned_to = u.user_id
-            WHERE t.project_id IS NOT NULL {date_filter_sql}
-            GROUP BY u.user_id, u.username
-            HAVING project_count > 0
-            ORDER BY project_count DESC;"""
-        cursor.execute(query, tuple(params))
-        distribution_data = cursor.fetchall()
-        return jsonify(distribution_data)
+        with db_cursor(dictionary=True) as (conn, cursor):
+            query = f"""
+                SELECT 
+                    u.username,
+                    COUNT(DISTINCT t.project_id) AS project_count
+                FROM tasks t
+                JOIN users u ON t.assigned_to = u.user_id
+                WHERE t.project_id IS NOT NULL {date_filter_sql}
+                GROUP BY u.user_id, u.username
+                HAVING project_count > 0
+                ORDER BY project_count DESC;"""
+            cursor.execute(query, tuple(params))
+            distribution_data = cursor.fetchall()
+            return jsonify(distribution_data)
     except mysql.connector.Error as err:
         print(f"Error getting project assignments distribution: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/export/csv', methods=['GET'])
 def export_data_as_csv():
@@ -870,51 +2473,44 @@ def export_data_as_csv():
         return jsonify({'error': 'No autenticado'}), 401
     user_id = session['user_id']
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Una consulta completa para obtener detalles de tareas y proyectos para exportar
-        cursor.execute("""
-            SELECT 
-                t.task_id,
-                t.title AS task_title,
-                t.description,
-                t.status,
-                t.worseness AS priority,
-                t.due_date,
-                t.completed_at,
-                t.created_at,
-                p.title AS project_name,
-                u_assigned.username AS assigned_to_user
-            FROM tasks t
-            LEFT JOIN projects p ON t.project_id = p.project_id
-            LEFT JOIN users u_assigned ON t.assigned_to = u_assigned.user_id
-            WHERE t.assigned_to = %s OR t.created_by = %s
-            ORDER BY t.created_at DESC
-        """, (user_id, user_id))
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Una consulta completa para obtener detalles de tareas y proyectos para exportar
+            cursor.execute("""
+                SELECT 
+                    t.task_id,
+                    t.title AS task_title,
+                    t.description,
+                    t.status,
+                    t.worseness AS priority,
+                    t.due_date,
+                    t.completed_at,
+                    t.created_at,
+                    p.title AS project_name,
+                    u_assigned.username AS assigned_to_user
+                FROM tasks t
+                LEFT JOIN projects p ON t.project_id = p.project_id
+                LEFT JOIN users u_assigned ON t.assigned_to = u_assigned.user_id
+                WHERE t.assigned_to = %s OR t.created_by = %s
+                ORDER BY t.created_at DESC
+            """, (user_id, user_id))
         
-        tasks = cursor.fetchall()
+            tasks = cursor.fetchall()
 
-        if not tasks:
-            return jsonify({'message': 'No hay datos para exportar'}), 404
+            if not tasks:
+                return jsonify({'message': 'No hay datos para exportar'}), 404
 
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(tasks[0].keys())
-        for row in tasks:
-            writer.writerow(row.values())
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(tasks[0].keys())
+            for row in tasks:
+                writer.writerow(row.values())
 
-        output.seek(0)
-        return Response(output, mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=taskmanager_pro_export.csv"})
+            output.seek(0)
+            return Response(output, mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=taskmanager_pro_export.csv"})
     except mysql.connector.Error as err:
         print(f"Error exporting data: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/tasks/completed_count', methods=['GET'])
 def completed_tasks_count():
@@ -923,51 +2519,242 @@ def completed_tasks_count():
         return jsonify({'error': 'No autenticado'}), 401
     user_id = session['user_id']
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM tasks WHERE status = 'completada' AND assigned_to = %s", (user_id,))
-        count = cursor.fetchone()[0]
-        return jsonify({'completed_count': count})
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT COUNT(*) FROM tasks WHERE status = 'completada' AND assigned_to = %s", (user_id,))
+            count = cursor.fetchone()[0]
+            return jsonify({'completed_count': count})
     except Exception as e:
         print(f"Error getting completed tasks count: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # --- Puntos finales de API: Tareas ---
+# Paginación por cursor de /tasks: orden estable por (due_date, task_id)
+TASK_STATUSES = ('pendiente', 'en progreso', 'completada', 'cancelada')
+TASK_WORSENESS = ('Baja', 'media', 'urgente')
+TASKS_PAGE_MAX_LIMIT = 500
+
+# --- Selección de campos (?fields=) y formato columnar (?format=columnar) para listas ---
+def _parse_fields_arg(available):
+    """Lee `?fields=a,b` y lo valida contra las columnas de la lista; None si no se pidió."""
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in available]
+    if unknown or not fields:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown) or '(vacío)'}. Disponibles: {', '.join(available)}")
+    return fields
+
+def _parse_format_arg():
+    """Lee `?format=`: 'objects' (por defecto, un objeto por fila) o 'columnar'."""
+    response_format = request.args.get('format', 'objects')
+    if response_format not in ('objects', 'columnar'):
+        raise ValueError("'format' debe ser 'objects' o 'columnar'")
+    return response_format
+
+def _select_sql(columns, fields):
+    """Lista SELECT con solo las expresiones de `fields` (todas si es None)."""
+    return ',\n                '.join(f"{columns[name]} AS {name}" for name in (fields or columns))
+
+def _rows_response(rows, names, response_format):
+    """
+    Respuesta JSON de una lista de filas (diccionarios) con las columnas `names`. En formato columnar
+    los nombres se envían una sola vez: {"columns": [...], "rows": [[...], ...]}.
+    """
+    if response_format == 'columnar':
+        return jsonify({'columns': names, 'rows': [[row[name] for name in names] for row in rows]})
+    if rows and len(names) != len(rows[0]):
+        rows = [{name: row[name] for name in names} for row in rows]
+    return jsonify(rows)
+
+MULTI_GET_CHUNK = 1000  # Identificadores por consulta en las lecturas múltiples (?ids=)
+
+def _parse_ids_arg(name):
+    """Lee una lista de identificadores separados por comas (`?ids=1,2,3`) sin repetidos."""
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.args.get(name, '').split(',') if value.strip()))
+    except ValueError:
+        raise ValueError(f"'{name}' debe ser una lista de enteros separados por comas") from None
+    if not ids:
+        raise ValueError(f"'{name}' no puede estar vacío")
+    return ids
+
+def _fetch_by_ids(query, ids, key):
+    """
+    Ejecuta `query` (con un `IN ({placeholders})`) por bloques de MULTI_GET_CHUNK identificadores y
+    devuelve un diccionario {id: fila}. Los identificadores que no existen no aparecen.
+    """
+    rows = {}
+    with db_cursor(dictionary=True) as (conn, cursor):
+        for start in range(0, len(ids), MULTI_GET_CHUNK):
+            chunk = ids[start:start + MULTI_GET_CHUNK]
+            cursor.execute(query.format(placeholders=', '.join(['%s'] * len(chunk))), tuple(chunk))
+            for row in cursor.fetchall():
+                rows[row[key]] = row
+    return rows
+
+def _encode_task_cursor(row):
+    """Cursor opaco con la clave de orden (due_date, task_id) de la última tarea de la página."""
+    raw = f"{row['due_date'].isoformat()}|{row['task_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_task_cursor(cursor_token):
+    """Devuelve (due_date, task_id) de un cursor; lanza ValueError si no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor_token + '=' * (-len(cursor_token) % 4)).decode()
+        due_date, task_id = raw.split('|')
+        return datetime.strptime(due_date, '%Y-%m-%d').date(), int(task_id)
+    except (ValueError, UnicodeDecodeError) as err:
+        raise ValueError('Cursor inválido') from err
+
+TASK_COLUMNS = {
+    'task_id': 't.task_id',
+    'project_id': 't.project_id',
+    'project_name': 'p.title',
+    'task_title': 't.title',
+    'description': 't.description',
+    'status': 't.status',
+    'assigned_to': 't.assigned_to',
+    'assigned_username': 'u.username',
+    'due_date': 't.due_date',
+    'worseness': 't.worseness',
+    'completed_at': 't.completed_at',
+    'created_at': 't.created_at',
+    'created_by': 't.created_by',
+}
+
+def _fetch_tasks(user_id, start_date=None, end_date=None, statuses=None, worseness=None,
+                 project_id=None, limit=None, after=None, fields=None):
+    """
+    Tareas asignadas a un usuario ordenadas por (due_date, task_id).
+    Filtros opcionales: rango de vencimiento, estados, prioridades y proyecto. Con `limit` devuelve
+    como máximo esa cantidad a partir de la clave `after` (due_date, task_id), sin OFFSET.
+    Con `fields` solo se seleccionan esas columnas (y la clave de orden), y solo se hacen los JOIN necesarios.
+    """
+    if fields:
+        fields = list(dict.fromkeys(fields + ['task_id', 'due_date']))
+    params = [user_id]
+    filter_sql = ''
+    if start_date:
+        # Filtra por un rango de fechas de vencimiento
+        # Esto es útil para las tarjetas KPI que muestran tareas pendientes o completadas en un rango.
+        filter_sql += " AND t.due_date >= %s"
+        params.append(start_date)
+    if end_date:
+        filter_sql += " AND t.due_date <= %s"
+        params.append(end_date)
+    if statuses:
+        filter_sql += f" AND t.status IN ({', '.join(['%s'] * len(statuses))})"
+        params.extend(statuses)
+    if worseness:
+        filter_sql += f" AND t.worseness IN ({', '.join(['%s'] * len(worseness))})"
+        params.extend(worseness)
+    if project_id is not None:
+        filter_sql += " AND t.project_id = %s"
+        params.append(project_id)
+    if after:
+        after_due, after_id = after
+        filter_sql += " AND (t.due_date > %s OR (t.due_date = %s AND t.task_id > %s))"
+        params.extend([after_due, after_due, after_id])
+    limit_sql = ''
+    if limit:
+        limit_sql = " LIMIT %s"
+        params.append(limit)
+
+    join_sql = ''
+    if not fields or 'assigned_username' in fields:
+        join_sql += "\n            LEFT JOIN users u ON t.assigned_to = u.user_id"
+    if not fields or 'project_name' in fields:
+        join_sql += "\n            LEFT JOIN projects p ON t.project_id = p.project_id"
+
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute(f"""
+            SELECT
+                {_select_sql(TASK_COLUMNS, fields)}
+            FROM tasks t{join_sql}
+            WHERE t.assigned_to = %s{filter_sql}
+            ORDER BY t.due_date ASC, t.task_id ASC{limit_sql}
+        """, tuple(params))
+        return cursor.fetchall()
+
+def _split_list_arg(name, allowed):
+    """Lee un parámetro con valores separados por comas y valida cada uno contra `allowed`."""
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    values = [value.strip() for value in raw.split(',') if value.strip()]
+    invalid = [value for value in values if value not in allowed]
+    if invalid:
+        raise ValueError(f"Valor inválido para '{name}': {', '.join(invalid)}")
+    return values
+
 @app.route('/tasks', methods=['GET'])
+@conditional_get('projects', 'users', per_user=('assigned_tasks',), by_ids=('tasks', 'projects', 'users'))
 def get_tasks():
-    """Gets all tasks assigned to the logged-in user, with optional week filter."""
+    """
+    Obtiene las tareas asignadas al usuario de la sesión, ordenadas por (due_date, task_id).
+    Filtros opcionales: start_date/end_date (rango de vencimiento), status y worseness (separados por
+    comas) y project_id. Con `limit` devuelve una página y, si hay más, la cabecera `X-Next-Cursor`
+    que se vuelve a enviar como `after`. Con `ids=1,2,3` devuelve en su lugar un mapa {task_id: tarea}.
+    `fields=a,b` limita las columnas y `format=columnar` envía los nombres de columna una sola vez.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
     user_id = session['user_id']
 
+    if 'ids' in request.args:
+        return _get_tasks_by_ids()
+
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
 
-    params = [user_id]
-    filter_sql = ''
-    if start_date and end_date:
-        # Filtra por un rango de fechas de vencimiento
-        # Esto es útil para las tarjetas KPI que muestran tareas pendientes o completadas en un rango.
-        filter_sql = " AND t.due_date BETWEEN %s AND %s"
-        params.extend([start_date, end_date])
+    try:
+        for value in (start_date, end_date):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    raise ValueError('Formato de fecha inválido. Usar YYYY-MM-DD.') from None
+        statuses = _split_list_arg('status', TASK_STATUSES)
+        worseness = _split_list_arg('worseness', TASK_WORSENESS)
+        project_id = request.args.get('project_id', type=int)
+        limit = request.args.get('limit', type=int)
+        if limit is not None and not 1 <= limit <= TASKS_PAGE_MAX_LIMIT:
+            raise ValueError(f"'limit' debe estar entre 1 y {TASKS_PAGE_MAX_LIMIT}")
+        after = _decode_task_cursor(request.args['after']) if request.args.get('after') else None
+        fields = _parse_fields_arg(TASK_COLUMNS)
+        response_format = _parse_format_arg()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(f"""
+        # Se pide una fila de más para saber si existe una página siguiente
+        tasks = _fetch_tasks(user_id, start_date, end_date, statuses, worseness, project_id,
+                             limit + 1 if limit else None, after, fields)
+        response = _rows_response(tasks[:limit] if limit else tasks, fields or list(TASK_COLUMNS), response_format)
+        if limit and len(tasks) > limit:
+            response.headers['X-Next-Cursor'] = _encode_task_cursor(tasks[limit - 1])
+        return response
+    except mysql.connector.Error as err:
+        print(f"Error getting tasks: {err}")
+        return jsonify({'error': str(err)}), 500
+
+def _get_tasks_by_ids():
+    """Multi-get de tareas (`/tasks?ids=`): las mismas columnas que /tasks/<task_id>, indexadas por id."""
+    try:
+        ids = _parse_ids_arg('ids')
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    try:
+        tasks = _fetch_by_ids("""
             SELECT 
                 t.task_id, 
                 t.project_id, 
                 p.title AS project_name,
                 t.title AS task_title,
-                t.description,
+                t.description, 
                 t.status, 
                 t.assigned_to,
                 u.username AS assigned_username,
@@ -979,18 +2766,12 @@ def get_tasks():
             FROM tasks t
             LEFT JOIN users u ON t.assigned_to = u.user_id
             LEFT JOIN projects p ON t.project_id = p.project_id
-            WHERE t.assigned_to = %s{filter_sql}
-            ORDER BY t.due_date ASC
-        """, tuple(params))
-        tasks = cursor.fetchall()
+            WHERE t.task_id IN ({placeholders})
+        """, ids, 'task_id')
         return jsonify(tasks)
     except mysql.connector.Error as err:
-        print(f"Error getting tasks: {err}")
+        print(f"Error getting tasks by IDs: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/tasks', methods=['POST'])
 def create_task():
@@ -1009,106 +2790,103 @@ def create_task():
     created_at = datetime.now()
     created_by = session['user_id']
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            INSERT INTO tasks (
-                project_id, title, description, status, assigned_to, 
-                due_date, worseness, created_by, created_at, completed_at
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            data.get('project_id'), data.get('title'), data.get('description'),
-            data.get('status', 'pendiente'), data.get('assigned_to'), 
-            data.get('due_date'), data.get('worseness', 'Baja'),
-            created_by, created_at, completed_at
-        ))
-        conn.commit()
-        task_id = cursor.lastrowid
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                INSERT INTO tasks (
+                    project_id, title, description, status, assigned_to, 
+                    due_date, worseness, created_by, created_at, completed_at
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                data.get('project_id'), data.get('title'), data.get('description'),
+                data.get('status', 'pendiente'), data.get('assigned_to'), 
+                data.get('due_date'), data.get('worseness', 'Baja'),
+                created_by, created_at, completed_at
+            ))
+            task_id = cursor.lastrowid
+            # El número de tareas del proyecto cambia: el proyecto también debe sincronizarse
+            version = _commit_row_version(conn, cursor, {'tasks': [task_id], 'projects': [data.get('project_id')]},
+                                           bumps=_task_bumps([data.get('assigned_to')]))
+            _publish_task_event('task.created', task_id, data.get('project_id'), version,
+                                data.get('status', 'pendiente'), [data.get('assigned_to'), created_by])
         
-        # Obtener la tarea recién creada para devolver un objeto completo
-        cursor.execute("""
-            SELECT 
-                t.task_id, 
-                t.project_id, 
-                p.title AS project_name,
-                t.title AS task_title,
-                t.description,
-                t.status, 
-                t.assigned_to,
-                u.username AS assigned_username,
-                t.due_date,
-                t.worseness,
-                t.completed_at, 
-                t.created_at, 
-                t.created_by
-            FROM tasks t
-            LEFT JOIN users u ON t.assigned_to = u.user_id
-            LEFT JOIN projects p ON t.project_id = p.project_id
-            WHERE t.task_id = %s
-        """, (task_id,))
-        new_task = cursor.fetchone()
-        return jsonify(new_task), 201
+            # Obtener la tarea recién creada para devolver un objeto completo
+            cursor.execute("""
+                SELECT 
+                    t.task_id, 
+                    t.project_id, 
+                    p.title AS project_name,
+                    t.title AS task_title,
+                    t.description,
+                    t.status, 
+                    t.assigned_to,
+                    u.username AS assigned_username,
+                    t.due_date,
+                    t.worseness,
+                    t.completed_at, 
+                    t.created_at, 
+                    t.created_by
+                FROM tasks t
+                LEFT JOIN users u ON t.assigned_to = u.user_id
+                LEFT JOIN projects p ON t.project_id = p.project_id
+                WHERE t.task_id = %s
+            """, (task_id,))
+            new_task = cursor.fetchone()
+            return jsonify(new_task), 201
     except mysql.connector.Error as err:
         print(f"Error creating task: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/tasks/<int:task_id>', methods=['GET'])
 def get_task(task_id):
     """Gets a specific task by its ID."""
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                t.task_id, 
-                t.project_id, 
-                p.title AS project_name,
-                t.title AS task_title,
-                t.description, 
-                t.status, 
-                t.assigned_to,
-                u.username AS assigned_username,
-                t.due_date,
-                t.worseness,
-                t.completed_at, 
-                t.created_at, 
-                t.created_by
-            FROM tasks t
-            LEFT JOIN users u ON t.assigned_to = u.user_id
-            LEFT JOIN projects p ON t.project_id = p.project_id
-            WHERE t.task_id = %s
-        """, (task_id,))
-        task = cursor.fetchone()
-        if task:
-            return jsonify(task)
-        else:
-            return jsonify({'error': 'Tarea no encontrada'}), 404
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                SELECT 
+                    t.task_id, 
+                    t.project_id, 
+                    p.title AS project_name,
+                    t.title AS task_title,
+                    t.description, 
+                    t.status, 
+                    t.assigned_to,
+                    u.username AS assigned_username,
+                    t.due_date,
+                    t.worseness,
+                    t.completed_at, 
+                    t.created_at, 
+                    t.created_by
+                FROM tasks t
+                LEFT JOIN users u ON t.assigned_to = u.user_id
+                LEFT JOIN projects p ON t.project_id = p.project_id
+                WHERE t.task_id = %s
+            """, (task_id,))
+            task = cursor.fetchone()
+            if task:
+                return jsonify(task)
+            else:
+                return jsonify({'error': 'Tarea no encontrada'}), 404
     except mysql.connector.Error as err:
         print(f"Error getting task by ID: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
-@app.route('/tasks/<int:task_id>', methods=['PUT'])
-def update_task(task_id):
-    """Updates a specific task."""
-    if session.get('role') == 'Invitado':
-        return jsonify({'error': 'No tienes permiso para modificar tareas'}), 403
-
-    data = request.json
-    if not data:
-        return jsonify({'error': 'No se proporcionaron datos para actualizar'}), 400
+def _publish_task_event(event_type, task_id, project_id, version, status, user_ids):
+    """
+    Publica un cambio de tarea a los usuarios afectados (asignados y autor del cambio). Las tareas
+    completadas aparecen en la actividad reciente de todos, así que ese evento se envía a todos.
+    """
+    if status == 'completada':
+        event_type, user_ids = 'task.completed', None
+    else:
+        user_ids = {int(user_id) for user_id in user_ids if str(user_id or '').isdigit()}
+    event_bus.publish(event_type, {
+        'task_id': task_id, 'project_id': project_id, 'status': status, 'version': version
+    }, user_ids=user_ids)
 
+def _task_update_assignments(data):
+    """Columnas (`campo = %s`) y valores a actualizar de una tarea según los campos recibidos."""
     update_fields = []
     update_values = []
     
@@ -1123,29 +2901,49 @@ def update_task(task_id):
         if data['status'] == 'completada':
             update_fields.append("completed_at = %s")
             update_values.append(datetime.now())
+    return update_fields, update_values
+
+@app.route('/tasks/<int:task_id>', methods=['PUT'])
+def update_task(task_id):
+    """Updates a specific task."""
+    if session.get('role') == 'Invitado':
+        return jsonify({'error': 'No tienes permiso para modificar tareas'}), 403
+
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No se proporcionaron datos para actualizar'}), 400
 
+    update_fields, update_values = _task_update_assignments(data)
     if not update_fields:
         return jsonify({'error': 'No se proporcionaron campos válidos para actualizar'}), 400
 
     update_query = f"UPDATE tasks SET {', '.join(update_fields)} WHERE task_id = %s"
-    update_values.append(task_id)
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(update_query, tuple(update_values))
-        conn.commit()
-        if cursor.rowcount == 0:
-            return jsonify({'error': 'Tarea no encontrada o no se realizaron cambios'}), 404
-        return jsonify({'message': 'Tarea actualizada correctamente'})
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT assigned_to, project_id FROM tasks WHERE task_id = %s FOR UPDATE", (task_id,))
+            previous = cursor.fetchone()
+            if previous is None:
+                return jsonify({'error': 'Tarea no encontrada o no se realizaron cambios'}), 404
+            previous_assignee, previous_project = previous
+
+            cursor.execute(update_query, tuple(update_values) + (task_id,))
+            versioned = {'tasks': [task_id]}
+            tombstones = {}
+            # Reasignada: desaparece de la lista del usuario anterior
+            if 'assigned_to' in data and str(data['assigned_to']) != str(previous_assignee):
+                tombstones['task'] = [(task_id, previous_assignee)]
+            # Cambio de proyecto: cambia el número de tareas de ambos proyectos
+            if 'project_id' in data and str(data['project_id']) != str(previous_project):
+                versioned['projects'] = [previous_project, data['project_id'] or None]
+            version = _commit_row_version(conn, cursor, versioned, tombstones,
+                                           bumps=_task_bumps([previous_assignee, data.get('assigned_to')]))
+            _publish_task_event('task.updated', task_id, data.get('project_id', previous_project), version,
+                                data.get('status'), [previous_assignee, data.get('assigned_to'), session.get('user_id')])
+            return jsonify({'message': 'Tarea actualizada correctamente'})
     except mysql.connector.Error as err:
         print(f"Error updating task: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/tasks/<int:task_id>', methods=['DELETE'])
 def delete_task(task_id):
@@ -1153,43 +2951,192 @@ def delete_task(task_id):
     if session.get('role') == 'Invitado':
         return jsonify({'error': 'No tienes permiso para eliminar tareas'}), 403
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM tasks WHERE task_id = %s", (task_id,))
-        if cursor.rowcount == 0:
-            return jsonify({'error': 'Tarea no encontrada'}), 404
-        conn.commit()
-        return jsonify({'message': 'Tarea eliminada correctamente'})
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT assigned_to, project_id FROM tasks WHERE task_id = %s FOR UPDATE", (task_id,))
+            task = cursor.fetchone()
+            if task is None:
+                return jsonify({'error': 'Tarea no encontrada'}), 404
+            assigned_to, project_id = task
+
+            cursor.execute("DELETE FROM tasks WHERE task_id = %s", (task_id,))
+            version = _commit_row_version(conn, cursor, {'projects': [project_id]}, {'task': [(task_id, assigned_to)]},
+                                           bumps=_task_bumps([assigned_to]))
+            _publish_task_event('task.deleted', task_id, project_id, version, None, [assigned_to, session.get('user_id')])
+            return jsonify({'message': 'Tarea eliminada correctamente'})
     except mysql.connector.Error as err:
-        if conn:
-            conn.rollback()
         print(f"Error deleting task: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
+TASKS_BATCH_MAX_OPERATIONS = 5000
+
+def _publish_task_batch_event(operations, results, version, original_assignees, actor_id):
+    """Un único evento `task.batch` para todo el lote, dirigido a los asignados antes y después."""
+    user_ids = {actor_id}
+    task_ids = []
+    completed = False
+    for operation, result in zip(operations, results):
+        if result['status'] >= 400:
+            continue
+        task_ids.append(result['task_id'])
+        data = operation.get('data') or {}
+        completed = completed or data.get('status') == 'completada'
+        user_ids.add(data.get('assigned_to'))
+        user_ids.add(original_assignees.get(result['task_id'], (None, None))[0])
+    if not task_ids:
+        return
+    event_bus.publish('task.batch', {'task_ids': task_ids, 'version': version},
+                      user_ids=None if completed else {int(user_id) for user_id in user_ids if str(user_id or '').isdigit()})
+
+@app.route('/tasks/batch', methods=['POST'])
+def batch_tasks():
+    """
+    Aplica una lista de operaciones sobre tareas en una sola transacción.
+    Cuerpo: {"operations": [{"op": "create", "data": {...}}, {"op": "update", "task_id": 1, "data": {...}},
+    {"op": "delete", "task_id": 2}]}. Las altas se insertan juntas con un único INSERT de varias filas;
+    las modificaciones y los borrados se ejecutan después, en el orden de la lista. Devuelve un
+    resultado por operación, en el mismo orden. Un error de la base de datos deshace todo el lote.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    if session.get('role') == 'Invitado':
+        return jsonify({'error': 'No tienes permiso para modificar tareas'}), 403
+
+    operations = (request.json or {}).get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Se requiere una lista de operaciones'}), 400
+    if len(operations) > TASKS_BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'Máximo {TASKS_BATCH_MAX_OPERATIONS} operaciones por lote'}), 400
+
+    # Validación completa antes de tocar la base de datos: un lote inválido no aplica nada
+    errors = []
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        data = operation.get('data') if isinstance(operation, dict) else None
+        if op not in ('create', 'update', 'delete'):
+            errors.append({'index': index, 'error': "Operación inválida: se espera 'create', 'update' o 'delete'"})
+        elif op == 'create' and (not isinstance(data, dict) or not data.get('title') or not data.get('assigned_to')):
+            errors.append({'index': index, 'error': 'Título y usuario asignado son requeridos'})
+        elif op != 'create' and not isinstance(operation.get('task_id'), int):
+            errors.append({'index': index, 'error': 'Se requiere task_id'})
+        elif op == 'update' and (not isinstance(data, dict) or not _task_update_assignments(data)[0]):
+            errors.append({'index': index, 'error': 'No se proporcionaron campos válidos para actualizar'})
+    if errors:
+        return jsonify({'error': 'Lote inválido', 'operations': errors}), 400
+
+    results = [None] * len(operations)
+    creates = [(index, operation['data']) for index, operation in enumerate(operations) if operation['op'] == 'create']
+    changes = [(index, operation) for index, operation in enumerate(operations) if operation['op'] != 'create']
+    now = datetime.now()
+    created_by = session['user_id']
+
+    try:
+        with db_cursor() as (conn, cursor):
+            touched_tasks = set()
+            touched_projects = set()
+            tombstones = {}
+
+            if creates:
+                cursor.executemany("""
+                    INSERT INTO tasks (
+                        project_id, title, description, status, assigned_to,
+                        due_date, worseness, created_by, created_at, completed_at, row_version
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, [(
+                    data.get('project_id'), data.get('title'), data.get('description'),
+                    data.get('status', 'pendiente'), data.get('assigned_to'),
+                    data.get('due_date'), data.get('worseness', 'Baja'),
+                    created_by, now, now if data.get('status') == 'completada' else None, ROW_VERSION_PENDING
+                ) for _, data in creates])
+                # Los identificadores se leen de vuelta en lugar de deducirlos de lastrowid: con
+                # auto_increment_increment distinto de 1, Galera o innodb_autoinc_lock_mode=2 no son
+                # consecutivos. Las filas se insertan con la versión provisional ROW_VERSION_PENDING, que
+                # _commit_row_version sustituye antes del commit: una lectura no bloqueante solo ve con ella
+                # las filas de esta transacción, y el INSERT asigna los identificadores en orden creciente
+                # siguiendo el orden de las filas. Filtrar también por asignado aprovecha idx_tasks_assignee_version.
+                assignees = sorted({str(data.get('assigned_to')) for _, data in creates})
+                placeholders = ', '.join(['%s'] * len(assignees))
+                cursor.execute(
+                    f"SELECT task_id FROM tasks WHERE assigned_to IN ({placeholders}) AND row_version = %s ORDER BY task_id",
+                    (*assignees, ROW_VERSION_PENDING)
+                )
+                created_ids = [row[0] for row in cursor.fetchall()]
+                if len(created_ids) != len(creates):
+                    raise mysql.connector.Error(
+                        msg=f'Se esperaban {len(creates)} tareas creadas y se encontraron {len(created_ids)}'
+                    )
+                for task_id, (index, data) in zip(created_ids, creates):
+                    results[index] = {'index': index, 'op': 'create', 'status': 201, 'task_id': task_id}
+                    touched_tasks.add(task_id)
+                    touched_projects.add(data.get('project_id'))
+
+            if changes:
+                task_ids = sorted({operation['task_id'] for _, operation in changes})
+                placeholders = ', '.join(['%s'] * len(task_ids))
+                cursor.execute(
+                    f"SELECT task_id, assigned_to, project_id FROM tasks WHERE task_id IN ({placeholders}) FOR UPDATE",
+                    tuple(task_ids)
+                )
+                current = {task_id: (assigned_to, project_id) for task_id, assigned_to, project_id in cursor.fetchall()}
+                original = dict(current)
+
+                for index, operation in changes:
+                    task_id = operation['task_id']
+                    if task_id not in current:
+                        results[index] = {'index': index, 'op': operation['op'], 'task_id': task_id,
+                                          'status': 404, 'error': 'Tarea no encontrada'}
+                        continue
+                    assigned_to, project_id = current[task_id]
+                    touched_projects.add(project_id)
+
+                    if operation['op'] == 'delete':
+                        cursor.execute("DELETE FROM tasks WHERE task_id = %s", (task_id,))
+                        del current[task_id]
+                    else:
+                        data = operation['data']
+                        update_fields, update_values = _task_update_assignments(data)
+                        cursor.execute(
+                            f"UPDATE tasks SET {', '.join(update_fields)} WHERE task_id = %s",
+                            tuple(update_values) + (task_id,)
+                        )
+                        touched_tasks.add(task_id)
+                        new_assignee = data.get('assigned_to', assigned_to)
+                        new_project = data.get('project_id', project_id) or None
+                        touched_projects.add(new_project)
+                        current[task_id] = (new_assignee, new_project)
+                    results[index] = {'index': index, 'op': operation['op'], 'task_id': task_id, 'status': 200}
+
+                # Una lápida por tarea borrada o que ya no pertenece a su usuario original
+                tombstones['task'] = [
+                    (task_id, assigned_to) for task_id, (assigned_to, _) in original.items()
+                    if task_id not in current or str(current[task_id][0]) != str(assigned_to)
+                ]
+
+            # Las tareas borradas después de modificarlas ya no existen: el UPDATE de la versión no las encuentra
+            assignees = [data.get('assigned_to') for _, data in creates]
+            if changes:
+                assignees += [assigned_to for assigned_to, _ in original.values()]
+                assignees += [assigned_to for assigned_to, _ in current.values()]
+            version = _commit_row_version(conn, cursor, {'tasks': touched_tasks, 'projects': touched_projects}, tombstones,
+                                           bumps=_task_bumps(assignees))
+            _publish_task_batch_event(operations, results, version, original if changes else {}, created_by)
+            return jsonify({'version': version, 'results': results}), 200
+    except mysql.connector.Error as err:
+        print(f"Error applying task batch: {err}")
+        return jsonify({'error': str(err)}), 500
 
-# ---Puntos finales de API: Proyectos ---
-@app.route('/projects', methods=['GET'])
-def get_projects():
-    """Gets all projects with a task count."""
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
 
+# ---Puntos finales de API: Proyectos ---
+def _fetch_projects(start_date=None, end_date=None):
+    """Todos los proyectos con su número de tareas, opcionalmente filtrados por fecha de creación."""
     filter_sql = ""
     params = []
     if start_date and end_date:
         filter_sql = " WHERE p.created_at BETWEEN %s AND %s"
         params.extend([start_date, end_date])
 
-    conn = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as (conn, cursor):
         query = f"""
             SELECT p.project_id, p.title AS project_name, p.description, p.created_by, p.created_at, p.status,
                 (SELECT COUNT(*) FROM tasks t WHERE t.project_id = p.project_id) AS task_count
@@ -1197,15 +3144,44 @@ def get_projects():
             {filter_sql}
         """
         cursor.execute(query, tuple(params))
-        projects = cursor.fetchall()
+        return cursor.fetchall()
+
+@app.route('/projects', methods=['GET'])
+@conditional_get('projects', 'tasks')
+def get_projects():
+    """Gets all projects with a task count, or with `ids=1,2,3` a map {project_id: project}."""
+    if 'ids' in request.args:
+        return _get_projects_by_ids()
+
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+
+    try:
+        projects = _fetch_projects(start_date, end_date)
         return jsonify(projects)
     except mysql.connector.Error as err:
         print(f"Error getting projects: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+
+def _get_projects_by_ids():
+    """Multi-get de proyectos (`/projects?ids=`): las mismas columnas que /projects/<project_id>."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    try:
+        ids = _parse_ids_arg('ids')
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    try:
+        projects = _fetch_by_ids("""
+            SELECT project_id, title, description, created_at, status
+            FROM projects
+            WHERE project_id IN ({placeholders})
+        """, ids, 'project_id')
+        return jsonify(projects)
+    except mysql.connector.Error as err:
+        print(f"Error getting projects by IDs: {err}")
+        return jsonify({'error': str(err)}), 500
 
 @app.route('/projects/<int:project_id>', methods=['PUT'])
 def update_project_status(project_id):
@@ -1227,28 +3203,28 @@ def update_project_status(project_id):
         values.append(data['status'])
     if not fields:
         return jsonify({'error': 'No se proporcionaron campos para actualizar'}), 400
-    values.append(project_id)
-    
-    conn = None
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"UPDATE projects SET {', '.join(fields)} WHERE project_id = %s", tuple(values))
-        conn.commit()
-        return jsonify({'message': 'Proyecto actualizado correctamente'})
+        with db_cursor() as (conn, cursor):
+            cursor.execute(f"UPDATE projects SET {', '.join(fields)} WHERE project_id = %s", tuple(values) + (project_id,))
+            versioned = {'projects': [project_id]}
+            if 'title' in data:
+                # Las tareas incluyen el nombre del proyecto: se vuelven a enviar en la próxima sincronización
+                cursor.execute("SELECT task_id FROM tasks WHERE project_id = %s", (project_id,))
+                versioned['tasks'] = [row[0] for row in cursor.fetchall()]
+            version = _commit_row_version(conn, cursor, versioned, bumps=[('projects', None)])
+            event_bus.publish('project.updated', {'project_id': project_id, 'status': data.get('status'), 'version': version})
+            return jsonify({'message': 'Proyecto actualizado correctamente'})
     except mysql.connector.Error as err:
         print(f"Error updating project: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/projects/<int:project_id>', methods=['DELETE'])
 def delete_project(project_id):
     """
-    Deletes a project and all its associated tasks and focus data.
-    This operation is performed as a transaction.
+    Starts the deletion of a project and all its associated tasks and focus data.
+    The work runs in the background in bounded chunks; responds 202 with the job id to poll
+    at /api/jobs/<job_id>.
     """
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
@@ -1256,41 +3232,21 @@ def delete_project(project_id):
     if session.get('role') == 'Invitado':
         return jsonify({'error': 'No tienes permiso para eliminar proyectos'}), 403
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        conn.start_transaction()
-
-        cursor.execute("SELECT task_id FROM tasks WHERE project_id = %s", (project_id,))
-        task_ids_tuples = cursor.fetchall()
-        task_ids = [item[0] for item in task_ids_tuples]
-
-        if task_ids:
-            placeholders = ', '.join(['%s'] * len(task_ids))
-            cursor.execute(f"DELETE FROM focus_objectives WHERE task_id IN ({placeholders})", tuple(task_ids))
-            cursor.execute(f"DELETE FROM focus_sessions WHERE task_id IN ({placeholders})", tuple(task_ids))
-
-        cursor.execute("DELETE FROM tasks WHERE project_id = %s", (project_id,))
-        cursor.execute("DELETE FROM projects WHERE project_id = %s", (project_id,))
-        
-        if cursor.rowcount == 0:
-            conn.rollback()
-            return jsonify({'error': 'Proyecto no encontrado'}), 404
-
-        conn.commit()
-        return jsonify({'message': 'Proyecto y sus dependencias eliminados correctamente'})
-
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT 1 FROM projects WHERE project_id = %s", (project_id,))
+            if cursor.fetchone() is None:
+                return jsonify({'error': 'Proyecto no encontrado'}), 404
+        job, _ = background_jobs.submit('delete_project', project_id, session['user_id'], _delete_project_job, project_id)
     except mysql.connector.Error as err:
-        if conn:
-            conn.rollback()
         print(f"Error deleting project: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+
+    return jsonify({
+        'message': 'Eliminación del proyecto en curso',
+        'job_id': job['job_id'],
+        'status_url': url_for('get_job_status', job_id=job['job_id']),
+    }), 202
 
 @app.route('/projects/<int:project_id>', methods=['GET'])
 def get_project(project_id):
@@ -1298,28 +3254,22 @@ def get_project(project_id):
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        # El código JS espera 'título', 'descripción', 'created_at' y 'estado'.
-        cursor.execute("""
-            SELECT project_id, title, description, created_at, status
-            FROM projects
-            WHERE project_id = %s
-        """, (project_id,))
-        project = cursor.fetchone()
-        if project:
-            return jsonify(project)
-        else:
-            return jsonify({'error': 'Proyecto no encontrado'}), 404
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # El código JS espera 'título', 'descripción', 'created_at' y 'estado'.
+            cursor.execute("""
+                SELECT project_id, title, description, created_at, status
+                FROM projects
+                WHERE project_id = %s
+            """, (project_id,))
+            project = cursor.fetchone()
+            if project:
+                return jsonify(project)
+            else:
+                return jsonify({'error': 'Proyecto no encontrado'}), 404
     except mysql.connector.Error as err:
         print(f"Error al obtener el proyecto por ID: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/projects', methods=['POST'])
 def create_project():
@@ -1334,65 +3284,71 @@ def create_project():
     if not data.get('title'):
         return jsonify({'error': 'El título del proyecto es obligatorio'}), 400
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        created_by = session['user_id']
-        created_at = datetime.now()
-        cursor.execute("""
-            INSERT INTO projects (title, description, created_by, created_at)
-            VALUES (%s, %s, %s, %s)
-        """, (data['title'], data.get('description', ''), created_by, created_at))
-        conn.commit()
-        project_id = cursor.lastrowid
+        with db_cursor() as (conn, cursor):
+            created_by = session['user_id']
+            created_at = datetime.now()
+            cursor.execute("""
+                INSERT INTO projects (title, description, created_by, created_at)
+                VALUES (%s, %s, %s, %s)
+            """, (data['title'], data.get('description', ''), created_by, created_at))
+            project_id = cursor.lastrowid
+            version = _commit_row_version(conn, cursor, {'projects': [project_id]}, bumps=[('projects', None)])
+            event_bus.publish('project.created', {'project_id': project_id, 'version': version})
         
-        cursor.execute("SELECT project_id, title AS project_name, description, created_by, created_at FROM projects WHERE project_id = %s", (project_id,))
-        new_project = cursor.fetchone()
-        return jsonify(new_project), 201
+            cursor.execute("SELECT project_id, title AS project_name, description, created_by, created_at FROM projects WHERE project_id = %s", (project_id,))
+            new_project = cursor.fetchone()
+            return jsonify(new_project), 201
     except mysql.connector.Error as err:
         print(f"Error creating project: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # Puntos finales de la API: colaboradoras (usuarios
+COLLABORATOR_COLUMNS = {
+    'user_id': 'u.user_id',
+    'username': 'u.username',
+    'first_name': 'u.first_name',
+    'last_name': 'u.last_name',
+    'Email': 'u.Email',
+    'role': 'u.role',
+    'avatar_url': 'u.avatar_url',
+    'is_blocked': 'u.is_blocked',
+    'assigned_tasks_count': '(SELECT COUNT(*) FROM tasks WHERE assigned_to = u.user_id)',
+    'involved_projects_count': '(SELECT COUNT(DISTINCT project_id) FROM tasks WHERE assigned_to = u.user_id AND project_id IS NOT NULL)',
+}
+
+def _fetch_collaborators(fields=None):
+    """
+    Todos los usuarios con su número de tareas asignadas y proyectos en los que participan.
+    Con `fields` solo se calculan esas columnas (los recuentos son las más caras).
+    """
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute(f"""
+            SELECT
+                {_select_sql(COLLABORATOR_COLUMNS, fields)}
+            FROM users u
+            ORDER BY u.first_name, u.last_name;
+        """)
+        return cursor.fetchall()
+
 @app.route('/api/collaborators', methods=['GET'])
 def get_collaborators():
-    """Gets a list of all users/collaborators with their stats."""
+    """Gets a list of all users/collaborators with their stats. Supports `fields=` and `format=columnar`."""
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT
-                u.user_id,
-                u.username,
-                u.first_name,
-                u.last_name,
-                u.Email,
-                u.role,
-                u.avatar_url,
-                u.is_blocked,
-                (SELECT COUNT(*) FROM tasks WHERE assigned_to = u.user_id) AS assigned_tasks_count,
-                (SELECT COUNT(DISTINCT project_id) FROM tasks WHERE assigned_to = u.user_id AND project_id IS NOT NULL) AS involved_projects_count
-            FROM users u
-            ORDER BY u.first_name, u.last_name;
-        """)
-        collaborators = cursor.fetchall()
-        return jsonify(collaborators)
+        fields = _parse_fields_arg(COLLABORATOR_COLUMNS)
+        response_format = _parse_format_arg()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    try:
+        collaborators = _fetch_collaborators(fields)
+        return _rows_response(collaborators, fields or list(COLLABORATOR_COLUMNS), response_format)
     except mysql.connector.Error as err:
         print(f"Error getting collaborators: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/users/<int:user_id>/details', methods=['GET'])
 def get_user_details(user_id):
@@ -1400,49 +3356,42 @@ def get_user_details(user_id):
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT user_id, username, first_name, last_name, Email, 
-                   role, 
-                   avatar_url
-            FROM users WHERE user_id = %s
-        """, (user_id,))
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                SELECT user_id, username, first_name, last_name, Email, 
+                       role, 
+                       avatar_url
+                FROM users WHERE user_id = %s
+            """, (user_id,))
         
-        user_details = cursor.fetchone()
+            user_details = cursor.fetchone()
 
-        if not user_details:
-            return jsonify({'error': 'Usuario no encontrado'}), 404
+            if not user_details:
+                return jsonify({'error': 'Usuario no encontrado'}), 404
         
-        cursor.execute("""
-            SELECT 
-                (SELECT COUNT(*) FROM tasks WHERE assigned_to = %s) AS assigned_tasks_count,
-                (SELECT COUNT(DISTINCT project_id) FROM tasks WHERE assigned_to = %s AND project_id IS NOT NULL) AS involved_projects_count
-        """, (user_id, user_id))
-        stats = cursor.fetchone()
-        user_details.update(stats)
+            cursor.execute("""
+                SELECT 
+                    (SELECT COUNT(*) FROM tasks WHERE assigned_to = %s) AS assigned_tasks_count,
+                    (SELECT COUNT(DISTINCT project_id) FROM tasks WHERE assigned_to = %s AND project_id IS NOT NULL) AS involved_projects_count
+            """, (user_id, user_id))
+            stats = cursor.fetchone()
+            user_details.update(stats)
 
-        cursor.execute("""
-            SELECT task_id, title AS task_title, due_date, status
-            FROM tasks
-            WHERE assigned_to = %s AND status <> 'completada'
-            ORDER BY due_date ASC
-            LIMIT 5;
-        """, (user_id,))
-        user_details['active_tasks'] = cursor.fetchall()
+            cursor.execute("""
+                SELECT task_id, title AS task_title, due_date, status
+                FROM tasks
+                WHERE assigned_to = %s AND status <> 'completada'
+                ORDER BY due_date ASC
+                LIMIT 5;
+            """, (user_id,))
+            user_details['active_tasks'] = cursor.fetchall()
         
-        return jsonify(user_details)
+            return jsonify(user_details)
 
     except mysql.connector.Error as err:
         print(f"Error getting user details: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/users/<int:user_id>/role', methods=['PUT'])
 def update_user_role(user_id):
@@ -1463,22 +3412,18 @@ def update_user_role(user_id):
 
     # Comprobación de seguridad: evitar que un administrador cambie su propio rol si es el último.
     if user_id == session['user_id']:
-        conn_check = get_db_connection()
-        cursor_check = conn_check.cursor()
-        cursor_check.execute("SELECT COUNT(*) FROM users WHERE role = 'Administrador' AND user_id != %s", (user_id,))
-        admin_count = cursor_check.fetchone()[0]
-        cursor_check.close()
-        conn_check.close()
+        with db_cursor() as (conn_check, cursor_check):
+            cursor_check.execute("SELECT COUNT(*) FROM users WHERE role = 'Administrador' AND user_id != %s", (user_id,))
+            admin_count = cursor_check.fetchone()[0]
         if admin_count == 0:
             return jsonify({'error': 'No puedes cambiar tu propio rol si eres el único administrador.'}), 403
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET role = %s WHERE user_id = %s", (new_role, user_id))
-        conn.commit()
-        return jsonify({'message': 'Rol del usuario actualizado correctamente'}), 200
+        with db_cursor() as (conn, cursor):
+            cursor.execute("UPDATE users SET role = %s WHERE user_id = %s", (new_role, user_id))
+            data_versions.bump('users', cursor=cursor)
+            conn.commit()
+            return jsonify({'message': 'Rol del usuario actualizado correctamente'}), 200
     except mysql.connector.Error as err:
         return jsonify({'error': f'Error de base de datos: {err}'}), 500
 
@@ -1500,24 +3445,20 @@ def block_unblock_user(user_id):
     if is_blocked is None:
         return jsonify({'error': 'Se requiere el campo is_blocked'}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET is_blocked = %s WHERE user_id = %s", (int(bool(is_blocked)), user_id))
-        conn.commit()
-        return jsonify({'message': 'Estado de bloqueo actualizado correctamente'}), 200
+        with db_cursor() as (conn, cursor):
+            cursor.execute("UPDATE users SET is_blocked = %s WHERE user_id = %s", (int(bool(is_blocked)), user_id))
+            data_versions.bump('users', cursor=cursor)
+            conn.commit()
+            return jsonify({'message': 'Estado de bloqueo actualizado correctamente'}), 200
     except mysql.connector.Error as err:
         return jsonify({'error': f'Error de base de datos: {err}'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     """
     Allows an admin to delete a user (except themselves).
+    The user's data is removed in the background in bounded chunks; responds 202 with the job id.
     """
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
@@ -1526,44 +3467,39 @@ def delete_user(user_id):
     if user_id == session['user_id']:
         return jsonify({'error': 'No puedes eliminarte a ti mismo.'}), 403
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
-        if cursor.rowcount == 0:
-            return jsonify({'error': 'Usuario no encontrado'}), 404
-        conn.commit()
-        return jsonify({'message': 'Usuario eliminado correctamente'}), 200
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT 1 FROM users WHERE user_id = %s", (user_id,))
+            if cursor.fetchone() is None:
+                return jsonify({'error': 'Usuario no encontrado'}), 404
+        # Sus proyectos pasan al administrador que lo elimina; el resto de sus datos se borra por bloques
+        job, _ = background_jobs.submit('delete_user', user_id, session['user_id'], _delete_user_job, user_id, session['user_id'])
     except mysql.connector.Error as err:
         return jsonify({'error': f'Error de base de datos: {err}'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+
+    return jsonify({
+        'message': 'Eliminación del usuario en curso',
+        'job_id': job['job_id'],
+        'status_url': url_for('get_job_status', job_id=job['job_id']),
+    }), 202
 
 # --- Puntos finales de API: Recursos ---
 @app.route('/api/resources', methods=['GET'])
+@conditional_get(per_user=('resources',))
 def get_resources():
     """Gets a list of resources for the logged-in user."""
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
     user_id = session['user_id']
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM resources WHERE user_id = %s ORDER BY created_at DESC", (user_id,))
-        resources = cursor.fetchall()
-        return jsonify(resources)
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT * FROM resources WHERE user_id = %s ORDER BY created_at DESC", (user_id,))
+            resources = cursor.fetchall()
+            return jsonify(resources)
     except mysql.connector.Error as err:
         print(f"Error getting resources: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/resources', methods=['POST'])
 def create_resource():
@@ -1588,27 +3524,22 @@ def create_resource():
     if not title or not final_url_or_path:
         return jsonify({'error': 'Título y un Archivo/URL son requeridos'}), 400
         
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            INSERT INTO resources (user_id, title, description, type, url_or_path, category)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (user_id, title, request.form.get('description'), resource_type, final_url_or_path, request.form.get('category')))
-        conn.commit()
-        resource_id = cursor.lastrowid
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                INSERT INTO resources (user_id, title, description, type, url_or_path, category)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (user_id, title, request.form.get('description'), resource_type, final_url_or_path, request.form.get('category')))
+            resource_id = cursor.lastrowid
+            data_versions.bump('resources', user_id, cursor=cursor)
+            conn.commit()
         
-        cursor.execute("SELECT * FROM resources WHERE resource_id = %s", (resource_id,))
-        new_resource = cursor.fetchone()
-        return jsonify(new_resource), 201
+            cursor.execute("SELECT * FROM resources WHERE resource_id = %s", (resource_id,))
+            new_resource = cursor.fetchone()
+            return jsonify(new_resource), 201
     except mysql.connector.Error as err:
         print(f"Error creating resource: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/resources/<int:resource_id>', methods=['DELETE'])
 def delete_resource(resource_id):
@@ -1619,36 +3550,30 @@ def delete_resource(resource_id):
         return jsonify({'error': 'No tienes permiso para eliminar recursos'}), 403
     user_id = session['user_id']
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("SELECT type, url_or_path FROM resources WHERE resource_id = %s AND user_id = %s", (resource_id, user_id))
-        resource = cursor.fetchone()
-
-        if not resource:
-            return jsonify({'error': 'Recurso no encontrado o sin permiso'}), 404
-
-        if resource['type'] in ['document', 'image']:
-            try:
-                filename = os.path.basename(resource['url_or_path'])
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as e:
-                print(f"Warning: Could not delete physical file {resource['url_or_path']}: {e}")
-
-        cursor.execute("DELETE FROM resources WHERE resource_id = %s AND user_id = %s", (resource_id, user_id))
-        conn.commit()
-        return jsonify({'message': 'Recurso eliminado correctamente'}), 200
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT type, url_or_path FROM resources WHERE resource_id = %s AND user_id = %s", (resource_id, user_id))
+            resource = cursor.fetchone()
+
+            if not resource:
+                return jsonify({'error': 'Recurso no encontrado o sin permiso'}), 404
+
+            if resource['type'] in ['document', 'image']:
+                try:
+                    filename = os.path.basename(resource['url_or_path'])
+                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                except Exception as e:
+                    print(f"Warning: Could not delete physical file {resource['url_or_path']}: {e}")
+
+            cursor.execute("DELETE FROM resources WHERE resource_id = %s AND user_id = %s", (resource_id, user_id))
+            data_versions.bump('resources', user_id, cursor=cursor)
+            conn.commit()
+            return jsonify({'message': 'Recurso eliminado correctamente'}), 200
     except mysql.connector.Error as err:
         print(f"Error deleting resource: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
@@ -1678,59 +3603,73 @@ def upload_avatar():
 
         avatar_url = url_for('uploaded_file', filename=filename, _external=True)
 
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE users SET avatar_url = %s WHERE user_id = %s", (avatar_url, user_id))
-            conn.commit()
-            session['avatar_url'] = avatar_url
-            return jsonify({'message': 'Avatar actualizado correctamente', 'avatar_url': avatar_url}), 200
+            with db_cursor() as (conn, cursor):
+                cursor.execute("UPDATE users SET avatar_url = %s WHERE user_id = %s", (avatar_url, user_id))
+                data_versions.bump('users', cursor=cursor)
+                conn.commit()
+                session['avatar_url'] = avatar_url
+                return jsonify({'message': 'Avatar actualizado correctamente', 'avatar_url': avatar_url}), 200
         except mysql.connector.Error as err:
             print(f"Error updating avatar in DB: {err}")
             return jsonify({'error': str(err)}), 500
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
 
 # --- Puntos finales de API: Usuarios (para selectores) ---
+def _fetch_users():
+    """Lista mínima de usuarios para los selectores de asignación."""
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute("SELECT user_id, username, first_name, last_name FROM users")
+        return cursor.fetchall()
+
 @app.route('/users', methods=['GET'])
+@conditional_get('users')
 def get_users():
     """Gets a list of all users for assignment purposes."""
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT user_id, username, first_name, last_name FROM users")
-        users = cursor.fetchall()
+        users = _fetch_users()
         return jsonify(users)
     except mysql.connector.Error as err:
         print(f"Error getting users: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # ---Puntos finales de API: objetivos de enfoque ---
 @app.route('/focus_objectives/<int:task_id>', methods=['GET'])
 def get_focus_objectives(task_id):
     """Gets all focus objectives for a specific task."""
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM focus_objectives WHERE task_id = %s ORDER BY created_at ASC", (task_id,))
-        objectives = cursor.fetchall()
-        return jsonify(objectives)
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT * FROM focus_objectives WHERE task_id = %s ORDER BY created_at ASC", (task_id,))
+            objectives = cursor.fetchall()
+            return jsonify(objectives)
+    except mysql.connector.Error as err:
+        print(f"Error getting focus objectives: {err}")
+        return jsonify({'error': str(err)}), 500
+
+@app.route('/focus_objectives', methods=['GET'])
+@conditional_get('focus_objectives')
+def get_focus_objectives_by_tasks():
+    """Obtiene los objetivos de enfoque de varias tareas (`?task_ids=1,2,3`) como un mapa {task_id: [objetivos]}."""
+    try:
+        task_ids = _parse_ids_arg('task_ids')
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    objectives = {task_id: [] for task_id in task_ids}
+    try:
+        with db_cursor(dictionary=True) as (conn, cursor):
+            for start in range(0, len(task_ids), MULTI_GET_CHUNK):
+                chunk = task_ids[start:start + MULTI_GET_CHUNK]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f"SELECT * FROM focus_objectives WHERE task_id IN ({placeholders}) ORDER BY task_id, created_at ASC",
+                    tuple(chunk)
+                )
+                for objective in cursor.fetchall():
+                    objectives[objective['task_id']].append(objective)
+            return jsonify(objectives)
     except mysql.connector.Error as err:
         print(f"Error getting focus objectives: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/focus_objectives', methods=['POST'])
 def add_focus_objective():
@@ -1746,27 +3685,22 @@ def add_focus_objective():
     if not task_id or not objective_text:
         return jsonify({'error': 'task_id y objective_text son requeridos'}), 400
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            INSERT INTO focus_objectives (task_id, objective_text)
-            VALUES (%s, %s)
-        """, (task_id, objective_text))
-        conn.commit()
-        objective_id = cursor.lastrowid
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                INSERT INTO focus_objectives (task_id, objective_text)
+                VALUES (%s, %s)
+            """, (task_id, objective_text))
+            objective_id = cursor.lastrowid
+            data_versions.bump('focus_objectives', cursor=cursor)
+            conn.commit()
         
-        cursor.execute("SELECT * FROM focus_objectives WHERE objective_id = %s", (objective_id,))
-        new_obj = cursor.fetchone()
-        return jsonify(new_obj), 201
+            cursor.execute("SELECT * FROM focus_objectives WHERE objective_id = %s", (objective_id,))
+            new_obj = cursor.fetchone()
+            return jsonify(new_obj), 201
     except mysql.connector.Error as err:
         print(f"Error adding focus objective: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/focus_objectives/<int:objective_id>', methods=['PUT'])
 def update_focus_objective(objective_id):
@@ -1781,20 +3715,15 @@ def update_focus_objective(objective_id):
     if completed is None:
         return jsonify({'error': 'El campo completed es requerido'}), 400
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE focus_objectives SET completed = %s WHERE objective_id = %s", (completed, objective_id))
-        conn.commit()
-        return jsonify({'message': 'Objetivo actualizado'})
+        with db_cursor() as (conn, cursor):
+            cursor.execute("UPDATE focus_objectives SET completed = %s WHERE objective_id = %s", (completed, objective_id))
+            data_versions.bump('focus_objectives', cursor=cursor)
+            conn.commit()
+            return jsonify({'message': 'Objetivo actualizado'})
     except mysql.connector.Error as err:
         print(f"Error updating focus objective: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/focus_objectives/<int:objective_id>', methods=['DELETE'])
 def delete_focus_objective(objective_id):
@@ -1804,35 +3733,22 @@ def delete_focus_objective(objective_id):
     if session.get('role') == 'Invitado':
         return jsonify({'error': 'No tienes permiso para eliminar objetivos'}), 403
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM focus_objectives WHERE objective_id = %s", (objective_id,))
-        conn.commit()
-        return jsonify({'message': 'Objetivo eliminado'})
+        with db_cursor() as (conn, cursor):
+            cursor.execute("DELETE FROM focus_objectives WHERE objective_id = %s", (objective_id,))
+            data_versions.bump('focus_objectives', cursor=cursor)
+            conn.commit()
+            return jsonify({'message': 'Objetivo eliminado'})
     except mysql.connector.Error as err:
         print(f"Error deleting focus objective: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # --- Puntos finales de API: Actividad reciente ---
-@app.route('/api/activity/recent', methods=['GET'])
-def get_recent_activity():
-    """Generates a combined feed of recent user and project activity."""
-    if 'user_id' not in session:
-        return jsonify({'error': 'No autenticado'}), 401
-    
+def _fetch_recent_activity():
+    """Feed combinado de proyectos creados y tareas creadas o completadas recientemente."""
     limit_date = datetime.now() - timedelta(days=RECENT_ACTIVITY_DAYS_LIMIT)
 
-    conn = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
+    with db_cursor(dictionary=True) as (conn, cursor):
         query = """
             SELECT * FROM (
                 (
@@ -1876,21 +3792,40 @@ def get_recent_activity():
             ORDER BY timestamp DESC
             LIMIT %s;
         """
-        
+
         cursor.execute(query, (limit_date, limit_date, limit_date, RECENT_ACTIVITY_ITEMS_LIMIT))
-        activities = cursor.fetchall()
-        
+        return cursor.fetchall()
+
+@app.route('/api/activity/recent', methods=['GET'])
+def get_recent_activity():
+    """Generates a combined feed of recent user and project activity."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    
+    try:
+        activities = _fetch_recent_activity()
         return jsonify(activities)
     except mysql.connector.Error as err:
         print(f"Error getting recent activity: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 # --- Puntos finales de API: Notas ---
+def _fetch_notes(user_id, pinned_only=False):
+    """Notas de un usuario, de la más reciente a la más antigua."""
+    with db_cursor(dictionary=True) as (conn, cursor):
+        query = "SELECT note_id, content, is_pinned, created_at, updated_at FROM notes WHERE user_id = %s"
+        params = [user_id]
+
+        if pinned_only:
+            query += " AND is_pinned = TRUE"
+
+        query += " ORDER BY updated_at DESC"
+
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+
 @app.route('/api/notes', methods=['GET'])
+@conditional_get(per_user=('notes',))
 def get_notes():
     """Gets a user's notes, with an option to filter for pinned notes."""
     if 'user_id' not in session:
@@ -1899,30 +3834,12 @@ def get_notes():
     
     pinned_only = request.args.get('pinned', 'false').lower() == 'true'
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        query = "SELECT note_id, content, is_pinned, created_at, updated_at FROM notes WHERE user_id = %s"
-        params = [user_id]
-        
-        if pinned_only:
-            query += " AND is_pinned = TRUE"
-            
-        query += " ORDER BY updated_at DESC"
-        
-        cursor.execute(query, tuple(params))
-        notes = cursor.fetchall()
-        
+        notes = _fetch_notes(user_id, pinned_only)
         return jsonify(notes)
     except mysql.connector.Error as err:
         print(f"Error getting notes: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/notes', methods=['POST'])
 def create_note():
@@ -1940,28 +3857,23 @@ def create_note():
     if not content:
         return jsonify({'error': 'El contenido de la nota es requerido'}), 400
         
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            "INSERT INTO notes (user_id, content, is_pinned) VALUES (%s, %s, %s)",
-            (user_id, content, is_pinned)
-        )
-        conn.commit()
-        note_id = cursor.lastrowid
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute(
+                "INSERT INTO notes (user_id, content, is_pinned) VALUES (%s, %s, %s)",
+                (user_id, content, is_pinned)
+            )
+            note_id = cursor.lastrowid
+            version = _commit_row_version(conn, cursor, {'notes': [note_id]}, bumps=[('notes', user_id)])
+            event_bus.publish('note.created', {'note_id': note_id, 'version': version}, user_ids=[user_id])
         
-        cursor.execute("SELECT * FROM notes WHERE note_id = %s", (note_id,))
-        new_note = cursor.fetchone()
+            cursor.execute("SELECT * FROM notes WHERE note_id = %s", (note_id,))
+            new_note = cursor.fetchone()
         
-        return jsonify(new_note), 201
+            return jsonify(new_note), 201
     except mysql.connector.Error as err:
         print(f"Error creating note: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/notes/<int:note_id>', methods=['PUT'])
 def update_note(note_id):
@@ -1987,28 +3899,23 @@ def update_note(note_id):
     if not fields_to_update:
         return jsonify({'error': 'No se proporcionaron campos para actualizar'}), 400
         
-    values.extend([note_id, user_id])
-    
     query = f"UPDATE notes SET {', '.join(fields_to_update)} WHERE note_id = %s AND user_id = %s"
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, tuple(values))
-        conn.commit()
-        
-        if cursor.rowcount == 0:
-            return jsonify({'error': 'Nota no encontrada o sin permiso para actualizar'}), 404
+        with db_cursor() as (conn, cursor):
+            # FOR UPDATE: distingue "no existe" de "sin cambios" (rowcount es 0 si los valores no cambian)
+            cursor.execute("SELECT 1 FROM notes WHERE note_id = %s AND user_id = %s FOR UPDATE", (note_id, user_id))
+            if cursor.fetchone() is None:
+                conn.rollback()
+                return jsonify({'error': 'Nota no encontrada o sin permiso para actualizar'}), 404
+            cursor.execute(query, tuple(values) + (note_id, user_id))
+            version = _commit_row_version(conn, cursor, {'notes': [note_id]}, bumps=[('notes', user_id)])
+            event_bus.publish('note.updated', {'note_id': note_id, 'version': version}, user_ids=[user_id])
             
-        return jsonify({'message': 'Nota actualizada correctamente'}), 200
+            return jsonify({'message': 'Nota actualizada correctamente'}), 200
     except mysql.connector.Error as err:
         print(f"Error updating note: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/notes/<int:note_id>', methods=['DELETE'])
 def delete_note(note_id):
@@ -2019,133 +3926,1385 @@ def delete_note(note_id):
         return jsonify({'error': 'No tienes permiso para eliminar notas'}), 403
     user_id = session['user_id']
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM notes WHERE note_id = %s AND user_id = %s", (note_id, user_id))
-        conn.commit()
-        return jsonify({'message': 'Nota eliminada correctamente'}), 200
+        with db_cursor() as (conn, cursor):
+            cursor.execute("DELETE FROM notes WHERE note_id = %s AND user_id = %s", (note_id, user_id))
+            if cursor.rowcount:
+                version = _commit_row_version(conn, cursor, tombstones={'note': [(note_id, user_id)]}, bumps=[('notes', user_id)])
+                event_bus.publish('note.deleted', {'note_id': note_id, 'version': version}, user_ids=[user_id])
+            else:
+                conn.commit()
+            return jsonify({'message': 'Nota eliminada correctamente'}), 200
     except mysql.connector.Error as err:
         print(f"Error deleting note: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
-# --- Puntos finales de API: Búsqueda global ---
+# --- Puntos finales de API: Eventos en tiempo real (SSE) ---
+STREAM_RETRY_MS = 3000  # Espera que indica el servidor al navegador antes de reconectar
 
-@app.route('/api/search', methods=['GET'])
-def global_search():
+@app.route('/api/stream', methods=['GET'])
+def event_stream():
     """
-    Búsqueda global que busca en tareas, proyectos y notas del usuario autenticado.
-    Parámetros:
-    - q: término de búsqueda (requerido)
-    - type: tipo de contenido a buscar ('tasks', 'projects', 'notes', 'all') - por defecto 'all'
+    Flujo Server-Sent Events con los cambios que afectan al usuario de la sesión: tareas creadas,
+    actualizadas, completadas o borradas, cambios de proyectos, ediciones de notas e inicio y fin de
+    sesiones de enfoque. Cada evento lleva los identificadores y la versión de sincronización para que
+    el cliente vuelva a pedir los datos o llame a /api/sync. Al reconectar con Last-Event-ID se
+    reenvían los eventos perdidos; un evento `reset` indica que el cliente debe recargar sus datos.
+    Con workers de hilos la respuesta trae solo los eventos pendientes y se cierra (ver _stream_mode).
     """
     if 'user_id' not in session:
         return jsonify({'error': 'No autenticado'}), 401
-    
     user_id = session['user_id']
-    search_term = request.args.get('q', '').strip()
-    search_type = request.args.get('type', 'all').lower()
-    
-    if not search_term:
-        return jsonify({'error': 'Término de búsqueda requerido'}), 400
-    
-    if len(search_term) < 2:
-        return jsonify({'error': 'El término de búsqueda debe tener al menos 2 caracteres'}), 400
-    
-    # Preparar el término para búsqueda con LIKE
-    search_pattern = f"%{search_term}%"
-    
-    results = {
-        'query': search_term,
-        'tasks': [],
-        'projects': [],
-        'notes': []
-    }
-    
-    conn = None
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if _stream_mode() == 'poll':
+        try:
+            events, reset, newest = event_bus.read_since(user_id, last_event_id)
+        except mysql.connector.Error as err:
+            print(f"Error reading stream events: {err}")
+            return jsonify({'error': 'Error interno del servidor'}), 500
+        chunks = [f"retry: {STREAM_POLL_RETRY_MS}\n\n"]
+        if reset:
+            chunks.append("event: reset\ndata: {}\n\n")
+        chunks.extend(
+            f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n" for event_id, event_type, payload in events
+        )
+        # Sin datos no se dispara ningún evento, pero el navegador guarda el id para la siguiente consulta
+        chunks.append(f"id: {newest}\n\n")
+        response = Response(''.join(chunks), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Buscar en tareas (si el usuario es el asignado o creador)
-        if search_type in ['all', 'tasks']:
-            cursor.execute("""
+        subscription = event_bus.subscribe(user_id, last_event_id)
+    except mysql.connector.Error as err:
+        print(f"Error subscribing to stream events: {err}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+    if subscription is None:
+        return jsonify({'error': 'Demasiadas conexiones abiertas, inténtalo más tarde'}), 503
+
+    def generate():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while True:
+                events, overflowed = subscription.wait(STREAM_HEARTBEAT_SECONDS)
+                if overflowed:
+                    yield "event: reset\ndata: {}\n\n"
+                chunks = [
+                    f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+                    for event_id, event_type, payload in events
+                ]
+                # Sin eventos se envía un comentario: mantiene viva la conexión y detecta clientes desconectados
+                yield ''.join(chunks) if chunks else ": ping\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Evita que un proxy nginx acumule los eventos
+    return response
+
+# --- Puntos finales de API: Sincronización incremental ---
+@app.route('/api/sync', methods=['GET'])
+def sync_changes():
+    """
+    Devuelve las tareas (asignadas al usuario), proyectos y notas (del usuario) que cambiaron
+    después de la versión `since`, y los identificadores borrados desde entonces. El cliente
+    guarda `version` y la envía como `since` en la siguiente llamada.
+    Sin `since` (o con 0), o si las lápidas de ese rango ya se purgaron, responde con todos los
+    datos y `reset: true` para que el cliente reemplace su copia local.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    user_id = session['user_id']
+
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({'error': "'since' debe ser un entero no negativo"}), 400
+
+    try:
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Todas las lecturas ven la misma instantánea que la versión devuelta
+            conn.start_transaction(consistent_snapshot=True, readonly=True)
+            cursor.execute("SELECT current_version, pruned_version FROM sync_state WHERE id = 1")
+            state = cursor.fetchone()
+            version = state['current_version']
+            reset = since == 0 or since < state['pruned_version'] or since > version
+            since_sql = '' if reset else ' AND t.row_version > %s'
+            since_params = () if reset else (since,)
+
+            cursor.execute(f"""
                 SELECT 
-                    t.task_id,
+                    t.task_id, 
+                    t.project_id, 
+                    p.title AS project_name,
                     t.title AS task_title,
                     t.description,
-                    t.status,
-                    t.worseness AS priority,
+                    t.status, 
+                    t.assigned_to,
+                    u.username AS assigned_username,
                     t.due_date,
-                    t.created_at,
-                    p.title AS project_name,
-                    u.username AS assigned_to_username
+                    t.worseness,
+                    t.completed_at, 
+                    t.created_at, 
+                    t.created_by
                 FROM tasks t
-                LEFT JOIN projects p ON t.project_id = p.project_id
                 LEFT JOIN users u ON t.assigned_to = u.user_id
-                WHERE (t.assigned_to = %s OR t.created_by = %s)
-                  AND (t.title LIKE %s OR t.description LIKE %s)
-                ORDER BY t.created_at DESC
-                LIMIT 20
-            """, (user_id, user_id, search_pattern, search_pattern))
-            results['tasks'] = cursor.fetchall()
-        
-        # Buscar en proyectos (todos los proyectos visibles para el usuario)
-        if search_type in ['all', 'projects']:
-            cursor.execute("""
-                SELECT 
-                    p.project_id,
-                    p.title AS project_name,
-                    p.description,
-                    p.status,
-                    p.created_at,
-                    u.username AS created_by_username,
+                LEFT JOIN projects p ON t.project_id = p.project_id
+                WHERE t.assigned_to = %s{since_sql}
+                ORDER BY t.due_date ASC, t.task_id ASC
+            """, (user_id, *since_params))
+            tasks = cursor.fetchall()
+
+            cursor.execute(f"""
+                SELECT p.project_id, p.title AS project_name, p.description, p.created_by, p.created_at, p.status,
                     (SELECT COUNT(*) FROM tasks t WHERE t.project_id = p.project_id) AS task_count
                 FROM projects p
-                LEFT JOIN users u ON p.created_by = u.user_id
-                WHERE p.title LIKE %s OR p.description LIKE %s
-                ORDER BY p.created_at DESC
-                LIMIT 20
-            """, (search_pattern, search_pattern))
-            results['projects'] = cursor.fetchall()
-        
-        # Buscar en notas (solo las del usuario autenticado)
-        if search_type in ['all', 'notes']:
-            cursor.execute("""
-                SELECT 
-                    note_id,
-                    content,
-                    is_pinned,
-                    created_at,
-                    updated_at
+                {'' if reset else 'WHERE p.row_version > %s'}
+            """, since_params)
+            projects = cursor.fetchall()
+
+            cursor.execute(f"""
+                SELECT note_id, content, is_pinned, created_at, updated_at
                 FROM notes
-                WHERE user_id = %s AND content LIKE %s
+                WHERE user_id = %s{'' if reset else ' AND row_version > %s'}
                 ORDER BY updated_at DESC
-                LIMIT 20
-            """, (user_id, search_pattern))
-            results['notes'] = cursor.fetchall()
-        
-        # Calcular totales
-        results['total_results'] = len(results['tasks']) + len(results['projects']) + len(results['notes'])
-        
-        return jsonify(results)
-        
+            """, (user_id, *since_params))
+            notes = cursor.fetchall()
+
+            deleted = {'tasks': [], 'projects': [], 'notes': []}
+            if not reset:
+                cursor.execute("""
+                    SELECT entity, entity_id
+                    FROM sync_tombstones
+                    WHERE version > %s AND (user_id = %s OR user_id IS NULL)
+                    ORDER BY version
+                """, (since, user_id))
+                for row in cursor.fetchall():
+                    deleted[row['entity'] + 's'].append(row['entity_id'])
+            conn.commit()
+
+        # Una tarea reasignada y devuelta al usuario aparece como cambiada, no como borrada
+        changed_task_ids = {task['task_id'] for task in tasks}
+        deleted['tasks'] = [task_id for task_id in deleted['tasks'] if task_id not in changed_task_ids]
+
+        return jsonify({
+            'version': version,
+            'reset': reset,
+            'tasks': tasks,
+            'projects': projects,
+            'notes': notes,
+            'deleted': deleted,
+        }), 200
+    except mysql.connector.Error as err:
+        print(f"Error syncing changes: {err}")
+        return jsonify({'error': str(err)}), 500
+
+# --- Puntos finales de API: Arranque del dashboard ---
+# Hilos que ejecutan en paralelo las consultas del arranque; cada una toma su propia conexión del pool
+DASHBOARD_WORKERS = int(os.environ.get('DASHBOARD_WORKERS', 8))
+dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+def _run_in_request_context(func, *args):
+    """
+    Envuelve `func` para ejecutarla en otro hilo con una copia del contexto de la petición.
+    Devuelve también las consultas y el rastreo SQL del hilo para sumarlos a los de la petición.
+    """
+    @copy_current_request_context
+    def runner():
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+        result = func(*args)
+        return result, g.sql_count, g.sql_seconds, g.pop('sql_trace', [])
+    return runner
+
+def _collect_result(future):
+    """Resultado de una tarea lanzada con _run_in_request_context; suma sus consultas SQL a las de la petición."""
+    result, sql_count, sql_seconds, sql_trace = future.result()
+    g.sql_count = g.get('sql_count', 0) + sql_count
+    g.sql_seconds = g.get('sql_seconds', 0.0) + sql_seconds
+    if sql_trace:
+        g.setdefault('sql_trace', []).extend(sql_trace)
+    return result
+
+@app.route('/api/dashboard/bootstrap', methods=['GET'])
+def dashboard_bootstrap():
+    """
+    Devuelve en una sola respuesta todo lo que el dashboard necesita para el primer pintado:
+    tareas, proyectos, notas fijadas, actividad reciente, resumen de analítica, sesión de enfoque
+    activa, usuarios y colaboradores. Las consultas son independientes y se ejecutan en paralelo.
+    Acepta los mismos `start_date`/`end_date` opcionales que /tasks, /projects y el resumen.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    user_id = session['user_id']
+
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if start_date and end_date:
+        try:
+            datetime.strptime(start_date, '%Y-%m-%d')
+            datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Formato de fecha inválido. Usar YYYY-MM-DD.'}), 400
+
+    jobs = {
+        'tasks': (_fetch_tasks, user_id, start_date, end_date),
+        'projects': (_fetch_projects, start_date, end_date),
+        'pinnedNotes': (_fetch_notes, user_id, True),
+        'recentActivity': (_fetch_recent_activity,),
+        'analyticsSummary': (_analytics_summary, user_id, start_date, end_date),
+        'users': (_fetch_users,),
+        'collaborators': (_fetch_collaborators,),
+        'activeSession': (_get_active_focus_session, user_id),
+    }
+
+    try:
+        futures = {
+            key: dashboard_executor.submit(_run_in_request_context(func, *args))
+            for key, (func, *args) in jobs.items()
+        }
+        payload = {}
+        errors = []
+        for key, future in futures.items():
+            try:
+                payload[key] = _collect_result(future)
+            except mysql.connector.Error as err:
+                errors.append(err)
+        if errors:
+            raise errors[0]
+    except mysql.connector.Error as err:
+        print(f"Error building dashboard bootstrap: {err}")
+        return jsonify({'error': str(err)}), 500
+
+    active_session = payload['activeSession']
+    if active_session:
+        active_session['start_time'] = active_session['start_time'].isoformat()
+    return jsonify(payload), 200
+
+# --- Índice invertido en memoria para la búsqueda global ---
+SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX_ENABLED', '1') == '1'
+SEARCH_INDEX_REBUILD_CHUNK = int(os.environ.get('SEARCH_INDEX_REBUILD_CHUNK', 5000))  # Filas por consulta al reconstruir
+# Registro de cambios `search_changes` (migración 0011) con el que cada proceso pone al día su índice.
+# Un cambio se da por asentado (ya no puede aparecer otro con change_id menor) pasada esta antigüedad,
+# que debe superar la transacción de escritura más larga; los más recientes se aplican igualmente.
+SEARCH_CHANGES_SETTLE_SECONDS = int(os.environ.get('SEARCH_CHANGES_SETTLE_SECONDS', 60))
+SEARCH_CHANGES_RETENTION_SECONDS = int(os.environ.get('SEARCH_CHANGES_RETENTION_SECONDS', 86400))
+SEARCH_CHANGES_READ_LIMIT = 5000  # Cambios por lectura
+SEARCH_CHANGES_PRUNE_SECONDS = 300  # Cada cuánto purga cada proceso los cambios caducados
+SEARCH_STOPWORDS = frozenset((
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los', 'o', 'para', 'por',
+    'que', 'se', 'su', 'un', 'una', 'y',
+))
+SUGGEST_LIMIT = 8  # Sugerencias por defecto de /api/search/suggest (máximo SUGGEST_MAX_LIMIT)
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_SCAN_LIMIT = int(os.environ.get('SUGGEST_SCAN_LIMIT', 2000))  # Entradas recorridas por prefijo y ámbito
+SUGGEST_KEY_WORDS = 6  # Palabras de cada título desde las que se puede empezar a escribir
+SUGGEST_KEY_LENGTH = 48  # Caracteres guardados por clave
+SUGGEST_CACHE_SECONDS = float(os.environ.get('SUGGEST_CACHE_SECONDS', 30))
+SUGGEST_CACHE_USERS = int(os.environ.get('SUGGEST_CACHE_USERS', 10000))
+
+class _FoldTable(dict):
+    """Tabla para str.translate: cada carácter sin tilde (primer carácter de su forma NFD), calculada al usarse."""
+
+    def __missing__(self, codepoint):
+        folded = self[codepoint] = unicodedata.normalize('NFD', chr(codepoint))[0]
+        return folded
+
+FOLD_TABLE = _FoldTable()
+
+def _fold(text):
+    """Minúsculas sin tildes, carácter a carácter (misma longitud que `text`)."""
+    return text.lower().translate(FOLD_TABLE)
+
+def _index_tokens(text):
+    """Palabras normalizadas (sin tildes, en minúsculas) de `text`, sin palabras vacías ni letras sueltas."""
+    if not text:
+        return []
+    return [token for token in re.findall(r'\w+', _fold(text)) if len(token) > 1 and token not in SEARCH_STOPWORDS]
+
+def _trigrams(token, prefix=False):
+    """Trigramas de la palabra con marcas de inicio y fin (sin la de fin si `prefix`)."""
+    padded = f"^{token}" if prefix else f"^{token}$"
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+def _edit_distance(a, b, limit):
+    """Distancia de Levenshtein entre `a` y `b`, o `limit + 1` si la supera."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class InvertedIndex:
+    """
+    Índice invertido de un tipo de contenido. Las entradas se agrupan por ámbito de visibilidad:
+    el id de cada usuario que puede ver el documento, o None si es visible para todos. Una búsqueda
+    solo recorre las entradas de su usuario y las públicas, así que su coste depende de los datos
+    del usuario y no del tamaño de la tabla. Un índice de trigramas sobre el vocabulario permite
+    encontrar palabras por prefijo o con erratas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}  # doc_id -> ({palabra: peso}, ámbitos, recencia)
+        self._postings = {}  # (ámbito, palabra) -> {doc_id}
+        self._vocabulary = collections.Counter()  # palabra -> entradas que la usan
+        self._trigrams = collections.defaultdict(set)  # trigrama -> {palabra}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def upsert(self, doc_id, weighted_texts, owners, recency):
+        """Indexa (o reindexa) un documento. `owners` es None para documentos visibles para todos."""
+        tokens = {}
+        for text, weight in weighted_texts:
+            for token in _index_tokens(text):
+                tokens[token] = max(tokens.get(token, 0), weight)
+        scopes = (None,) if owners is None else tuple({owner for owner in owners if owner is not None})
+        with self._lock:
+            self._remove(doc_id)
+            self._add(doc_id, tokens, scopes, recency)
+
+    def remove(self, doc_ids):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+
+    def remove_owner(self, user_id):
+        """Quita al usuario de la visibilidad de todos los documentos; borra los que se quedan sin ninguno."""
+        with self._lock:
+            for doc_id, (tokens, scopes, recency) in list(self._docs.items()):
+                if user_id not in scopes:
+                    continue
+                self._remove(doc_id)
+                remaining = tuple(scope for scope in scopes if scope != user_id)
+                if remaining:
+                    self._add(doc_id, tokens, remaining, recency)
+
+    def _add(self, doc_id, tokens, scopes, recency):
+        self._docs[doc_id] = (tokens, scopes, recency)
+        for scope in scopes:
+            for token in tokens:
+                posting = self._postings.get((scope, token))
+                if posting is None:
+                    posting = self._postings[(scope, token)] = set()
+                    if not self._vocabulary[token]:
+                        for trigram in _trigrams(token):
+                            self._trigrams[trigram].add(token)
+                    self._vocabulary[token] += 1
+                posting.add(doc_id)
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        tokens, scopes, _ = doc
+        for scope in scopes:
+            for token in tokens:
+                posting = self._postings.get((scope, token))
+                if posting is None:
+                    continue
+                posting.discard(doc_id)
+                if posting:
+                    continue
+                del self._postings[(scope, token)]
+                self._vocabulary[token] -= 1
+                if self._vocabulary[token] <= 0:
+                    del self._vocabulary[token]
+                    for trigram in _trigrams(token):
+                        words = self._trigrams.get(trigram)
+                        if words is not None:
+                            words.discard(token)
+                            if not words:
+                                del self._trigrams[trigram]
+
+    def _expand(self, term):
+        """
+        Palabras del vocabulario que casan con `term` y su peso: exacta 1.0, prefijo 0.8 y, a partir
+        de 4 letras, con una errata 0.6 (dos erratas 0.4 a partir de 8 letras).
+        """
+        matches = {}
+        if self._vocabulary.get(term):
+            matches[term] = 1.0
+        prefix_trigrams = _trigrams(term, prefix=True)
+        candidates = set.intersection(*(self._trigrams.get(trigram, set()) for trigram in prefix_trigrams))
+        for token in candidates:
+            if token != term and token.startswith(term):
+                matches[token] = 0.8
+        if len(term) >= 4:
+            max_distance = 2 if len(term) >= 8 else 1
+            term_trigrams = _trigrams(term)
+            shared = collections.Counter()
+            for trigram in term_trigrams:
+                shared.update(self._trigrams.get(trigram, ()))
+            # Lema de los q-gramas: cada edición destruye como mucho 3 trigramas
+            required = len(term_trigrams) - 3 * max_distance
+            for token, count in shared.items():
+                if token in matches or count < required:
+                    continue
+                distance = _edit_distance(term, token, max_distance)
+                if distance <= max_distance:
+                    matches[token] = 0.6 if distance == 1 else 0.4
+        return matches
+
+    def search(self, terms, user_id, limit, after=None):
+        """
+        Documentos visibles para `user_id` que contienen todos los términos (por palabra exacta, prefijo
+        o con erratas), ordenados por puntuación, recencia e id. Con `after` (puntuación, recencia, id)
+        devuelve los siguientes a ese. Devuelve (aciertos [(puntuación, recencia, doc_id)], total de
+        documentos que casan, palabras que casaron).
+        """
+        scopes = (None, user_id)
+        scores = None
+        matched_tokens = set()
+        with self._lock:
+            for term in terms:
+                term_scores = {}
+                for token, match_weight in self._expand(term).items():
+                    for scope in scopes:
+                        for doc_id in self._postings.get((scope, token), ()):
+                            score = match_weight * self._docs[doc_id][0][token]
+                            if score > term_scores.get(doc_id, 0):
+                                term_scores[doc_id] = score
+                                matched_tokens.add(token)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+                if not scores:
+                    return [], 0, matched_tokens
+            ranked = ((score, self._docs[doc_id][2], doc_id) for doc_id, score in scores.items())
+            if after is not None:
+                after = tuple(after)
+                ranked = (hit for hit in ranked if hit < after)
+            hits = heapq.nlargest(limit, ranked)
+        return hits, len(scores), matched_tokens
+
+def _suggest_key(text):
+    """Texto normalizado para el autocompletado: palabras sin tildes ni mayúsculas separadas por un espacio."""
+    return ' '.join(re.findall(r'\w+', _fold(text or '')))
+
+_suggestion_epochs = itertools.count()
+
+class SuggestionIndex:
+    """
+    Tabla de prefijos ordenada para el autocompletado. Cada ámbito de visibilidad (un usuario, o None
+    para lo visible para todos) tiene una lista ordenada de entradas (clave, fuente, doc_id, al_inicio)
+    con una clave por palabra de cada título: el título normalizado desde esa palabra. Así "inf" encuentra
+    "Revisar informe" y "revisar inf" también. Un prefijo es un rango contiguo de la lista que se
+    localiza con bisect, y las altas y bajas son inserciones y borrados en listas de un solo usuario
+    (o en las de proyectos y usuarios, que son pequeñas).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}  # (fuente, doc_id) -> (etiqueta, entradas, ámbitos, recencia)
+        self._tables = {}  # ámbito -> [(clave, fuente, doc_id, al_inicio)] ordenada
+        self._generations = collections.Counter()  # ámbito -> cambios, para invalidar la caché de prefijos
+        self._epoch = next(_suggestion_epochs)  # Distingue esta tabla de la que sustituye al reconstruir
+        self._loading = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def begin_load(self):
+        """Durante una reconstrucción solo se guardan los documentos; end_load() crea las tablas ordenándolas una vez."""
+        with self._lock:
+            self._loading = True
+            self._tables = {}
+
+    def end_load(self):
+        tables = collections.defaultdict(list)
+        with self._lock:
+            for _, entries, scopes, _ in self._docs.values():
+                for scope in scopes:
+                    tables[scope].extend(entries)
+            for table in tables.values():
+                table.sort()
+            self._tables = dict(tables)
+            self._loading = False
+            for scope in self._tables:
+                self._generations[scope] += 1
+
+    def upsert(self, source, doc_id, label, texts, owners, recency):
+        entries = set()
+        for text in texts:
+            words = _suggest_key(text).split(' ')
+            for position in range(min(len(words), SUGGEST_KEY_WORDS)):
+                key = ' '.join(words[position:])[:SUGGEST_KEY_LENGTH]
+                if key:
+                    entries.add((key, source, doc_id, position == 0))
+        scopes = (None,) if owners is None else tuple({owner for owner in owners if owner is not None})
+        with self._lock:
+            self._remove((source, doc_id))
+            if entries and label and scopes:
+                self._add((source, doc_id), (label, tuple(entries), scopes, recency))
+
+    def remove(self, source, doc_ids):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove((source, doc_id))
+
+    def remove_owner(self, user_id):
+        """Quita al usuario de la visibilidad de sus documentos; borra los que se quedan sin ninguno."""
+        with self._lock:
+            for doc_key, doc in list(self._docs.items()):
+                if user_id not in doc[2]:
+                    continue
+                self._remove(doc_key)
+                remaining = tuple(scope for scope in doc[2] if scope != user_id)
+                if remaining:
+                    self._add(doc_key, (*doc[:2], remaining, doc[3]))
+
+    def _add(self, doc_key, doc):
+        self._docs[doc_key] = doc
+        if self._loading:
+            return
+        _, entries, scopes, _ = doc
+        for scope in scopes:
+            table = self._tables.setdefault(scope, [])
+            for entry in entries:
+                bisect.insort(table, entry)
+            self._generations[scope] += 1
+
+    def _remove(self, doc_key):
+        doc = self._docs.pop(doc_key, None)
+        if doc is None or self._loading:
+            return
+        _, entries, scopes, _ = doc
+        for scope in scopes:
+            table = self._tables.get(scope)
+            if table is None:
+                continue
+            for entry in entries:
+                position = bisect.bisect_left(table, entry)
+                if position < len(table) and table[position] == entry:
+                    del table[position]
+            if not table:
+                del self._tables[scope]
+            self._generations[scope] += 1
+
+    def generation(self, user_id):
+        """Versión de lo que ve `user_id`: cambia con cualquier alta o baja en sus ámbitos."""
+        return self._epoch, self._generations[None], self._generations[user_id]
+
+    def candidates(self, prefix, user_id):
+        """
+        Entradas visibles para `user_id` cuya clave empieza por `prefix`, como [(clave, fuente, doc_id,
+        al_inicio)], y si están todas (False si algún ámbito tenía más de SUGGEST_SCAN_LIMIT).
+        """
+        matches = []
+        complete = True
+        with self._lock:
+            for scope in (None, user_id):
+                table = self._tables.get(scope)
+                if not table:
+                    continue
+                position = bisect.bisect_left(table, (prefix,))
+                end = min(len(table), position + SUGGEST_SCAN_LIMIT)
+                while position < end and table[position][0].startswith(prefix):
+                    matches.append(table[position])
+                    position += 1
+                if position < len(table) and table[position][0].startswith(prefix):
+                    complete = False
+        return matches, complete
+
+    def rank(self, matches, limit):
+        """Las `limit` mejores sugerencias [(fuente, doc_id, etiqueta)]: primero las que empiezan por el prefijo, luego las recientes."""
+        best = {}
+        for _, source, doc_id, at_start in matches:
+            best[(source, doc_id)] = best.get((source, doc_id), False) or at_start
+        with self._lock:
+            ranked = heapq.nlargest(
+                limit,
+                ((at_start, self._docs[doc_key][3], doc_key) for doc_key, at_start in best.items() if doc_key in self._docs),
+            )
+            return [(source, doc_id, self._docs[(source, doc_id)][0]) for _, _, (source, doc_id) in ranked]
+
+class SuggestionCache:
+    """
+    Último prefijo consultado por cada usuario y sus entradas, durante SUGGEST_CACHE_SECONDS. Mientras se
+    sigue escribiendo, cada consulta que alarga ese prefijo filtra las entradas guardadas en vez de
+    recorrer de nuevo las tablas. Se descarta si cambia algún ámbito que ve el usuario, también por
+    cambios hechos en otro proceso: los aplica SearchIndex.sync() antes de cada consulta y cambian la
+    generación, igual que una reconstrucción, que crea una tabla con otra época.
+    """
+
+    def __init__(self, max_users=SUGGEST_CACHE_USERS, ttl=SUGGEST_CACHE_SECONDS):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # user_id -> (prefijo, entradas, generación, caducidad)
+        self.max_users = max_users
+        self.ttl = ttl
+
+    def get(self, user_id, prefix, generation):
+        with self._lock:
+            cached = self._entries.get(user_id)
+        if cached is None:
+            return None
+        cached_prefix, matches, cached_generation, expires = cached
+        if cached_generation != generation or expires < time.monotonic() or not prefix.startswith(cached_prefix):
+            return None
+        if prefix == cached_prefix:
+            return matches
+        return [entry for entry in matches if entry[0].startswith(prefix)]
+
+    def put(self, user_id, prefix, matches, generation):
+        with self._lock:
+            self._entries[user_id] = (prefix, matches, generation, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+suggestion_cache = SuggestionCache()
+
+SEARCH_SOURCES = {
+    'tasks': {
+        'key': 'task_id',
+        'select': "SELECT task_id, title, description, assigned_to, created_by, created_at FROM tasks",
+        'document': lambda row: ([(row['title'], 2), (row['description'], 1)],
+                                 (row['assigned_to'], row['created_by']), row['created_at']),
+        'suggestion': lambda row: (row['title'], (row['title'],), (row['assigned_to'], row['created_by']), row['created_at']),
+    },
+    'projects': {
+        'key': 'project_id',
+        'select': "SELECT project_id, title, description, created_at FROM projects",
+        'document': lambda row: ([(row['title'], 2), (row['description'], 1)], None, row['created_at']),
+        'suggestion': lambda row: (row['title'], (row['title'],), None, row['created_at']),
+    },
+    'notes': {
+        'key': 'note_id',
+        'select': "SELECT note_id, content, user_id, updated_at FROM notes",
+        'document': lambda row: ([(row['content'], 1)], (row['user_id'],), row['updated_at']),
+        # Las notas no tienen título: se sugiere su primera línea
+        'suggestion': lambda row: (_note_title(row['content']), (_note_title(row['content']),), (row['user_id'],), row['updated_at']),
+    },
+    'resources': {
+        'key': 'resource_id',
+        'select': "SELECT resource_id, title, description, category, user_id, created_at FROM resources",
+        'document': lambda row: ([(row['title'], 2), (row['description'], 1), (row['category'], 1)],
+                                 (row['user_id'],), row['created_at']),
+        'suggestion': None,
+    },
+    # Visibles para quien ve su tarea; `parent` permite reindexarlos cuando la tarea cambia o se borra
+    'focus_objectives': {
+        'key': 'objective_id',
+        'parent': 'task_id',
+        'select': """SELECT o.objective_id, o.task_id, o.objective_text, t.assigned_to, t.created_by, o.created_at
+                     FROM focus_objectives o JOIN tasks t ON o.task_id = t.task_id""",
+        'document': lambda row: ([(row['objective_text'], 1)], (row['assigned_to'], row['created_by']), row['created_at']),
+        'suggestion': None,
+    },
+    # Solo para el autocompletado: nombre de usuario y nombre completo
+    'users': {
+        'key': 'user_id',
+        'select': "SELECT user_id, username, first_name, last_name FROM users",
+        'document': None,
+        'suggestion': lambda row: (f"{row['username']} ({row['first_name']} {row['last_name']})".replace(' )', ')'),
+                                   (row['username'], f"{row['first_name']} {row['last_name']}"), None, None),
+    },
+}
+
+def _note_title(content):
+    return (content or '').strip().split('\n', 1)[0][:80]
+
+def _recency(value):
+    return value.timestamp() if isinstance(value, datetime) else 0.0
+
+class SearchIndex:
+    """
+    Índices invertidos de tareas, proyectos, notas y recursos, y la tabla de prefijos del autocompletado.
+    Cada proceso los construye desde MySQL en un hilo al recibir la primera petición y, antes de responder
+    una búsqueda, los pone al día con el registro `search_changes` que rellenan los triggers (`sync`), así
+    que un cambio hecho en cualquier proceso se ve en todos. Hasta que termina la construcción (`ready`),
+    /api/search usa FULLTEXT en MySQL y /api/search/suggest no devuelve sugerencias.
+    """
+
+    def __init__(self):
+        self.indexes = {source: InvertedIndex() for source, spec in SEARCH_SOURCES.items() if spec['document']}
+        self.suggestions = SuggestionIndex()
+        self._children = collections.defaultdict(set)  # (fuente, id del padre) -> {doc_id}
+        self.ready = False
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # Una sola puesta al día a la vez; el cambio de índices también la toma
+        self._position = 0  # Último change_id asentado aplicado: todos los anteriores están aplicados
+        self._applied = set()  # change_id posteriores a _position ya aplicados
+        self._synced_at = 0.0
+        self._next_prune = 0.0
+
+    def start_rebuild(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name='search-index-rebuild', daemon=True).start()
+
+    def _rebuild(self):
+        """
+        Construye índices nuevos y sustituye con ellos los actuales. Se empieza por anotar la posición del
+        registro de cambios, así la primera puesta al día vuelve a leer lo escrito durante la construcción.
+        """
+        started = time.perf_counter()
+        indexes = {source: InvertedIndex() for source, spec in SEARCH_SOURCES.items() if spec['document']}
+        suggestions = SuggestionIndex()
+        children = collections.defaultdict(set)
+        suggestions.begin_load()
+        try:
+            with db_cursor() as (conn, cursor):
+                cursor.execute(
+                    "SELECT COALESCE(MAX(change_id), 0) FROM search_changes "
+                    "WHERE created_at <= NOW(6) - INTERVAL %s SECOND",
+                    (SEARCH_CHANGES_SETTLE_SECONDS,)
+                )
+                position = cursor.fetchone()[0]
+                # Las peticiones de reconstrucción ya anotadas quedan atendidas con esta
+                cursor.execute("SELECT change_id FROM search_changes WHERE change_id > %s AND source = '*'", (position,))
+                applied = {row[0] for row in cursor.fetchall()}
+            for source, spec in SEARCH_SOURCES.items():
+                last_id = 0
+                while True:
+                    with db_cursor(dictionary=True) as (conn, cursor):
+                        cursor.execute(
+                            f"{spec['select']} WHERE {spec['key']} > %s ORDER BY {spec['key']} LIMIT %s",
+                            (last_id, SEARCH_INDEX_REBUILD_CHUNK)
+                        )
+                        rows = cursor.fetchall()
+                    self._index_rows(source, rows, indexes, suggestions, children)
+                    if len(rows) < SEARCH_INDEX_REBUILD_CHUNK:
+                        break
+                    last_id = rows[-1][spec['key']]
+        except mysql.connector.Error as err:
+            report_failure('search_index_rebuild', "Error reconstruyendo el índice de búsqueda: %s", err)
+            with self._lock:
+                self._rebuilding = False  # Se reintentará con la siguiente petición
+            return
+        suggestions.end_load()
+        with self._sync_lock:
+            self.indexes, self.suggestions, self._children = indexes, suggestions, children
+            self._position, self._applied, self._synced_at = position, applied, time.monotonic()
+            self.ready = True
+        with self._lock:
+            self._rebuilding = False
+        sizes = ', '.join(f"{source}: {len(index)}" for source, index in indexes.items())
+        sizes += f", sugerencias: {len(suggestions)}"
+        print(f"Índice de búsqueda reconstruido en {time.perf_counter() - started:.1f}s ({sizes})")
+
+    def _restart(self):
+        """Deja de usar el índice hasta reconstruirlo (con _sync_lock tomado)."""
+        self.ready = False
+        self.start_rebuild()
+        return False
+
+    def sync(self):
+        """
+        Aplica los cambios del registro posteriores a la última puesta al día de este proceso y devuelve
+        si el índice se puede usar. Cada cambio solo indica qué documento releer, así que aplicarlo dos
+        veces no tiene efecto. Lanza mysql.connector.Error si no se puede leer el registro.
+        """
+        if not SEARCH_INDEX_ENABLED:
+            return False
+        if not self.ready:
+            self.start_rebuild()
+            return False
+        with self._sync_lock:
+            if not self.ready:
+                return False
+            # Si el proceso estuvo tanto tiempo sin leer el registro, puede que ya se hayan purgado cambios que no vio
+            if time.monotonic() - self._synced_at > SEARCH_CHANGES_RETENTION_SECONDS / 2:
+                return self._restart()
+            with db_cursor() as (conn, cursor):
+                changes = []
+                after = self._position
+                while True:
+                    cursor.execute(
+                        "SELECT change_id, source, doc_id, created_at <= NOW(6) - INTERVAL %s SECOND "
+                        "FROM search_changes WHERE change_id > %s ORDER BY change_id LIMIT %s",
+                        (SEARCH_CHANGES_SETTLE_SECONDS, after, SEARCH_CHANGES_READ_LIMIT)
+                    )
+                    rows = cursor.fetchall()
+                    changes.extend(rows)
+                    if len(rows) < SEARCH_CHANGES_READ_LIMIT:
+                        break
+                    after = rows[-1][0]
+                pending = collections.defaultdict(set)
+                for change_id, source, doc_id, _ in changes:
+                    if change_id not in self._applied:
+                        pending[source].add(doc_id)
+                if '*' in pending:  # Cambio masivo (p. ej. `flask seed`): se vuelve a construir todo
+                    return self._restart()
+                self._apply(cursor, pending)
+                conn.commit()
+                self._applied.update(change_id for change_id, _, _, _ in changes)
+                # La posición solo avanza sobre los cambios asentados: por debajo ya no puede aparecer ninguno nuevo
+                for change_id, _, _, settled in changes:
+                    if not settled:
+                        break
+                    self._position = change_id
+                self._applied = {change_id for change_id in self._applied if change_id > self._position}
+                self._synced_at = time.monotonic()
+                if time.monotonic() >= self._next_prune:
+                    self._next_prune = time.monotonic() + SEARCH_CHANGES_PRUNE_SECONDS
+                    cursor.execute(
+                        "DELETE FROM search_changes WHERE created_at < NOW(6) - INTERVAL %s SECOND LIMIT 10000",
+                        (SEARCH_CHANGES_RETENTION_SECONDS,)
+                    )
+                    conn.commit()
+        return True
+
+    def _apply(self, cursor, pending):
+        """Vuelve a leer los documentos de `pending` ({fuente: {doc_id}}) y actualiza el índice."""
+        for source, doc_ids in pending.items():
+            if source not in SEARCH_SOURCES:
+                continue
+            missing = self.reindex(cursor, source, sorted(doc_ids))
+            if source == 'tasks':
+                # Los objetivos se ven con los permisos de su tarea
+                self.reindex_children(cursor, 'focus_objectives', sorted(doc_ids))
+            elif source == 'users':
+                # El borrado en cascada de notas y recursos no dispara sus triggers
+                for user_id in missing:
+                    self.remove_owner(user_id)
+
+    def _index_rows(self, source, rows, indexes=None, suggestions=None, children=None):
+        spec = SEARCH_SOURCES[source]
+        indexes = self.indexes if indexes is None else indexes
+        suggestions = self.suggestions if suggestions is None else suggestions
+        children = self._children if children is None else children
+        for row in rows:
+            if spec.get('parent'):
+                children[(source, row[spec['parent']])].add(row[spec['key']])
+            if spec['document']:
+                weighted_texts, owners, recency = spec['document'](row)
+                indexes[source].upsert(row[spec['key']], weighted_texts, owners, _recency(recency))
+            if spec['suggestion']:
+                label, texts, owners, recency = spec['suggestion'](row)
+                suggestions.upsert(source, row[spec['key']], label, texts, owners, _recency(recency))
+
+    def reindex(self, cursor, source, doc_ids):
+        """Vuelve a leer los documentos con `cursor` y actualiza el índice. Devuelve los ids que ya no existen."""
+        doc_ids = [doc_id for doc_id in doc_ids if doc_id is not None]
+        if not doc_ids:
+            return []
+        spec = SEARCH_SOURCES[source]
+        placeholders = ', '.join(['%s'] * len(doc_ids))
+        cursor.execute(f"{spec['select']} WHERE {spec['key']} IN ({placeholders})", tuple(doc_ids))
+        rows = cursor.fetchall()
+        if rows and not isinstance(rows[0], dict):
+            rows = [dict(zip(cursor.column_names, row)) for row in rows]
+        found = {row[spec['key']] for row in rows}
+        missing = [doc_id for doc_id in doc_ids if doc_id not in found]
+        self._remove(source, missing)
+        self._index_rows(source, rows)
+        return missing
+
+    def _remove(self, source, doc_ids):
+        if source in self.indexes:
+            self.indexes[source].remove(doc_ids)
+        self.suggestions.remove(source, doc_ids)
+
+    def reindex_children(self, cursor, source, parent_ids):
+        """Vuelve a indexar los documentos de `source` que cuelgan de `parent_ids` (p. ej. los objetivos de unas tareas)."""
+        parent_ids = [parent_id for parent_id in parent_ids if parent_id is not None]
+        if not parent_ids:
+            return
+        spec = SEARCH_SOURCES[source]
+        placeholders = ', '.join(['%s'] * len(parent_ids))
+        cursor.execute(
+            f"SELECT {spec['key']} FROM {source} WHERE {spec['parent']} IN ({placeholders})", tuple(parent_ids)
+        )
+        doc_ids = {row[spec['key']] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+        # Los que ya no existen (o cambiaron de padre) también se releen, y reindex los quita
+        for parent_id in parent_ids:
+            doc_ids.update(self._children.pop((source, parent_id), ()))
+        self.reindex(cursor, source, sorted(doc_ids))
+
+    def remove_owner(self, user_id):
+        for index in self.indexes.values():
+            index.remove_owner(user_id)
+        self.suggestions.remove_owner(user_id)
+
+    def search(self, source, terms, user_id, limit, after=None):
+        return self.indexes[source].search(terms, user_id, limit, after)
+
+search_index = SearchIndex()
+
+@app.before_request
+def start_search_index():
+    """
+    La primera petición lanza la reconstrucción del índice (no al importar, para no hacerlo en los comandos CLI).
+    Las peticiones de `flask check-query-plans` no la lanzan: cargaría la base de datos durante la revisión y,
+    al terminar, cambiaría a mitad de revisión el SQL que ejecuta /api/search.
+    """
+    if 'taskmanager.capture_sql' in request.environ:
+        return
+    if SEARCH_INDEX_ENABLED and not search_index.ready:
+        search_index.start_rebuild()
+
+def _sync_search_index():
+    """
+    Pone al día el índice de este proceso con los cambios hechos en cualquiera y devuelve si se puede usar.
+    Si no se puede leer el registro de cambios se busca en MySQL. Las peticiones de `flask check-query-plans`
+    no lo sincronizan, por lo mismo que no lo construyen.
+    """
+    if has_request_context() and 'taskmanager.capture_sql' in request.environ:
+        return SEARCH_INDEX_ENABLED and search_index.ready
+    try:
+        return search_index.sync()
+    except mysql.connector.Error as err:
+        report_failure('search_index_sync', "Error poniendo al día el índice de búsqueda: %s", err)
+        return False
+
+# --- Puntos finales de API: Búsqueda global ---
+SEARCH_PAGE_SIZE = 20  # Resultados por tipo de contenido y página (máximo SEARCH_MAX_PAGE_SIZE)
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_COUNT_LIMIT = int(os.environ.get('SEARCH_COUNT_LIMIT', 1000))  # Coincidencias contadas en MySQL; por encima el total es "al menos"
+SEARCH_TYPES = ('tasks', 'projects', 'notes', 'resources', 'focus_objectives')
+FULLTEXT_MIN_TOKEN_SIZE = int(os.environ.get('FULLTEXT_MIN_TOKEN_SIZE', 3))  # innodb_ft_min_token_size del servidor
+SEARCH_SNIPPET_LENGTH = 160
+# Hilos que ejecutan en paralelo la búsqueda de cada tipo; cada uno toma su propia conexión del pool
+SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', 8))
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix='search')
+
+def _search_terms(search_term):
+    """Palabras del término de búsqueda (sin operadores) con la longitud mínima que indexa FULLTEXT."""
+    return [word for word in re.findall(r'\w+', search_term) if len(word) >= FULLTEXT_MIN_TOKEN_SIZE]
+
+def _fulltext_query(terms):
+    """Consulta en modo booleano: todas las palabras obligatorias, cada una como prefijo."""
+    return ' '.join(f'+{term}*' for term in terms)
+
+def _search_snippet(text, terms):
+    """
+    Fragmento de `text` alrededor de la primera coincidencia con las coincidencias marcadas con <mark>.
+    El texto se escapa como HTML; sin tildes ni mayúsculas, igual que compara la colación de MySQL.
+    """
+    if not text:
+        return None
+    folded = _fold(text)
+    needles = [_fold(term) for term in terms]
+    positions = [folded.find(needle) for needle in needles if needle in folded]
+    first = min(positions) if positions else 0
+    start = max(0, min(first - SEARCH_SNIPPET_LENGTH // 4, len(text) - SEARCH_SNIPPET_LENGTH))
+    end = start + SEARCH_SNIPPET_LENGTH
+    pattern = re.compile('|'.join(re.escape(needle) for needle in sorted(needles, key=len, reverse=True)))
+    parts = []
+    cursor_position = start
+    for match in pattern.finditer(folded, start, end) if needles else ():
+        match_end = min(match.end(), end)
+        parts.append(html.escape(text[cursor_position:match.start()]))
+        parts.append(f'<mark>{html.escape(text[match.start():match_end])}</mark>')
+        cursor_position = match_end
+    parts.append(html.escape(text[cursor_position:end]))
+    return ('…' if start > 0 else '') + ''.join(parts) + ('…' if end < len(text) else '')
+
+def _search_predicate(columns, search_term, terms, fulltext):
+    """
+    (expresión de relevancia, sus parámetros, condición WHERE, sus parámetros) para buscar en `columns`:
+    con FULLTEXT usa MATCH ... AGAINST (que puntúa cada fila); sin él, el LIKE '%término%' original
+    con relevancia 0.
+    """
+    if fulltext:
+        match = f"MATCH({', '.join(columns)}) AGAINST (%s IN BOOLEAN MODE)"
+        query = _fulltext_query(terms)
+        return match, (query,), match, (query,)
+    pattern = f"%{search_term}%"
+    return "0", (), "(" + " OR ".join(f"{column} LIKE %s" for column in columns) + ")", (pattern,) * len(columns)
+
+# Consulta de resultados por tipo: {relevance} y {where} los completa el motor de búsqueda.
+# `visibility` es la condición de las filas que puede ver el usuario (con `visibility_params` veces su id)
+# y `from` las tablas que necesita, para contar coincidencias sin los JOIN de la consulta completa.
+SEARCH_RESULT_QUERIES = {
+    'tasks': {
+        'query': """
+            SELECT 
+                t.task_id,
+                t.title AS task_title,
+                t.description,
+                t.status,
+                t.worseness AS priority,
+                t.due_date,
+                t.created_at,
+                p.title AS project_name,
+                u.username AS assigned_to_username,
+                {relevance} AS relevance
+            FROM tasks t
+            LEFT JOIN projects p ON t.project_id = p.project_id
+            LEFT JOIN users u ON t.assigned_to = u.user_id
+            WHERE {where}
+        """,
+        'from': "tasks t",
+        'key': 'task_id',
+        'key_column': 't.task_id',
+        'columns': ('t.title', 't.description'),
+        'visibility': "(t.assigned_to = %s OR t.created_by = %s)",
+        'visibility_params': 2,
+        'snippet': lambda row: row['description'] or row['task_title'],
+    },
+    'projects': {
+        'query': """
+            SELECT 
+                p.project_id,
+                p.title AS project_name,
+                p.description,
+                p.status,
+                p.created_at,
+                u.username AS created_by_username,
+                (SELECT COUNT(*) FROM tasks t WHERE t.project_id = p.project_id) AS task_count,
+                {relevance} AS relevance
+            FROM projects p
+            LEFT JOIN users u ON p.created_by = u.user_id
+            WHERE {where}
+        """,
+        'from': "projects p",
+        'key': 'project_id',
+        'key_column': 'p.project_id',
+        'columns': ('p.title', 'p.description'),
+        'visibility': None,
+        'visibility_params': 0,
+        'snippet': lambda row: row['description'] or row['project_name'],
+    },
+    'notes': {
+        'query': """
+            SELECT 
+                note_id,
+                content,
+                is_pinned,
+                created_at,
+                updated_at,
+                {relevance} AS relevance
+            FROM notes
+            WHERE {where}
+        """,
+        'from': "notes",
+        'key': 'note_id',
+        'key_column': 'note_id',
+        'columns': ('content',),
+        'visibility': "user_id = %s",
+        'visibility_params': 1,
+        'snippet': lambda row: row['content'],
+    },
+    'resources': {
+        'query': """
+            SELECT
+                resource_id,
+                title,
+                description,
+                type,
+                url_or_path,
+                category,
+                created_at,
+                {relevance} AS relevance
+            FROM resources
+            WHERE {where}
+        """,
+        'from': "resources",
+        'key': 'resource_id',
+        'key_column': 'resource_id',
+        'columns': ('title', 'description', 'category'),
+        'visibility': "user_id = %s",
+        'visibility_params': 1,
+        'snippet': lambda row: row['description'] or row['title'],
+    },
+    'focus_objectives': {
+        'query': """
+            SELECT
+                o.objective_id,
+                o.objective_text,
+                o.completed,
+                o.task_id,
+                t.title AS task_title,
+                o.created_at,
+                {relevance} AS relevance
+            FROM focus_objectives o
+            JOIN tasks t ON o.task_id = t.task_id
+            WHERE {where}
+        """,
+        'from': "focus_objectives o JOIN tasks t ON o.task_id = t.task_id",
+        'key': 'objective_id',
+        'key_column': 'o.objective_id',
+        'columns': ('o.objective_text',),
+        'visibility': "(t.assigned_to = %s OR t.created_by = %s)",
+        'visibility_params': 2,
+        'snippet': lambda row: row['objective_text'],
+    },
+}
+
+def _encode_search_cursor(positions):
+    """Cursor opaco con la posición de cada tipo: {tipo: ['index', puntuación, recencia, id] o ['mysql', relevancia, id]}."""
+    raw = json.dumps(positions, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_search_cursor(cursor_token):
+    """Devuelve las posiciones de un cursor; lanza ValueError si no es válido."""
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(cursor_token + '=' * (-len(cursor_token) % 4)))
+    except (ValueError, UnicodeDecodeError) as err:
+        raise ValueError('Cursor inválido') from err
+    if not isinstance(positions, dict) or not positions:
+        raise ValueError('Cursor inválido')
+    for source, position in positions.items():
+        lengths = {'index': 4, 'mysql': 3}
+        if (source not in SEARCH_TYPES or not isinstance(position, list) or not position
+                or lengths.get(position[0]) != len(position)
+                or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in position[1:])):
+            raise ValueError('Cursor inválido')
+    return positions
+
+def _search_database(cursor, source, user_id, search_term, fulltext, limit, after):
+    """
+    Busca en MySQL (FULLTEXT o LIKE) una página de `limit` filas ordenadas por relevancia e id,
+    a partir de `after` (relevancia, id). Devuelve (filas, términos, posición siguiente o None, total).
+    El total solo se calcula en la primera página y se cuenta hasta SEARCH_COUNT_LIMIT coincidencias.
+    """
+    spec = SEARCH_RESULT_QUERIES[source]
+    terms = _search_terms(search_term)
+    relevance, relevance_params, condition, params = _search_predicate(
+        spec['columns'], search_term, terms, fulltext and bool(terms)
+    )
+    where = f"{spec['visibility']} AND {condition}" if spec['visibility'] else condition
+    where_params = (*(user_id,) * spec['visibility_params'], *params)
+    having, having_params = '', ()
+    if after is not None:
+        after_relevance, after_key = after
+        having = f"HAVING relevance < %s OR (relevance = %s AND {spec['key']} < %s) "
+        having_params = (after_relevance, after_relevance, after_key)
+    cursor.execute(
+        spec['query'].format(relevance=relevance, where=where)
+        + f"{having}ORDER BY relevance DESC, {spec['key_column']} DESC LIMIT %s",
+        (*relevance_params, *where_params, *having_params, limit + 1)
+    )
+    rows = cursor.fetchall()
+    next_position = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_position = ['mysql', rows[-1]['relevance'], rows[-1][spec['key']]]
+
+    total = None
+    if after is None:
+        if next_position is None:
+            total = {'count': len(rows), 'exact': True}
+        else:
+            # Cuenta acotada: con muchas coincidencias basta saber que hay "al menos" SEARCH_COUNT_LIMIT
+            cursor.execute(
+                f"SELECT COUNT(*) AS total FROM (SELECT 1 FROM {spec['from']} WHERE {where} LIMIT %s) AS matches",
+                (*where_params, SEARCH_COUNT_LIMIT + 1)
+            )
+            count = cursor.fetchone()['total']
+            total = {'count': min(count, SEARCH_COUNT_LIMIT), 'exact': count <= SEARCH_COUNT_LIMIT}
+    return rows, terms or [search_term], next_position, total
+
+def _search_in_memory(cursor, source, user_id, search_term, limit, after):
+    """
+    Busca en el índice en memoria una página de `limit` documentos a partir de `after` (puntuación,
+    recencia, id) y lee de MySQL por clave primaria solo esas filas. Devuelve lo mismo que
+    _search_database; el total lo da el índice y es exacto.
+    """
+    spec = SEARCH_RESULT_QUERIES[source]
+    terms = _index_tokens(search_term)
+    if not terms:
+        return [], [], None, {'count': 0, 'exact': True}
+    hits, total, matched_tokens = search_index.search(source, terms, user_id, limit + 1, after)
+    next_position = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_position = ['index', *hits[-1]]
+    total = {'count': total, 'exact': True} if after is None else None
+    if not hits:
+        return [], [], next_position, total
+    # La visibilidad se vuelve a comprobar por si el índice aún no refleja una reasignación
+    where = f"{spec['key_column']} IN ({', '.join(['%s'] * len(hits))})"
+    if spec['visibility']:
+        where += f" AND {spec['visibility']}"
+    cursor.execute(spec['query'].format(relevance='0', where=where),
+                   (*(doc_id for _, _, doc_id in hits), *(user_id,) * spec['visibility_params']))
+    rows = {row[spec['key']]: row for row in cursor.fetchall()}
+    results = []
+    for score, _, doc_id in hits:
+        row = rows.get(doc_id)
+        if row is not None:  # Borrada entre la búsqueda y la lectura
+            row['relevance'] = round(score, 3)
+            results.append(row)
+    return results, list(matched_tokens), next_position, total
+
+def _search_source(source, user_id, search_term, limit, position, fulltext, use_index):
+    """Una página de resultados de un tipo, con su `snippet`. Devuelve (filas, posición siguiente, total)."""
+    with db_cursor(dictionary=True) as (conn, cursor):
+        if position is not None and position[0] == 'index':
+            if not search_index.ready:
+                raise ValueError('Cursor caducado: vuelve a lanzar la búsqueda')
+            rows, terms, next_position, total = _search_in_memory(cursor, source, user_id, search_term, limit, position[1:])
+        elif position is None and use_index:
+            rows, terms, next_position, total = _search_in_memory(cursor, source, user_id, search_term, limit, None)
+        else:
+            after = position[1:] if position is not None else None
+            rows, terms, next_position, total = _search_database(cursor, source, user_id, search_term, fulltext, limit, after)
+    snippet_text = SEARCH_RESULT_QUERIES[source]['snippet']
+    for row in rows:
+        row['snippet'] = _search_snippet(snippet_text(row), terms)
+    return rows, next_position, total
+
+def _global_search(user_id, search_term, search_type='all', fulltext=True, use_index=None,
+                   limit=SEARCH_PAGE_SIZE, positions=None):
+    """
+    Busca en tareas, proyectos, notas, recursos y objetivos de enfoque visibles para el usuario. Cada
+    tipo se consulta en paralelo con su propia conexión del pool. Con el índice en memoria listo (y
+    `use_index` distinto de False) la búsqueda no consulta MySQL salvo para leer las filas encontradas;
+    si no, usa FULLTEXT (o LIKE con `fulltext=False`).
+
+    Cada tipo devuelve una página de `limit` resultados ordenados por relevancia, con un `snippet` con
+    las coincidencias resaltadas. `positions` (de _decode_search_cursor) continúa desde una página
+    anterior: solo se buscan los tipos que aparecen en él. `results` mezcla todos los tipos por
+    relevancia; las puntuaciones de FULLTEXT solo son comparables dentro de cada tabla. Una posición del
+    índice vale en cualquier proceso: todos se ponen al día con el mismo registro de cambios antes de
+    buscar y ordenan igual (puntuación, recencia, id).
+    """
+    if use_index is None:
+        use_index = _sync_search_index()
+    sources = [
+        source for source in SEARCH_TYPES
+        if search_type in ('all', source) and (positions is None or source in positions)
+    ]
+    futures = {}
+    for source in sources:
+        job = functools.partial(_search_source, source, user_id, search_term, limit,
+                                (positions or {}).get(source), fulltext, use_index)
+        futures[source] = search_executor.submit(_run_in_request_context(job) if has_request_context() else job)
+
+    results = {'query': search_term}
+    totals = {}
+    next_positions = {}
+    errors = []
+    for source in SEARCH_TYPES:
+        results[source] = []
+        if source not in futures:
+            continue
+        try:
+            rows, next_position, total = (
+                _collect_result(futures[source]) if has_request_context() else futures[source].result()
+            )
+        except (mysql.connector.Error, ValueError) as err:
+            errors.append(err)
+            continue
+        results[source] = rows
+        if total is not None:
+            totals[source] = total
+        if next_position is not None:
+            next_positions[source] = next_position
+    if errors:
+        raise errors[0]
+
+    merged = [
+        (row['relevance'], source, row[SEARCH_RESULT_QUERIES[source]['key']])
+        for source in sources for row in results[source]
+    ]
+    merged.sort(key=lambda item: item[0], reverse=True)
+    results['results'] = [{'type': source, 'id': key, 'relevance': relevance} for relevance, source, key in merged]
+    results['totals'] = totals
+    # Un cursor por tipo para paginar solo ese tipo, y uno conjunto para la siguiente página de todos
+    results['cursors'] = {source: _encode_search_cursor({source: position}) for source, position in next_positions.items()}
+    results['next_cursor'] = _encode_search_cursor(next_positions) if next_positions else None
+    results['total_results'] = len(merged)
+    return results
+
+@app.route('/api/search', methods=['GET'])
+def global_search():
+    """
+    Búsqueda global que busca en tareas, proyectos, notas, recursos y objetivos de enfoque del usuario autenticado.
+    Parámetros:
+    - q: término de búsqueda (requerido)
+    - type: tipo de contenido a buscar ('tasks', 'projects', 'notes', 'resources', 'focus_objectives', 'all') - por defecto 'all'
+    - limit: resultados por tipo y página (por defecto 20, máximo 50)
+    - cursor: `next_cursor` (todos los tipos) o uno de `cursors` (un tipo) de la respuesta anterior
+    Los resultados van ordenados por relevancia e incluyen un `snippet` HTML con las coincidencias en <mark>.
+    `results` los mezcla por relevancia ({type, id, relevance}) y `totals` da, en la primera página, el
+    número de coincidencias de cada tipo (`exact` es false si se contaron solo las primeras).
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    
+    user_id = session['user_id']
+    search_term = request.args.get('q', '').strip()
+    search_type = request.args.get('type', 'all').lower()
+    
+    if not search_term:
+        return jsonify({'error': 'Término de búsqueda requerido'}), 400
+    
+    if len(search_term) < 2:
+        return jsonify({'error': 'El término de búsqueda debe tener al menos 2 caracteres'}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit debe ser un número entero'}), 400
+    positions = None
+    if request.args.get('cursor'):
+        try:
+            positions = _decode_search_cursor(request.args['cursor'])
+        except ValueError as err:
+            return jsonify({'error': str(err)}), 400
+
+    try:
+        return jsonify(_global_search(user_id, search_term, search_type, limit=limit, positions=positions))
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
     except mysql.connector.Error as err:
         print(f"Error en búsqueda global: {err}")
         return jsonify({'error': 'Error interno del servidor'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+
+def _suggest(user_id, search_term, limit):
+    """Sugerencias para `search_term` desde la tabla de prefijos, reutilizando las del prefijo anterior del usuario."""
+    prefix = _suggest_key(search_term)[:SUGGEST_KEY_LENGTH]
+    if not prefix:
+        return []
+    suggestions = search_index.suggestions
+    generation = suggestions.generation(user_id)
+    matches = suggestion_cache.get(user_id, prefix, generation)
+    if matches is None:
+        matches, complete = suggestions.candidates(prefix, user_id)
+        if complete:  # Solo se puede filtrar al seguir escribiendo si no se dejó ninguna entrada sin recorrer
+            suggestion_cache.put(user_id, prefix, matches, generation)
+    return [
+        {'type': source, 'id': doc_id, 'label': label, 'highlight': _search_snippet(label, [prefix])}
+        for source, doc_id, label in suggestions.rank(matches, limit)
+    ]
+
+@app.route('/api/search/suggest', methods=['GET'])
+def search_suggest():
+    """
+    Autocompletado del buscador: títulos de tareas, proyectos y notas visibles para el usuario, y
+    nombres de usuario, que empiezan por `q` (o tienen una palabra que empieza por `q`). Se responde
+    desde memoria tras poner al día el índice con los cambios hechos en cualquier proceso; `ready` es
+    false mientras se construye el índice de búsqueda, y entonces el cliente debe usar /api/search.
+    Parámetros:
+    - q: texto escrito hasta ahora (requerido)
+    - limit: número de sugerencias (por defecto 8, máximo 20)
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+
+    search_term = request.args.get('q', '').strip()
+    if not search_term:
+        return jsonify({'error': 'Término de búsqueda requerido'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', SUGGEST_LIMIT)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit debe ser un número entero'}), 400
+
+    ready = _sync_search_index()
+    suggestions = _suggest(session['user_id'], search_term, limit) if ready else []
+    return jsonify({'query': search_term, 'ready': ready, 'suggestions': suggestions})
 
 # --- Puntos finales de API: Gestión de roles ---
 
 @app.route('/api/roles', methods=['GET'])
+@conditional_get('users')
 def get_roles():
     """Gets a distinct list of all roles in the system."""
     if 'user_id' not in session:
@@ -2153,21 +5312,15 @@ def get_roles():
     if session.get('role') != 'Administrador':
         return jsonify({'error': 'No tienes permiso para ver los roles.'}), 403
     
-    conn = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        # Select distinct, non-null, and non-empty roles
-        cursor.execute("SELECT DISTINCT role FROM users WHERE role IS NOT NULL AND role != '' ORDER BY role")
-        roles = [item[0] for item in cursor.fetchall()]
-        return jsonify(roles)
+    try:
+        with db_cursor() as (conn, cursor):
+            # Select distinct, non-null, and non-empty roles
+            cursor.execute("SELECT DISTINCT role FROM users WHERE role IS NOT NULL AND role != '' ORDER BY role")
+            roles = [item[0] for item in cursor.fetchall()]
+            return jsonify(roles)
     except mysql.connector.Error as err:
         print(f"Error getting roles: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/roles/update', methods=['PUT'])
 def update_role_name():
@@ -2187,24 +5340,19 @@ def update_role_name():
     if old_name == new_name:
         return jsonify({'message': 'Los nombres son iguales, no se realizaron cambios.'}), 200
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET role = %s WHERE role = %s", (new_name, old_name))
-        conn.commit()
+        with db_cursor() as (conn, cursor):
+            cursor.execute("UPDATE users SET role = %s WHERE role = %s", (new_name, old_name))
+            data_versions.bump('users', cursor=cursor)
+            conn.commit()
         
-        if cursor.rowcount == 0:
-            return jsonify({'message': f'No se encontraron usuarios con el rol "{old_name}". No se realizaron cambios.'}), 200
+            if cursor.rowcount == 0:
+                return jsonify({'message': f'No se encontraron usuarios con el rol "{old_name}". No se realizaron cambios.'}), 200
             
-        return jsonify({'message': f'Rol "{old_name}" actualizado a "{new_name}" para {cursor.rowcount} usuario(s).'}), 200
+            return jsonify({'message': f'Rol "{old_name}" actualizado a "{new_name}" para {cursor.rowcount} usuario(s).'}), 200
     except mysql.connector.Error as err:
         print(f"Error updating role name: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/roles/delete', methods=['DELETE'])
 def delete_role():
@@ -2224,24 +5372,19 @@ def delete_role():
     if role_to_delete.lower() == default_role.lower():
         return jsonify({'error': f'No se puede eliminar el rol por defecto "{default_role}".'}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET role = %s WHERE role = %s", (default_role, role_to_delete))
-        conn.commit()
+        with db_cursor() as (conn, cursor):
+            cursor.execute("UPDATE users SET role = %s WHERE role = %s", (default_role, role_to_delete))
+            data_versions.bump('users', cursor=cursor)
+            conn.commit()
         
-        if cursor.rowcount == 0:
-            return jsonify({'message': f'No se encontraron usuarios con el rol "{role_to_delete}". No se realizaron cambios.'}), 200
+            if cursor.rowcount == 0:
+                return jsonify({'message': f'No se encontraron usuarios con el rol "{role_to_delete}". No se realizaron cambios.'}), 200
             
-        return jsonify({'message': f'Rol "{role_to_delete}" eliminado. {cursor.rowcount} usuario(s) fueron reasignados al rol "{default_role}".'}), 200
+            return jsonify({'message': f'Rol "{role_to_delete}" eliminado. {cursor.rowcount} usuario(s) fueron reasignados al rol "{default_role}".'}), 200
     except mysql.connector.Error as err:
         print(f"Error deleting role: {err}")
         return jsonify({'error': str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 @app.route('/api/users/create', methods=['POST'])
 def create_user():
@@ -2258,50 +5401,539 @@ def create_user():
     if not all(field in data and data[field] for field in required_fields):
         return jsonify({'error': 'Todos los campos son requeridos'}), 400
 
-    conn = None
+    # Haz un hash de la contraseña antes de pedir una conexión, para no retenerla mientras dura bcrypt
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        hashed_password = password_hasher.generate(data['password'])
+    except PasswordHasherBusy as err:
+        return _password_busy_response(err)
 
-        # Verificar si el email o username ya existen
-        cursor.execute("SELECT user_id FROM users WHERE Email = %s OR username = %s", (data['email'], data['username']))
-        if cursor.fetchone():
-            return jsonify({'error': 'El email o el nombre de usuario ya están en uso.'}), 409
+    try:
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Verificar si el email o username ya existen
+            cursor.execute("SELECT user_id FROM users WHERE Email = %s OR username = %s", (data['email'], data['username']))
+            if cursor.fetchone():
+                return jsonify({'error': 'El email o el nombre de usuario ya están en uso.'}), 409
 
-        # Haz un hash de la contraseña antes de almacenarla
-        hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
-        
-        cursor.execute("""
-            INSERT INTO users (first_name, last_name, username, Email, Password, role, is_email_verified)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            data['first_name'],
-            data.get('last_name') or '', # Acepta tanto None como ''
-            data['username'],
-            data['email'],
-            hashed_password,
-            data['role'],
-            True  # Los usuarios creados por un admin se verifican automáticamente
-        ))
-        conn.commit()
-        user_id = cursor.lastrowid
+            cursor.execute("""
+                INSERT INTO users (first_name, last_name, username, Email, Password, role, is_email_verified)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (
+                data['first_name'],
+                data.get('last_name') or '', # Acepta tanto None como ''
+                data['username'],
+                data['email'],
+                hashed_password,
+                data['role'],
+                True  # Los usuarios creados por un admin se verifican automáticamente
+            ))
+            user_id = cursor.lastrowid
+            data_versions.bump('users', cursor=cursor)
+            conn.commit()
 
-        # Devolver el nuevo usuario creado (sin la contraseña)
-        cursor.execute("""
-            SELECT user_id, username, first_name, last_name, Email, role, avatar_url, is_blocked
-            FROM users WHERE user_id = %s
-        """, (user_id,))
-        new_user = cursor.fetchone()
+            # Devolver el nuevo usuario creado (sin la contraseña)
+            cursor.execute("""
+                SELECT user_id, username, first_name, last_name, Email, role, avatar_url, is_blocked
+                FROM users WHERE user_id = %s
+            """, (user_id,))
+            new_user = cursor.fetchone()
 
-        return jsonify({'message': 'Usuario creado exitosamente', 'user': new_user}), 201
+            return jsonify({'message': 'Usuario creado exitosamente', 'user': new_user}), 201
 
     except mysql.connector.Error as err:
         print(f"Error creating user: {err}")
         return jsonify({'error': f'Error de base de datos: {err}'}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+
+# --- Comandos de mantenimiento de la base de datos (flask --app app <comando>) ---
+MIGRATIONS_FOLDER = os.path.join(app.root_path, 'db', 'migrations')
+
+def _split_sql_statements(script):
+    """Divide un script SQL en sentencias, descartando comentarios de línea."""
+    lines = [line for line in script.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+@app.cli.command('build-static')
+def build_static_command():
+    """
+    Genera en static/dist copias con huella (hash del contenido en el nombre) de static/*.js y
+    static/*.css, precomprimidas con gzip y, si está instalado, brotli, y el manifiesto que usa url_for.
+    """
+    os.makedirs(STATIC_DIST_FOLDER, exist_ok=True)
+    manifest = {}
+    written = {'manifest.json'}
+    for name in sorted(os.listdir(app.static_folder)):
+        source = os.path.join(app.static_folder, name)
+        if not os.path.isfile(source) or not name.endswith(('.js', '.css')):
+            continue
+        with open(source, 'rb') as source_file:
+            content = source_file.read()
+        stem, extension = os.path.splitext(name)
+        fingerprinted = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+        variants = {fingerprinted: content, fingerprinted + '.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli:
+            variants[fingerprinted + '.br'] = brotli.compress(content, quality=11)
+        for variant, data in variants.items():
+            with open(os.path.join(STATIC_DIST_FOLDER, variant), 'wb') as variant_file:
+                variant_file.write(data)
+        written.update(variants)
+        manifest[name] = f"dist/{fingerprinted}"
+        sizes = ', '.join(f"{variant.rsplit('.', 1)[-1]}: {len(data)} B" for variant, data in variants.items())
+        click.echo(f"{name} -> {manifest[name]} ({sizes})")
+    # Las copias de compilaciones anteriores ya no se referencian
+    for name in os.listdir(STATIC_DIST_FOLDER):
+        if name not in written:
+            os.remove(os.path.join(STATIC_DIST_FOLDER, name))
+    with open(STATIC_MANIFEST_PATH, 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    static_manifest.clear()
+    static_manifest.update(manifest)
+    if not brotli:
+        click.echo("brotli no está instalado: solo se han generado copias gzip.")
+    click.echo(f"Manifiesto escrito en {STATIC_MANIFEST_PATH}. Reinicia el servidor para usar las nuevas copias.")
+
+@app.cli.command('migrate')
+@click.option('--dry-run', is_flag=True, help='Solo muestra las migraciones pendientes.')
+def migrate_command(dry_run):
+    """Aplica en orden las migraciones de db/migrations que aún no se han ejecutado."""
+    with db_cursor() as (conn, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(255) NOT NULL PRIMARY KEY,
+                applied_at DATETIME NOT NULL
+            )
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        pending = sorted(
+            filename for filename in os.listdir(MIGRATIONS_FOLDER)
+            if filename.endswith('.sql') and filename[:-4] not in applied
+        )
+        if not pending:
+            click.echo('La base de datos está al día.')
+            return
+
+        for filename in pending:
+            version = filename[:-4]
+            if dry_run:
+                click.echo(f'Pendiente: {version}')
+                continue
+            click.echo(f'Aplicando {version}...')
+            with open(os.path.join(MIGRATIONS_FOLDER, filename), encoding='utf-8') as migration:
+                statements = _split_sql_statements(migration.read())
+            # Las sentencias DDL de MySQL confirman implícitamente; la versión se registra al terminar todas
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, applied_at) VALUES (%s, %s)",
+                (version, datetime.now())
+            )
+            conn.commit()
+        click.echo('Migraciones aplicadas correctamente.' if not dry_run else f'{len(pending)} migración(es) pendiente(s).')
+
+# Vocabulario para generar títulos y contenidos realistas (en español, con tildes)
+SEED_WORDS = (
+    'revisar', 'diseño', 'informe', 'reunión', 'cliente', 'presupuesto', 'migración', 'pruebas', 'despliegue',
+    'documentación', 'análisis', 'módulo', 'facturación', 'inventario', 'campaña', 'planificación', 'corrección',
+    'integración', 'servidor', 'base', 'datos', 'usuarios', 'reporte', 'mensual', 'semanal', 'prototipo', 'API',
+    'página', 'inicio', 'sesión', 'búsqueda', 'optimización', 'rendimiento', 'seguridad', 'contraseña', 'móvil',
+    'aplicación', 'tablero', 'métricas', 'contrato', 'proveedor', 'envío', 'pedido', 'soporte', 'capacitación',
+)
+SEED_PASSWORD = 'password123'  # Contraseña común de todos los usuarios sembrados
+
+def _seed_text(rng, min_words, max_words):
+    return ' '.join(rng.choice(SEED_WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize()
+
+def _skewed_index(rng, count, skew=2.0):
+    """Índice en [0, count) con sesgo hacia los primeros: unos pocos usuarios/proyectos concentran la actividad."""
+    return min(int(count * rng.random() ** skew), count - 1)
+
+def _bulk_insert(conn, cursor, statement, rows, batch_size, label):
+    """Inserta filas en lotes multi-fila (executemany agrupa los INSERT) y confirma cada lote."""
+    batch = []
+    total = 0
+    started = time.perf_counter()
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(statement, batch)
+            conn.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(statement, batch)
+        conn.commit()
+        total += len(batch)
+    elapsed = time.perf_counter() - started
+    click.echo(f'  {label}: {total} filas en {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} filas/s)')
+
+def _next_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+SEED_TABLES = ('focus_objectives', 'focus_sessions', 'notes', 'resources', 'tasks', 'projects', 'users')
+
+@app.cli.command('seed')
+@click.option('--seed', 'seed_value', default=42, show_default=True, help='Semilla del generador; la misma semilla produce los mismos datos.')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--projects', default=500, show_default=True)
+@click.option('--tasks', default=100000, show_default=True)
+@click.option('--sessions', default=400000, show_default=True, help='Sesiones de enfoque.')
+@click.option('--notes', default=5000, show_default=True)
+@click.option('--objectives', default=50000, show_default=True, help='Objetivos de enfoque.')
+@click.option('--resources', default=2000, show_default=True)
+@click.option('--days', default=730, show_default=True, help='Días de historia hacia atrás desde hoy.')
+@click.option('--batch-size', default=5000, show_default=True, help='Filas por INSERT multi-fila.')
+@click.option('--truncate', is_flag=True, help='Vacía las tablas antes de sembrar.')
+def seed_command(seed_value, users, projects, tasks, sessions, notes, objectives, resources, days, batch_size, truncate):
+    """
+    Llena project_hub con un volumen configurable de datos sintéticos y reproducibles.
+    Los índices secundarios de las migraciones (idx_*) se eliminan durante la carga y se recrean al final.
+    Ejemplo a gran escala: flask --app app seed --users 50000 --projects 20000 --tasks 5000000 --sessions 20000000
+    """
+    if users < 1 or projects < 1:
+        raise click.ClickException('Se necesita al menos un usuario y un proyecto.')
+
+    rng = random.Random(seed_value)
+    # Las fechas se generan como desplazamientos desde hoy a medianoche: misma semilla, misma forma de los datos
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    history_seconds = days * 86400
+    password_hash = bcrypt.generate_password_hash(SEED_PASSWORD).decode('utf-8')
+
+    with db_cursor() as (conn, cursor):
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.execute("SET SESSION unique_checks = 0")
+        # Los triggers de search_changes no registran cada fila: al final se pide una reconstrucción completa
+        cursor.execute("SET @skip_search_changes = 1")
+
+        if truncate:
+            for table in SEED_TABLES:
+                cursor.execute(f"TRUNCATE TABLE {table}")
+            click.echo('Tablas vaciadas.')
+
+        # Se difieren los índices secundarios: construirlos una vez al final es mucho más rápido
+        cursor.execute("""
+            SELECT TABLE_NAME, INDEX_NAME, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) AS index_columns,
+                   MAX(INDEX_TYPE) AS index_type
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME LIKE 'idx\\_%%'
+            GROUP BY TABLE_NAME, INDEX_NAME
+        """)
+        deferred_indexes = cursor.fetchall()
+        for table, index_name, columns, index_type in deferred_indexes:
+            cursor.execute(f"DROP INDEX {index_name} ON {table}")
+        if deferred_indexes:
+            click.echo(f'{len(deferred_indexes)} índice(s) secundarios diferidos.')
+
+        first_user = _next_id(cursor, 'users', 'user_id')
+        first_project = _next_id(cursor, 'projects', 'project_id')
+        first_task = _next_id(cursor, 'tasks', 'task_id')
+
+        def user_rows():
+            for i in range(users):
+                user_id = first_user + i
+                role = rng.choices(('Colaborador', 'Invitado', 'Administrador'), weights=(88, 10, 2))[0]
+                yield (user_id, f'usuario{user_id}', f'Nombre{user_id}', f'Apellido{user_id}',
+                       f'usuario{user_id}@example.com', password_hash, role, 0, '1')
+
+        def project_rows():
+            for i in range(projects):
+                created_at = today - timedelta(seconds=rng.randrange(history_seconds))
+                status = rng.choices(('pendiente', 'en progreso', 'completada', 'cancelada'), weights=(25, 40, 30, 5))[0]
+                yield (first_project + i, _seed_text(rng, 2, 5), _seed_text(rng, 6, 20),
+                       first_user + _skewed_index(rng, users), created_at, status)
+
+        # Responsable de cada tarea, para que las sesiones de enfoque correspondan a tareas del propio usuario
+        task_assignees = array.array('i', bytes(4 * tasks))
+
+        def task_rows():
+            for i in range(tasks):
+                assigned_to = first_user + _skewed_index(rng, users)
+                task_assignees[i] = assigned_to
+                created_at = today - timedelta(seconds=rng.randrange(history_seconds))
+                due_date = (created_at + timedelta(days=rng.randint(1, 60))).date()
+                status = rng.choices(('pendiente', 'en progreso', 'completada', 'cancelada'), weights=(35, 20, 40, 5))[0]
+                worseness = rng.choices(('Baja', 'media', 'urgente'), weights=(50, 35, 15))[0]
+                completed_at = None
+                if status == 'completada':
+                    completed_at = min(created_at + timedelta(hours=rng.lognormvariate(3.5, 1.2)), today)
+                yield (first_task + i, first_project + _skewed_index(rng, projects, 1.5), _seed_text(rng, 2, 6),
+                       assigned_to, due_date, status, _seed_text(rng, 3, 10)[:100], worseness, completed_at,
+                       first_user + rng.randrange(users), created_at)
+
+        def session_rows():
+            for _ in range(sessions):
+                task_index = rng.randrange(tasks)
+                # Mayoría de pomodoros de ~25 min, algunas pausas cortas y sesiones largas
+                kind = rng.random()
+                if kind < 0.7:
+                    duration = int(rng.gauss(25 * 60, 5 * 60))
+                elif kind < 0.9:
+                    duration = rng.randint(5 * 60, 15 * 60)
+                else:
+                    duration = rng.randint(45 * 60, 90 * 60)
+                duration = max(duration, 60)
+                start_time = today - timedelta(seconds=rng.randrange(min(history_seconds, 365 * 86400)))
+                yield (task_assignees[task_index], first_task + task_index, start_time,
+                       start_time + timedelta(seconds=duration), duration)
+
+        def note_rows():
+            for _ in range(notes):
+                created_at = today - timedelta(seconds=rng.randrange(history_seconds))
+                updated_at = min(created_at + timedelta(days=rng.expovariate(1 / 10)), today)
+                yield (first_user + _skewed_index(rng, users), _seed_text(rng, 5, 40), rng.random() < 0.3,
+                       created_at, updated_at)
+
+        def objective_rows():
+            for _ in range(objectives):
+                yield (first_task + rng.randrange(tasks), _seed_text(rng, 3, 8), rng.random() < 0.6,
+                       today - timedelta(seconds=rng.randrange(history_seconds)))
+
+        def resource_rows():
+            for _ in range(resources):
+                resource_type = rng.choices(('link', 'document', 'video', 'image', 'other'), weights=(50, 20, 10, 15, 5))[0]
+                yield (first_user + _skewed_index(rng, users), _seed_text(rng, 2, 5), _seed_text(rng, 5, 15),
+                       resource_type, f'https://example.com/{rng.getrandbits(48):x}', rng.choice(SEED_WORDS),
+                       today - timedelta(seconds=rng.randrange(history_seconds)))
+
+        click.echo(f'Sembrando con semilla {seed_value}...')
+        _bulk_insert(conn, cursor, """
+            INSERT INTO users (user_id, username, first_name, last_name, Email, Password, role, is_blocked, is_email_verified)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, user_rows(), batch_size, 'users')
+        _bulk_insert(conn, cursor, """
+            INSERT INTO projects (project_id, title, description, created_by, created_at, status)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, project_rows(), batch_size, 'projects')
+        _bulk_insert(conn, cursor, """
+            INSERT INTO tasks (task_id, project_id, title, assigned_to, due_date, status, description,
+                               worseness, completed_at, created_by, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, task_rows(), batch_size, 'tasks')
+        if tasks:
+            _bulk_insert(conn, cursor, """
+                INSERT INTO focus_sessions (user_id, task_id, start_time, end_time, duration_seconds)
+                VALUES (%s, %s, %s, %s, %s)
+            """, session_rows(), batch_size, 'focus_sessions')
+            _bulk_insert(conn, cursor, """
+                INSERT INTO focus_objectives (task_id, objective_text, completed, created_at)
+                VALUES (%s, %s, %s, %s)
+            """, objective_rows(), batch_size, 'focus_objectives')
+        _bulk_insert(conn, cursor, """
+            INSERT INTO notes (user_id, content, is_pinned, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s)
+        """, note_rows(), batch_size, 'notes')
+        _bulk_insert(conn, cursor, """
+            INSERT INTO resources (user_id, title, description, type, url_or_path, category, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, resource_rows(), batch_size, 'resources')
+
+        for table, index_name, columns, index_type in deferred_indexes:
+            started = time.perf_counter()
+            kind = 'FULLTEXT INDEX' if index_type == 'FULLTEXT' else 'INDEX'
+            cursor.execute(f"CREATE {kind} {index_name} ON {table} ({columns})")
+            click.echo(f'  índice {index_name} recreado en {time.perf_counter() - started:.1f}s')
+
+        cursor.execute("SET SESSION unique_checks = 1")
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.execute("SET @skip_search_changes = NULL")
+
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'search_changes'"
+        )
+        if cursor.fetchone()[0]:
+            # Los procesos en marcha reconstruyen su índice de búsqueda
+            cursor.execute("INSERT INTO search_changes (source, doc_id) VALUES ('*', 0)")
+            conn.commit()
+
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'focus_daily_rollup'"
+        )
+        if cursor.fetchone()[0]:
+            started = time.perf_counter()
+            rows = _backfill_focus_rollup(conn, cursor)
+            click.echo(f'  focus_daily_rollup: {rows} filas en {time.perf_counter() - started:.1f}s')
+
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'sync_state'"
+        )
+        if cursor.fetchone()[0]:
+            # Las filas sembradas no tienen versión: los clientes de /api/sync deben recargarlo todo
+            cursor.execute("TRUNCATE TABLE sync_tombstones")
+            cursor.execute("UPDATE sync_state SET current_version = current_version + 1, pruned_version = current_version WHERE id = 1")
+            conn.commit()
+        cursor.execute("ANALYZE TABLE " + ', '.join(SEED_TABLES))
+        cursor.fetchall()
+    click.echo(f'Siembra completada. Contraseña de todos los usuarios: {SEED_PASSWORD}')
+
+FOCUS_ROLLUP_BACKFILL_CHUNK = 1000  # Usuarios por transacción al reconstruir el resumen diario
+
+def _backfill_focus_rollup(conn, cursor, user_id=None):
+    """Reconstruye `focus_daily_rollup` desde `focus_sessions`, por bloques de usuarios."""
+    if user_id is not None:
+        bounds = (user_id, user_id)
+    else:
+        cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM focus_sessions")
+        bounds = cursor.fetchone()
+        if bounds[0] is None:
+            cursor.execute("DELETE FROM focus_daily_rollup")
+            conn.commit()
+            return 0
+
+    first, last = bounds
+    rows = 0
+    for chunk_start in range(first, last + 1, FOCUS_ROLLUP_BACKFILL_CHUNK):
+        chunk_end = min(chunk_start + FOCUS_ROLLUP_BACKFILL_CHUNK - 1, last)
+        # Borrado y recálculo en la misma transacción: las lecturas nunca ven el bloque a medias
+        cursor.execute("DELETE FROM focus_daily_rollup WHERE user_id BETWEEN %s AND %s", (chunk_start, chunk_end))
+        cursor.execute("""
+            INSERT INTO focus_daily_rollup (user_id, day, task_id, total_seconds, session_count)
+            SELECT user_id, DATE(start_time), COALESCE(task_id, 0), SUM(duration_seconds), COUNT(*)
+            FROM focus_sessions
+            WHERE user_id BETWEEN %s AND %s
+              AND end_time IS NOT NULL
+            GROUP BY user_id, DATE(start_time), COALESCE(task_id, 0)
+        """, (chunk_start, chunk_end))
+        rows += cursor.rowcount
+        conn.commit()
+    if user_id is None:
+        # Usuarios que ya no tienen sesiones fuera del rango recorrido
+        cursor.execute("DELETE FROM focus_daily_rollup WHERE user_id < %s OR user_id > %s", (first, last))
+        conn.commit()
+    return rows
+
+@app.cli.command('backfill-focus-rollup')
+@click.option('--user-id', type=int, help='Reconstruye solo el resumen de este usuario.')
+def backfill_focus_rollup_command(user_id):
+    """Reconstruye el resumen diario de enfoque (focus_daily_rollup) desde focus_sessions."""
+    started = time.perf_counter()
+    with db_cursor() as (conn, cursor):
+        rows = _backfill_focus_rollup(conn, cursor, user_id)
+    data_versions.bump('focus_sessions')
+    click.echo(f'Resumen diario reconstruido: {rows} fila(s) en {time.perf_counter() - started:.1f}s.')
+
+@app.cli.command('prune-sync-tombstones')
+@click.option('--days', default=30, show_default=True, help='Conserva las lápidas de los últimos N días.')
+def prune_sync_tombstones_command(days):
+    """
+    Purga las lápidas antiguas de /api/sync. Los clientes que sincronizaron por última vez antes
+    de la purga reciben una sincronización completa (`reset: true`).
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+    with db_cursor() as (conn, cursor):
+        cursor.execute("SELECT MAX(version) FROM sync_tombstones WHERE deleted_at < %s", (cutoff,))
+        pruned_version = cursor.fetchone()[0]
+        if pruned_version is None:
+            click.echo('No hay lápidas que purgar.')
+            return
+        cursor.execute("UPDATE sync_state SET pruned_version = GREATEST(pruned_version, %s) WHERE id = 1", (pruned_version,))
+        cursor.execute("DELETE FROM sync_tombstones WHERE version <= %s", (pruned_version,))
+        deleted = cursor.rowcount
+        conn.commit()
+    click.echo(f'{deleted} lápida(s) purgadas hasta la versión {pruned_version}.')
+
+# Rutas cuyas consultas se revisan con EXPLAIN. Se ejecutan de verdad contra la base de datos
+# sembrada, así se comprueba el SQL real de cada ruta y no una copia que pueda desactualizarse.
+QUERY_PLAN_ROUTES = [
+    '/api/analytics/summary',
+    '/tasks/completed_count',
+    '/tasks',
+    '/tasks?limit=50',
+    '/tasks?status=pendiente&limit=50',
+    '/projects',
+    '/api/focus/active_session',
+    '/api/focus/sessions',
+    '/api/focus/stats',
+    '/api/notes',
+    '/api/notes?pinned=true',
+    '/api/activity/recent',
+    '/api/resources',
+    '/api/collaborators',
+    '/users',
+    '/api/users/{user_id}/details',
+    '/api/search?q=informe',
+]
+
+# Excepciones conocidas, por (ruta, alias de tabla en EXPLAIN).
+QUERY_PLAN_ALLOWED_FULL_SCANS = {
+    ('/projects', 'p'),            # Lista completa de proyectos
+    ('/api/collaborators', 'u'),   # Lista completa de usuarios
+    ('/users', 'users'),           # Lista completa de usuarios para selectores
+}
+QUERY_PLAN_ALLOWED_FILESORTS = {
+    ('/api/users/{user_id}/details', 'tasks'),
+    ('/api/focus/stats', 'r'),                # GROUP BY tarea / día de la semana ordenado por agregado
+    ('/api/notes', 'notes'),                  # Todas las notas del usuario ordenadas por updated_at
+    ('/api/resources', 'resources'),
+    ('/api/collaborators', 'u'),
+}
+
+def _busiest_assignee():
+    """Usuario con más tareas asignadas, o None si la base de datos no tiene tareas."""
+    with db_cursor() as (conn, cursor):
+        cursor.execute("SELECT assigned_to FROM tasks GROUP BY assigned_to ORDER BY COUNT(*) DESC LIMIT 1")
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def _check_query_plans(user_id, min_rows=1000):
+    """
+    Ejecuta QUERY_PLAN_ROUTES como `user_id` con el cliente de pruebas, captura su SQL y revisa el plan
+    de cada SELECT con EXPLAIN. Devuelve (consultas revisadas, lista de regresiones encontradas).
+    """
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['role'] = 'Administrador'
+
+    violations = []
+    checked = 0
+    for route in QUERY_PLAN_ROUTES:
+        url = route.format(user_id=user_id)
+        captured = []
+        response = client.get(url, environ_overrides={'taskmanager.capture_sql': captured})
+        if response.status_code >= 400:
+            violations.append(f'{route}: la ruta respondió {response.status_code}')
+            continue
+
+        for statement, params in captured:
+            if not statement.lstrip().lstrip('(').upper().startswith('SELECT'):
+                continue
+            with db_cursor(dictionary=True) as (conn, cursor):
+                cursor.execute(f"EXPLAIN {statement}", params)
+                plan = cursor.fetchall()
+            checked += 1
+            for step in plan:
+                table = step.get('table') or ''
+                if table.startswith('<'):
+                    continue  # Tablas derivadas o uniones: se revisan sus tablas de origen
+                extra = step.get('Extra') or ''
+                estimated_rows = step.get('rows') or 0
+                if step.get('type') == 'ALL' and estimated_rows >= min_rows and (route, table) not in QUERY_PLAN_ALLOWED_FULL_SCANS:
+                    violations.append(f'{route}: recorrido completo de `{table}` (~{estimated_rows} filas) en {normalize_sql(statement)}')
+                if 'filesort' in extra and estimated_rows >= min_rows and (route, table) not in QUERY_PLAN_ALLOWED_FILESORTS:
+                    violations.append(f'{route}: filesort sobre `{table}` (~{estimated_rows} filas) en {normalize_sql(statement)}')
+    return checked, violations
+
+@app.cli.command('check-query-plans')
+@click.option('--user-id', type=int, help='Usuario con el que se ejecutan las rutas (por defecto el que tiene más tareas).')
+@click.option('--min-rows', default=1000, show_default=True,
+              help='Ignora tablas con menos filas estimadas, donde el optimizador prefiere recorrerlas enteras.')
+def check_query_plans_command(user_id, min_rows):
+    """
+    Ejecuta las rutas más usadas, captura su SQL y revisa el plan de cada SELECT con EXPLAIN.
+    Termina con error si alguna consulta hace un recorrido completo de tabla o un filesort no previsto.
+    """
+    if user_id is None:
+        user_id = _busiest_assignee()
+        if user_id is None:
+            raise click.ClickException('La base de datos no tiene tareas; siémbrela antes de revisar los planes.')
+
+    checked, violations = _check_query_plans(user_id, min_rows)
+    click.echo(f'{checked} consulta(s) revisadas en {len(QUERY_PLAN_ROUTES)} ruta(s).')
+    if violations:
+        for violation in violations:
+            click.echo(f'  - {violation}', err=True)
+        raise click.ClickException(f'{len(violations)} plan(es) de consulta con regresiones.')
+    click.echo('Todos los planes de consulta usan índices.')
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,147 @@
+"""
+Benchmark de mutaciones de tareas: una petición por tarea frente a /tasks/batch.
+
+Crea, actualiza y borra `--tasks` tareas de dos formas contra un servidor en marcha:
+con POST /tasks, PUT /tasks/<id> y DELETE /tasks/<id> (una petición, una conexión del pool
+y un commit por tarea) y con un único POST /tasks/batch por fase. Informa tareas por segundo
+de cada fase y guarda el resultado en JSON como http_benchmark.py.
+
+Uso:
+    python benchmarks/batch_benchmark.py --tasks 1000 --repeat 3
+"""
+import argparse
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from http_benchmark import Client, Recorder, RESULTS_FOLDER, SEED_PASSWORD, git_commit
+
+
+def task_payload(index, user_id, project_id):
+    return {
+        'title': f'Tarea de benchmark {index}',
+        'description': 'Creada por batch_benchmark.py',
+        'assigned_to': user_id,
+        'project_id': project_id,
+        'due_date': (date.today() + timedelta(days=index % 60)).isoformat(),
+        'worseness': 'media',
+    }
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def run_individual(client, count, user_id, project_id):
+    task_ids = []
+
+    def create():
+        for index in range(count):
+            status, task = client.request('POST', '/tasks', body=task_payload(index, user_id, project_id))
+            if status != 201:
+                raise SystemExit(f'POST /tasks respondió {status}')
+            task_ids.append(task['task_id'])
+
+    def update():
+        for task_id in task_ids:
+            client.request('PUT', f'/tasks/{task_id}', label='PUT /tasks/<task_id>', body={'status': 'en progreso'})
+
+    def delete():
+        for task_id in task_ids:
+            client.request('DELETE', f'/tasks/{task_id}', label='DELETE /tasks/<task_id>')
+
+    return {'create': timed(create), 'update': timed(update), 'delete': timed(delete)}
+
+
+def run_batch(client, count, user_id, project_id):
+    task_ids = []
+
+    def send(operations):
+        status, body = client.request('POST', '/tasks/batch', body={'operations': operations})
+        if status != 200:
+            raise SystemExit(f'POST /tasks/batch respondió {status}: {body}')
+        return body['results']
+
+    def create():
+        results = send([{'op': 'create', 'data': task_payload(index, user_id, project_id)} for index in range(count)])
+        task_ids.extend(result['task_id'] for result in results)
+
+    def update():
+        send([{'op': 'update', 'task_id': task_id, 'data': {'status': 'en progreso'}} for task_id in task_ids])
+
+    def delete():
+        send([{'op': 'delete', 'task_id': task_id} for task_id in task_ids])
+
+    return {'create': timed(create), 'update': timed(update), 'delete': timed(delete)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara mutaciones de tareas una a una frente a /tasks/batch.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--tasks', type=int, default=1000, help='Tareas por fase.')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones; se informa la mejor.')
+    parser.add_argument('--user-id', type=int, default=1, help='Usuario sembrado (no Invitado) con el que se ejecuta.')
+    parser.add_argument('--project-id', type=int, help='Proyecto de las tareas (por defecto el primero de /projects).')
+    parser.add_argument('--password', default=SEED_PASSWORD)
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto benchmarks/results/batch_<fecha>_<commit>.json).')
+    args = parser.parse_args()
+
+    client = Client(args.base_url, Recorder())
+    status, _ = client.request('POST', '/api/login', body={'email': f'usuario{args.user_id}@example.com', 'password': args.password})
+    if status != 200:
+        raise SystemExit(f'El usuario {args.user_id} no pudo iniciar sesión (estado {status})')
+    project_id = args.project_id
+    if project_id is None:
+        _, projects = client.request('GET', '/projects')
+        if not projects:
+            raise SystemExit('No hay proyectos; siembra la base de datos antes de ejecutar el benchmark.')
+        project_id = projects[0]['project_id']
+
+    best = {}
+    for repetition in range(args.repeat):
+        for mode, runner in (('individual', run_individual), ('batch', run_batch)):
+            phases = runner(client, args.tasks, args.user_id, project_id)
+            for phase, elapsed in phases.items():
+                key = (mode, phase)
+                best[key] = min(best.get(key, elapsed), elapsed)
+        print(f'Repetición {repetition + 1}/{args.repeat} completada.')
+
+    header = f'{"Fase":<8} {"individual (tareas/s)":>22} {"batch (tareas/s)":>18} {"mejora":>8}'
+    print(header)
+    print('-' * len(header))
+    phases = {}
+    for phase in ('create', 'update', 'delete'):
+        individual = args.tasks / best[('individual', phase)]
+        batch = args.tasks / best[('batch', phase)]
+        phases[phase] = {
+            'individual_tasks_per_second': round(individual, 1),
+            'batch_tasks_per_second': round(batch, 1),
+            'speedup': round(batch / individual, 2),
+        }
+        print(f'{phase:<8} {individual:>22.1f} {batch:>18.1f} {batch / individual:>7.1f}x')
+
+    commit = git_commit()
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'base_url': args.base_url,
+            'tasks': args.tasks,
+            'repeat': args.repeat,
+        },
+        'phases': phases,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_FOLDER, exist_ok=True)
+        output = os.path.join(RESULTS_FOLDER, f'batch_{datetime.now():%Y%m%d_%H%M%S}_{commit or "sin_commit"}.json')
+    with open(output, 'w', encoding='utf-8') as result_file:
+        json.dump(result, result_file, indent=2, ensure_ascii=False)
+    print(f'Resultados guardados en {output}')
+
+
+if __name__ == '__main__':
+    main()
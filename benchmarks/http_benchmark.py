@@ -0,0 +1,321 @@
+"""
+Benchmark HTTP de extremo a extremo para TaskManager Pro.
+
+Inicia sesión con usuarios sembrados (`flask --app app seed`) y reproduce la mezcla de peticiones
+que genera static/script.js: carga del dashboard, vistas de tareas y proyectos, analítica,
+modo enfoque (pomodoro), búsqueda y edición de notas. Informa rendimiento y latencias
+p50/p95/p99 por ruta y guarda el resultado en JSON para comparar ejecuciones entre commits.
+
+Uso:
+    python benchmarks/http_benchmark.py --base-url http://127.0.0.1:5000 --concurrency 16 --duration 60
+    python benchmarks/http_benchmark.py --compare benchmarks/results/anterior.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit, quote
+
+SEED_PASSWORD = 'password123'
+SEARCH_TERMS = ('informe', 'diseño', 'cliente', 'pruebas', 'migración', 'reunión', 'API', 'seguridad')
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class Client:
+    """Cliente HTTP con conexión persistente y cookies de sesión, uno por usuario virtual."""
+
+    def __init__(self, base_url, recorder):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.recorder = recorder
+        self.cookies = {}
+        self.conn = None
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = connection_class(self.host, self.port, timeout=60)
+
+    def request(self, method, path, label=None, body=None):
+        """Ejecuta una petición, registra su latencia bajo `label` y devuelve (estado, JSON o None)."""
+        headers = {'Accept': 'application/json'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={value}' for key, value in self.cookies.items())
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        label = label or f'{method} {path.split("?")[0]}'
+        for attempt in range(2):
+            if self.conn is None:
+                self._connect()
+            started = time.perf_counter()
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                # El servidor puede cerrar la conexión persistente; se reintenta una vez con una nueva
+                self.conn.close()
+                self.conn = None
+                if attempt == 1:
+                    self.recorder.record(label, time.perf_counter() - started, 0, 0)
+                    return 0, None
+                continue
+            elapsed = time.perf_counter() - started
+            break
+
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for key, morsel in SimpleCookie(header).items():
+                self.cookies[key] = morsel.value
+        if response.getheader('Connection', '').lower() == 'close':
+            self.conn.close()
+            self.conn = None
+
+        self.recorder.record(label, elapsed, response.status, len(data))
+        if 'application/json' in (response.getheader('Content-Type') or ''):
+            try:
+                return response.status, json.loads(data)
+            except ValueError:
+                return response.status, None
+        return response.status, None
+
+
+class Recorder:
+    """Acumula latencias, estados y bytes por ruta de forma segura entre hilos."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, label, elapsed, status, size):
+        with self.lock:
+            route = self.samples.setdefault(label, {'latencies': [], 'errors': 0, 'bytes': 0})
+            route['latencies'].append(elapsed)
+            route['bytes'] += size
+            if status == 0 or status >= 500:
+                route['errors'] += 1
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+# --- Escenarios: cada uno reproduce una interacción de static/script.js ---
+
+def scenario_dashboard(client, state, rng):
+    client.request('GET', '/dashboard')
+    client.request('GET', '/api/notes?pinned=true')
+    client.request('GET', '/api/activity/recent')
+    client.request('GET', '/api/analytics/summary')
+    client.request('GET', '/api/focus/active_session')
+    client.request('GET', '/projects')
+    _, tasks = client.request('GET', '/tasks')
+    if isinstance(tasks, list):
+        state['task_ids'] = [task['task_id'] for task in tasks[:200]]
+
+
+def scenario_tasks(client, state, rng):
+    client.request('GET', '/tasks')
+    if state.get('task_ids'):
+        client.request('GET', f'/tasks/{rng.choice(state["task_ids"])}', label='GET /tasks/<task_id>')
+
+
+def scenario_projects(client, state, rng):
+    _, projects = client.request('GET', '/projects')
+    client.request('GET', '/users')
+    if isinstance(projects, list) and projects:
+        project_id = rng.choice(projects)['project_id']
+        client.request('GET', f'/projects/{project_id}', label='GET /projects/<project_id>')
+        client.request('GET', '/tasks')  # La vista de proyecto descarga todas las tareas y filtra en el cliente
+
+
+def scenario_analytics(client, state, rng):
+    client.request('GET', '/api/analytics/summary')
+    client.request('GET', '/projects')
+    client.request('GET', '/tasks')
+    client.request('GET', '/api/analytics/project_assignments')
+
+
+def scenario_focus(client, state, rng):
+    client.request('GET', '/api/focus/active_session')
+    client.request('GET', '/api/focus/stats?days=30')
+    if not state.get('task_ids'):
+        return
+    task_id = rng.choice(state['task_ids'])
+    client.request('GET', f'/focus_objectives/{task_id}', label='GET /focus_objectives/<task_id>')
+    status, _ = client.request('POST', '/api/focus/start_session', body={'task_id': task_id})
+    if status == 400:
+        # Quedó una sesión abierta de una iteración anterior
+        client.request('POST', '/api/focus/discard_session')
+        client.request('POST', '/api/focus/start_session', body={'task_id': task_id})
+    client.request('POST', '/api/focus/end_session')
+
+
+def scenario_search(client, state, rng):
+    term = rng.choice(SEARCH_TERMS)
+    client.request('GET', f'/api/search?q={quote(term)}&type=all')
+
+
+def scenario_notes(client, state, rng):
+    client.request('GET', '/api/notes')
+    _, note = client.request('POST', '/api/notes', body={'content': f'Nota de benchmark {rng.random():.6f}', 'is_pinned': False})
+    if isinstance(note, dict) and note.get('note_id'):
+        note_id = note['note_id']
+        client.request('PUT', f'/api/notes/{note_id}', label='PUT /api/notes/<note_id>',
+                       body={'content': f'Nota editada {rng.random():.6f}'})
+        client.request('DELETE', f'/api/notes/{note_id}', label='DELETE /api/notes/<note_id>')
+
+
+SCENARIOS = (
+    (scenario_dashboard, 30),
+    (scenario_tasks, 20),
+    (scenario_projects, 10),
+    (scenario_analytics, 10),
+    (scenario_focus, 15),
+    (scenario_search, 10),
+    (scenario_notes, 5),
+)
+
+
+def run_worker(args, worker_index, recorder, deadline, iterations):
+    rng = random.Random(args.seed + worker_index)
+    client = Client(args.base_url, recorder)
+    user_id = args.first_user_id + worker_index % args.users
+    status, _ = client.request('POST', '/api/login', body={'email': f'usuario{user_id}@example.com', 'password': args.password})
+    if status != 200:
+        print(f'Aviso: el usuario {user_id} no pudo iniciar sesión (estado {status})')
+        return
+
+    state = {}
+    scenario_dashboard(client, state, rng)
+    functions, weights = zip(*SCENARIOS)
+    done = 0
+    while time.monotonic() < deadline and (iterations is None or done < iterations):
+        rng.choices(functions, weights=weights)[0](client, state, rng)
+        done += 1
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    total_requests = 0
+    for label, route in sorted(recorder.samples.items()):
+        latencies = sorted(route['latencies'])
+        total_requests += len(latencies)
+        routes[label] = {
+            'count': len(latencies),
+            'errors': route['errors'],
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+            'avg_bytes': round(route['bytes'] / len(latencies)),
+        }
+    return routes, total_requests
+
+
+def print_report(result, baseline=None):
+    header = f'{"Ruta":<42} {"n":>7} {"rps":>8} {"p50":>9} {"p95":>9} {"p99":>9} {"err":>5}'
+    print(header)
+    print('-' * len(header))
+    for label, route in result['routes'].items():
+        line = (f'{label:<42} {route["count"]:>7} {route["throughput_rps"]:>8.1f} '
+                f'{route["p50_ms"]:>9.1f} {route["p95_ms"]:>9.1f} {route["p99_ms"]:>9.1f} {route["errors"]:>5}')
+        previous = (baseline or {}).get('routes', {}).get(label)
+        if previous and previous['p95_ms']:
+            change = (route['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+            line += f'   p95 {change:+.1f}%'
+        print(line)
+    print('-' * len(header))
+    print(f'Total: {result["total_requests"]} peticiones en {result["elapsed_seconds"]}s '
+          f'({result["throughput_rps"]} peticiones/s)')
+    if baseline:
+        print(f'Comparado con {baseline["meta"].get("commit")} ({baseline["meta"].get("timestamp")}): '
+              f'{baseline["throughput_rps"]} peticiones/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTTP de TaskManager Pro con la mezcla de peticiones del frontend.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=8, help='Usuarios virtuales simultáneos.')
+    parser.add_argument('--duration', type=float, default=30, help='Duración en segundos.')
+    parser.add_argument('--iterations', type=int, help='Escenarios por usuario virtual (en lugar de duración fija).')
+    parser.add_argument('--users', type=int, default=100, help='Usuarios sembrados distintos entre los que repartir los workers.')
+    parser.add_argument('--first-user-id', type=int, default=1)
+    parser.add_argument('--password', default=SEED_PASSWORD)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', help='Etiqueta libre para identificar la ejecución.')
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto benchmarks/results/<fecha>_<commit>.json).')
+    parser.add_argument('--compare', help='Resultado JSON anterior con el que comparar.')
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    deadline = time.monotonic() + (args.duration if args.iterations is None else 10 ** 9)
+    workers = [
+        threading.Thread(target=run_worker, args=(args, i, recorder, deadline, args.iterations), daemon=True)
+        for i in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    routes, total_requests = summarize(recorder, elapsed)
+    commit = git_commit()
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'label': args.label,
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'iterations': args.iterations,
+            'users': args.users,
+            'seed': args.seed,
+        },
+        'elapsed_seconds': round(elapsed, 2),
+        'total_requests': total_requests,
+        'throughput_rps': round(total_requests / elapsed, 2) if elapsed else 0,
+        'routes': routes,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous:
+            baseline = json.load(previous)
+    print_report(result, baseline)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_FOLDER, exist_ok=True)
+        output = os.path.join(RESULTS_FOLDER, f'{datetime.now():%Y%m%d_%H%M%S}_{commit or "sin_commit"}.json')
+    with open(output, 'w', encoding='utf-8') as result_file:
+        json.dump(result, result_file, indent=2, ensure_ascii=False)
+    print(f'Resultados guardados en {output}')
+
+
+if __name__ == '__main__':
+    main()
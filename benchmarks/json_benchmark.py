@@ -0,0 +1,156 @@
+"""
+Micro-benchmark de serialización JSON de las respuestas de la API.
+
+Genera cargas con la forma de GET /tasks y GET /api/focus/sessions (fechas, datetime, Decimal
+y textos con acentos, como los devuelve mysql-connector) y mide cuánto tarda en construirse la
+respuesta con el proveedor por defecto de Flask y con FastJSONProvider, tanto con su respaldo en el
+módulo json estándar como con orjson. No necesita base de datos ni servidor en marcha. Comprueba además
+que todos producen el mismo JSON una vez decodificado.
+
+Uso:
+    python benchmarks/json_benchmark.py --rows 50 500 5000 --repeat 5
+"""
+import argparse
+import decimal
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+
+from http_benchmark import RESULTS_FOLDER, git_commit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as taskmanager  # noqa: E402
+
+
+def task_rows(count, rng):
+    now = datetime(2025, 8, 1, 9, 30)
+    rows = []
+    for index in range(count):
+        created_at = now - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1440))
+        completed = rng.random() < 0.3
+        rows.append({
+            'task_id': index + 1,
+            'project_id': rng.randint(1, 200),
+            'project_name': f'Proyecto de migración {rng.randint(1, 200)}',
+            'task_title': f'Revisión del diseño nº {index}',
+            'description': 'Actualizar la documentación y añadir pruebas de integración',
+            'status': 'completada' if completed else rng.choice(('pendiente', 'en progreso')),
+            'assigned_to': rng.randint(1, 50),
+            'assigned_username': f'usuario{rng.randint(1, 50)}',
+            'due_date': (created_at + timedelta(days=rng.randint(1, 60))).date(),
+            'worseness': rng.choice(('Baja', 'media', 'urgente')),
+            'completed_at': created_at + timedelta(days=rng.randint(1, 30)) if completed else None,
+            'created_at': created_at,
+            'created_by': rng.randint(1, 50),
+        })
+    return rows
+
+
+def focus_session_rows(count, rng):
+    now = datetime(2025, 8, 1, 9, 30)
+    rows = []
+    for index in range(count):
+        start_time = now - timedelta(minutes=rng.randint(0, 7 * 1440))
+        duration_seconds = rng.randint(300, 3600)
+        rows.append({
+            'session_id': index + 1,
+            'task_id': rng.randint(1, 5000),
+            'task_title': f'Revisión del diseño nº {index}',
+            'start_time': start_time,
+            'end_time': start_time + timedelta(seconds=duration_seconds),
+            'duration_seconds': duration_seconds,
+            'duration_minutes': decimal.Decimal(duration_seconds / 60).quantize(decimal.Decimal('0.1')),
+        })
+    return rows
+
+
+def best_time(function, repeat, number):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = (time.perf_counter() - started) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara el proveedor JSON por defecto de Flask con FastJSONProvider.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[50, 500, 5000], help='Filas por carga.')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones; se informa la mejor.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto benchmarks/results/json_<fecha>_<commit>.json).')
+    args = parser.parse_args()
+
+    if taskmanager.orjson is None:
+        raise SystemExit('orjson no está instalado; FastJSONProvider usaría el módulo json estándar.')
+
+    flask_app = taskmanager.app
+    providers = {
+        'flask': DefaultJSONProvider(flask_app),
+        'stdlib': taskmanager.FastJSONProvider(flask_app, backend='json'),
+        'orjson': taskmanager.FastJSONProvider(flask_app, backend='orjson'),
+    }
+    rng = random.Random(args.seed)
+    payloads = {'/tasks': task_rows, '/api/focus/sessions': focus_session_rows}
+
+    header = (f'{"Ruta":<22} {"filas":>6} {"flask (ms)":>11} {"stdlib (ms)":>12} {"orjson (ms)":>12} '
+              f'{"mejora":>8} {"bytes":>10}')
+    print(header)
+    print('-' * len(header))
+    results = []
+    with flask_app.app_context():
+        for route, build in payloads.items():
+            for count in args.rows:
+                rows = build(count, rng)
+                bodies = {name: provider.response(rows).get_data() for name, provider in providers.items()}
+                decoded = [json.loads(body) for body in bodies.values()]
+                if any(document != decoded[0] for document in decoded[1:]):
+                    raise SystemExit(f'{route}: los proveedores producen JSON distinto')
+                number = max(1, 20000 // count)
+                timings = {
+                    name: best_time(lambda provider=provider: provider.response(rows), args.repeat, number)
+                    for name, provider in providers.items()
+                }
+                speedup = timings['flask'] / timings['orjson']
+                print(f'{route:<22} {count:>6} {timings["flask"] * 1000:>11.3f} {timings["stdlib"] * 1000:>12.3f} '
+                      f'{timings["orjson"] * 1000:>12.3f} {speedup:>7.1f}x {len(bodies["orjson"]):>10}')
+                results.append({
+                    'route': route,
+                    'rows': count,
+                    'flask_ms': round(timings['flask'] * 1000, 4),
+                    'stdlib_ms': round(timings['stdlib'] * 1000, 4),
+                    'orjson_ms': round(timings['orjson'] * 1000, 4),
+                    'speedup': round(speedup, 2),
+                    'flask_bytes': len(bodies['flask']),
+                    'orjson_bytes': len(bodies['orjson']),
+                })
+
+    commit = git_commit()
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'orjson': taskmanager.orjson.__version__,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_FOLDER, exist_ok=True)
+        output = os.path.join(RESULTS_FOLDER, f'json_{datetime.now():%Y%m%d_%H%M%S}_{commit or "sin_commit"}.json')
+    with open(output, 'w', encoding='utf-8') as result_file:
+        json.dump(result, result_file, indent=2, ensure_ascii=False)
+    print(f'Resultados guardados en {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark de rendimiento del inicio de sesión (POST /api/login) contra un servidor en marcha.
+
+Para cada nivel de concurrencia lanza tantos hilos como indica el nivel, cada uno iniciando sesión una
+y otra vez con usuarios sembrados (`flask --app app seed`, contraseña `password123`) durante la duración
+indicada. Informa cuántos inicios de sesión por segundo sostiene el nodo, sus latencias p50/p95/p99 y
+cuántas peticiones rechazó el pool de hashing de contraseñas con 503. Si /metrics es accesible, añade
+la ocupación del pool (máximo en curso, rechazos y tiempos de espera) en cada nivel. Guarda el resultado
+en JSON como el resto de benchmarks.
+
+Uso:
+    python benchmarks/login_benchmark.py --concurrency 1 4 16 64 --duration 20
+"""
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from http_benchmark import RESULTS_FOLDER, SEED_PASSWORD, Client, Recorder, git_commit, percentile
+
+METRIC_PREFIX = 'taskmanager_password_hash_'
+
+
+def read_hasher_metrics(base_url, token):
+    """Métricas del pool de hashing expuestas en /metrics, o None si no son accesibles."""
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    conn = connection_class(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80), timeout=10)
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    try:
+        conn.request('GET', '/metrics', headers=headers)
+        response = conn.getresponse()
+        body = response.read().decode('utf-8')
+    except (http.client.HTTPException, OSError):
+        return None
+    finally:
+        conn.close()
+    if response.status != 200:
+        return None
+    values = {}
+    for line in body.splitlines():
+        if line.startswith(METRIC_PREFIX):
+            name, _, value = line.partition(' ')
+            values[name[len(METRIC_PREFIX):]] = float(value)
+    return values or None
+
+
+def run_worker(args, worker_index, deadline, results, lock):
+    client = Client(args.base_url, Recorder())
+    user_id = args.first_user_id + worker_index % args.users
+    body = {'email': f'usuario{user_id}@example.com', 'password': args.password}
+    while time.monotonic() < deadline:
+        client.cookies = {}  # Cada vuelta es un inicio de sesión nuevo
+        started = time.perf_counter()
+        status, _ = client.request('POST', '/api/login', body=body)
+        elapsed = time.perf_counter() - started
+        with lock:
+            results.setdefault(status, []).append(elapsed)
+
+
+def run_level(args, concurrency):
+    results = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    workers = [
+        threading.Thread(target=run_worker, args=(args, i, deadline, results, lock), daemon=True)
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    logins = sorted(results.get(200, []))
+    return {
+        'logins': len(logins),
+        'rejected': len(results.get(503, [])),
+        'failed': sum(len(values) for status, values in results.items() if status not in (200, 503)),
+        'logins_per_second': round(len(logins) / elapsed, 2),
+        'p50_ms': round(percentile(logins, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(logins, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(logins, 0.99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide cuántos inicios de sesión concurrentes sostiene un nodo.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64], help='Niveles de concurrencia.')
+    parser.add_argument('--duration', type=float, default=20, help='Segundos por nivel.')
+    parser.add_argument('--users', type=int, default=100, help='Usuarios sembrados distintos entre los que repartir los hilos.')
+    parser.add_argument('--first-user-id', type=int, default=1)
+    parser.add_argument('--password', default=SEED_PASSWORD)
+    parser.add_argument('--metrics-token', default=os.environ.get('METRICS_TOKEN'), help='Token de /metrics, si lo exige.')
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto benchmarks/results/login_<fecha>_<commit>.json).')
+    args = parser.parse_args()
+
+    status, _ = Client(args.base_url, Recorder()).request(
+        'POST', '/api/login', body={'email': f'usuario{args.first_user_id}@example.com', 'password': args.password}
+    )
+    if status != 200:
+        raise SystemExit(f'El inicio de sesión de prueba falló (estado {status}); ¿está el servidor en marcha y sembrado?')
+
+    header = (f'{"hilos":>6} {"logins/s":>9} {"p50 (ms)":>9} {"p95 (ms)":>9} {"p99 (ms)":>9} '
+              f'{"503":>6} {"fallos":>7} {"pico pool":>10}')
+    print(header)
+    print('-' * len(header))
+    levels = []
+    for concurrency in args.concurrency:
+        before = read_hasher_metrics(args.base_url, args.metrics_token)
+        results, elapsed = run_level(args, concurrency)
+        after = read_hasher_metrics(args.base_url, args.metrics_token)
+        row = {'concurrency': concurrency, **summarize(results, elapsed)}
+        if before and after:
+            row['pool'] = {
+                'workers': int(after.get('workers', 0)),
+                'queue_limit': int(after.get('queue_limit', 0)),
+                'peak_in_flight': int(after.get('peak_in_flight', 0)),
+                'rejected': int(after.get('rejected_total', 0) - before.get('rejected_total', 0)),
+                'timeouts': int(after.get('timeouts_total', 0) - before.get('timeouts_total', 0)),
+            }
+        levels.append(row)
+        peak = f'{row["pool"]["peak_in_flight"]}/{row["pool"]["queue_limit"]}' if 'pool' in row else '-'
+        print(f'{concurrency:>6} {row["logins_per_second"]:>9.1f} {row["p50_ms"]:>9.1f} {row["p95_ms"]:>9.1f} '
+              f'{row["p99_ms"]:>9.1f} {row["rejected"]:>6} {row["failed"]:>7} {peak:>10}')
+
+    best = max(levels, key=lambda level: level['logins_per_second'])
+    print(f'Máximo sostenido: {best["logins_per_second"]} inicios de sesión/s con {best["concurrency"]} hilos')
+
+    commit = git_commit()
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'base_url': args.base_url,
+            'duration': args.duration,
+            'users': args.users,
+        },
+        'max_logins_per_second': best['logins_per_second'],
+        'levels': levels,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_FOLDER, exist_ok=True)
+        output = os.path.join(RESULTS_FOLDER, f'login_{datetime.now():%Y%m%d_%H%M%S}_{commit or "sin_commit"}.json')
+    with open(output, 'w', encoding='utf-8') as result_file:
+        json.dump(result, result_file, indent=2, ensure_ascii=False)
+    print(f'Resultados guardados en {output}')
+
+
+if __name__ == '__main__':
+    main()
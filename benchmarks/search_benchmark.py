@@ -0,0 +1,138 @@
+"""
+Benchmark de la búsqueda global: LIKE '%término%' (la búsqueda original), FULLTEXT (MATCH ... AGAINST)
+y el índice invertido en memoria.
+
+Ejecuta dentro del proceso la misma función que /api/search (`_global_search`) contra la base de
+datos configurada en app.py, que debe estar sembrada (`flask --app app seed`) y con la migración
+0006_fulltext_search aplicada. Primero construye el índice en memoria (informa cuánto tarda). Para
+cada término y usuario de la muestra lanza la búsqueda con cada motor, informa latencias p50/p95/p99
+y qué parte de los resultados de LIKE encuentra cada motor, y guarda el resultado en JSON.
+
+Uso:
+    python benchmarks/search_benchmark.py --users 20 --repeat 3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from http_benchmark import RESULTS_FOLDER, SEARCH_TERMS, git_commit, percentile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as taskmanager  # noqa: E402
+
+ENGINES = {
+    'like': {'fulltext': False, 'use_index': False},
+    'fulltext': {'fulltext': True, 'use_index': False},
+    'index': {'use_index': True},
+}
+RESULT_KEYS = {
+    'tasks': 'task_id', 'projects': 'project_id', 'notes': 'note_id', 'resources': 'resource_id',
+    'focus_objectives': 'objective_id',
+}
+
+
+def sample_users(count, seed):
+    with taskmanager.db_cursor() as (conn, cursor):
+        cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM users")
+        first, last = cursor.fetchone()
+    if first is None:
+        raise SystemExit('No hay usuarios; siembra la base de datos antes de ejecutar el benchmark.')
+    rng = random.Random(seed)
+    return [rng.randint(first, last) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara la búsqueda global con LIKE, FULLTEXT y el índice en memoria.')
+    parser.add_argument('--users', type=int, default=20, help='Usuarios de la muestra.')
+    parser.add_argument('--terms', nargs='+', default=list(SEARCH_TERMS), help='Términos de búsqueda.')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones de cada búsqueda.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto benchmarks/results/search_<fecha>_<commit>.json).')
+    args = parser.parse_args()
+
+    users = sample_users(args.users, args.seed)
+    started = time.perf_counter()
+    taskmanager.search_index.start_rebuild()
+    while not taskmanager.search_index.ready:
+        time.sleep(0.1)
+    build_seconds = time.perf_counter() - started
+    print(f'Índice en memoria construido en {build_seconds:.1f}s')
+    latencies = {engine: [] for engine in ENGINES}
+    per_term = {}
+    for term in args.terms:
+        term_latencies = {engine: [] for engine in ENGINES}
+        overlap = {engine: [] for engine in ENGINES if engine != 'like'}
+        for user_id in users:
+            found = {}
+            for _ in range(args.repeat):
+                for engine, options in ENGINES.items():
+                    started = time.perf_counter()
+                    results = taskmanager._global_search(user_id, term, 'all', **options)
+                    term_latencies[engine].append(time.perf_counter() - started)
+                    found[engine] = {
+                        (source, row[key]) for source, key in RESULT_KEYS.items() for row in results[source]
+                    }
+            if found['like']:
+                for engine, values in overlap.items():
+                    values.append(len(found['like'] & found[engine]) / len(found['like']))
+        per_term[term] = {
+            engine: round(percentile(sorted(values), 0.5) * 1000, 3) for engine, values in term_latencies.items()
+        }
+        per_term[term]['overlap'] = {
+            engine: round(sum(values) / len(values), 3) if values else None for engine, values in overlap.items()
+        }
+        for engine, values in term_latencies.items():
+            latencies[engine].extend(values)
+
+    header = (f'{"Término":<16} {"LIKE p50 (ms)":>14} {"FULLTEXT p50 (ms)":>18} {"índice p50 (ms)":>16} '
+              f'{"coinc. FULLTEXT":>16} {"coinc. índice":>14}')
+    print(header)
+    print('-' * len(header))
+    for term, row in per_term.items():
+        overlap = {
+            engine: f'{value * 100:.0f}%' if value is not None else '-' for engine, value in row['overlap'].items()
+        }
+        print(f'{term:<16} {row["like"]:>14.2f} {row["fulltext"]:>18.2f} {row["index"]:>16.2f} '
+              f'{overlap["fulltext"]:>16} {overlap["index"]:>14}')
+
+    summary = {}
+    for engine, values in latencies.items():
+        values.sort()
+        summary[engine] = {
+            'searches': len(values),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+        }
+        print(f'{engine:<9} p50 {summary[engine]["p50_ms"]:>9.2f} ms   p95 {summary[engine]["p95_ms"]:>9.2f} ms   '
+              f'p99 {summary[engine]["p99_ms"]:>9.2f} ms')
+
+    commit = git_commit()
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'users': len(users),
+            'terms': args.terms,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'index_build_seconds': round(build_seconds, 1),
+        },
+        'summary': summary,
+        'terms': per_term,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_FOLDER, exist_ok=True)
+        output = os.path.join(RESULTS_FOLDER, f'search_{datetime.now():%Y%m%d_%H%M%S}_{commit or "sin_commit"}.json')
+    with open(output, 'w', encoding='utf-8') as result_file:
+        json.dump(result, result_file, indent=2, ensure_ascii=False)
+    print(f'Resultados guardados en {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark del autocompletado de la búsqueda global (/api/search/suggest).
+
+Construye dentro del proceso el índice de búsqueda y la tabla de prefijos a partir de la base de datos
+configurada en app.py (que debe estar sembrada con `flask --app app seed`) y simula a usuarios de la
+muestra escribiendo cada término letra a letra, como hace el campo de búsqueda. Mide la latencia de
+cada sugerencia con la caché de prefijos por usuario y sin ella (p50/p95/p99) y la proporción de
+pulsaciones servidas desde la caché, y guarda el resultado en JSON como el resto de benchmarks.
+
+Uso:
+    python benchmarks/suggest_benchmark.py --users 50 --repeat 3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from http_benchmark import RESULTS_FOLDER, SEARCH_TERMS, git_commit, percentile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as taskmanager  # noqa: E402
+
+
+def sample_users(count, seed):
+    with taskmanager.db_cursor() as (conn, cursor):
+        cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM users")
+        first, last = cursor.fetchone()
+    if first is None:
+        raise SystemExit('No hay usuarios; siembra la base de datos antes de ejecutar el benchmark.')
+    rng = random.Random(seed)
+    return [rng.randint(first, last) for _ in range(count)]
+
+
+def type_terms(users, terms, repeat, limit, cache):
+    """Escribe cada término letra a letra para cada usuario. Devuelve (latencias, pulsaciones servidas desde la caché)."""
+    latencies = []
+    hits = 0
+    taskmanager.suggestion_cache.ttl = taskmanager.SUGGEST_CACHE_SECONDS if cache else 0
+    for _ in range(repeat):
+        for user_id in users:
+            for term in terms:
+                for length in range(1, len(term) + 1):
+                    prefix = taskmanager._suggest_key(term[:length])
+                    generation = taskmanager.search_index.suggestions.generation(user_id)
+                    hits += taskmanager.suggestion_cache.get(user_id, prefix, generation) is not None
+                    started = time.perf_counter()
+                    taskmanager._suggest(user_id, term[:length], limit)
+                    latencies.append(time.perf_counter() - started)
+    return sorted(latencies), hits
+
+
+def summarize(latencies, hits):
+    return {
+        'keystrokes': len(latencies),
+        'cache_hit_ratio': round(hits / len(latencies), 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide la latencia del autocompletado de la búsqueda global.')
+    parser.add_argument('--users', type=int, default=50, help='Usuarios de la muestra.')
+    parser.add_argument('--terms', nargs='+', default=list(SEARCH_TERMS), help='Términos que se escriben letra a letra.')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones de cada término.')
+    parser.add_argument('--limit', type=int, default=taskmanager.SUGGEST_LIMIT, help='Sugerencias por consulta.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto benchmarks/results/suggest_<fecha>_<commit>.json).')
+    args = parser.parse_args()
+
+    users = sample_users(args.users, args.seed)
+    started = time.perf_counter()
+    taskmanager.search_index.start_rebuild()
+    while not taskmanager.search_index.ready:
+        time.sleep(0.1)
+    build_seconds = time.perf_counter() - started
+    print(f'Índice construido en {build_seconds:.1f}s ({len(taskmanager.search_index.suggestions)} títulos y usuarios)')
+
+    summary = {}
+    for mode, cache in (('sin_cache', False), ('con_cache', True)):
+        latencies, hits = type_terms(users, args.terms, args.repeat, args.limit, cache)
+        summary[mode] = summarize(latencies, hits)
+        row = summary[mode]
+        print(f'{mode:<10} p50 {row["p50_ms"]:>7.3f} ms   p95 {row["p95_ms"]:>7.3f} ms   p99 {row["p99_ms"]:>7.3f} ms   '
+              f'máx {row["max_ms"]:>7.3f} ms   caché {row["cache_hit_ratio"] * 100:>5.1f}%')
+
+    commit = git_commit()
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'users': len(users),
+            'terms': args.terms,
+            'repeat': args.repeat,
+            'limit': args.limit,
+            'seed': args.seed,
+            'index_build_seconds': round(build_seconds, 1),
+        },
+        'summary': summary,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_FOLDER, exist_ok=True)
+        output = os.path.join(RESULTS_FOLDER, f'suggest_{datetime.now():%Y%m%d_%H%M%S}_{commit or "sin_commit"}.json')
+    with open(output, 'w', encoding='utf-8') as result_file:
+        json.dump(result, result_file, indent=2, ensure_ascii=False)
+    print(f'Resultados guardados en {output}')
+
+
+if __name__ == '__main__':
+    main()
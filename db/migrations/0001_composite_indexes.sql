@@ -0,0 +1,21 @@
+-- Índices compuestos para las consultas más frecuentes de la aplicación.
+
+-- get_analytics_summary y /tasks/completed_count: tareas de un usuario por estado y fecha de finalización
+CREATE INDEX idx_tasks_assignee_status_completed ON tasks (assigned_to, status, completed_at);
+
+-- Endpoints de enfoque: sesión activa de un usuario (end_time IS NULL) ordenada por inicio
+CREATE INDEX idx_focus_sessions_user_end_start ON focus_sessions (user_id, end_time, start_time);
+
+-- /api/focus/sessions y /api/focus/stats: sesiones de un usuario en un rango de fechas, ordenadas por inicio
+CREATE INDEX idx_focus_sessions_user_start ON focus_sessions (user_id, start_time);
+
+-- get_notes: notas de un usuario (opcionalmente solo fijadas) ordenadas por última edición
+CREATE INDEX idx_notes_user_pinned_updated ON notes (user_id, is_pinned, updated_at);
+
+-- get_recent_activity: proyectos y tareas creados o completados recientemente
+CREATE INDEX idx_tasks_created_at ON tasks (created_at);
+CREATE INDEX idx_tasks_completed_at ON tasks (completed_at);
+CREATE INDEX idx_projects_created_at ON projects (created_at);
+
+-- Proyectos colaborativos del resumen de analítica: recorrido del índice sin leer la tabla
+CREATE INDEX idx_tasks_project_assignee ON tasks (project_id, assigned_to);
@@ -0,0 +1,11 @@
+-- Resumen diario de tiempo de enfoque por usuario y tarea.
+-- Se mantiene de forma incremental al finalizar cada sesión; para reconstruirlo desde
+-- focus_sessions: flask --app app backfill-focus-rollup
+CREATE TABLE focus_daily_rollup (
+  `user_id` int(11) NOT NULL,
+  `day` date NOT NULL COMMENT 'Día de inicio de las sesiones',
+  `task_id` int(11) NOT NULL DEFAULT 0 COMMENT '0 para sesiones sin tarea',
+  `total_seconds` bigint(20) NOT NULL DEFAULT 0,
+  `session_count` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`user_id`, `day`, `task_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,12 @@
+-- Paginación por cursor y filtros de GET /tasks.
+-- Todas terminan en due_date para que ORDER BY due_date, task_id se resuelva con el índice
+-- (InnoDB añade task_id, la clave primaria, al final de cada índice secundario).
+
+-- Tareas de un usuario sin filtros o con rango de vencimiento
+CREATE INDEX idx_tasks_assignee_due ON tasks (assigned_to, due_date);
+
+-- Filtro por estado
+CREATE INDEX idx_tasks_assignee_status_due ON tasks (assigned_to, status, due_date);
+
+-- Filtro por proyecto (vista de detalle de un proyecto)
+CREATE INDEX idx_tasks_assignee_project_due ON tasks (assigned_to, project_id, due_date);
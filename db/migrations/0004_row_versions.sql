@@ -0,0 +1,36 @@
+-- Sincronización incremental (/api/sync): versión de fila en tareas, proyectos y notas,
+-- contador global de versiones y lápidas para los borrados.
+-- Las filas existentes quedan con versión 0 y solo se envían en una sincronización completa.
+
+ALTER TABLE tasks
+  ADD COLUMN `row_version` bigint(20) unsigned NOT NULL DEFAULT 0 COMMENT 'Versión del último cambio',
+  ADD INDEX idx_tasks_assignee_version (assigned_to, row_version);
+
+ALTER TABLE projects
+  ADD COLUMN `row_version` bigint(20) unsigned NOT NULL DEFAULT 0 COMMENT 'Versión del último cambio',
+  ADD INDEX idx_projects_version (row_version);
+
+ALTER TABLE notes
+  ADD COLUMN `row_version` bigint(20) unsigned NOT NULL DEFAULT 0 COMMENT 'Versión del último cambio',
+  ADD INDEX idx_notes_user_version (user_id, row_version);
+
+-- Una sola fila: última versión asignada y versión hasta la que se han purgado las lápidas
+CREATE TABLE sync_state (
+  `id` tinyint(3) unsigned NOT NULL,
+  `current_version` bigint(20) unsigned NOT NULL DEFAULT 0,
+  `pruned_version` bigint(20) unsigned NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO sync_state (id, current_version, pruned_version) VALUES (1, 0, 0);
+
+-- Lápidas: filas borradas (o tareas reasignadas a otro usuario) desde una versión dada
+CREATE TABLE sync_tombstones (
+  `version` bigint(20) unsigned NOT NULL,
+  `entity` enum('task','project','note') NOT NULL,
+  `entity_id` int(11) NOT NULL,
+  `user_id` int(11) DEFAULT NULL COMMENT 'Usuario afectado; NULL para proyectos (visibles para todos)',
+  `deleted_at` datetime NOT NULL,
+  PRIMARY KEY (`version`, `entity`, `entity_id`),
+  KEY `idx_sync_tombstones_deleted_at` (`deleted_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
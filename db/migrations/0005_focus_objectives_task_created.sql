@@ -0,0 +1,3 @@
+-- Objetivos de enfoque de una o varias tareas (/focus_objectives/<task_id> y ?task_ids=)
+-- en orden de creación, sin filesort.
+CREATE INDEX idx_focus_objectives_task_created ON focus_objectives (task_id, created_at);
@@ -0,0 +1,5 @@
+-- Índices de texto completo para la búsqueda global (/api/search): MATCH ... AGAINST en lugar
+-- de LIKE '%término%', que obliga a recorrer las tablas enteras.
+CREATE FULLTEXT INDEX idx_ft_tasks_title_description ON tasks (title, description);
+CREATE FULLTEXT INDEX idx_ft_projects_title_description ON projects (title, description);
+CREATE FULLTEXT INDEX idx_ft_notes_content ON notes (content);
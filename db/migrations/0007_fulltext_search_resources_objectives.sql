@@ -0,0 +1,4 @@
+-- Índices de texto completo de los tipos que se añadieron a la búsqueda global (/api/search)
+-- después de 0006: recursos y objetivos de enfoque.
+CREATE FULLTEXT INDEX idx_ft_resources_title_description_category ON resources (title, description, category);
+CREATE FULLTEXT INDEX idx_ft_focus_objectives_objective_text ON focus_objectives (objective_text);
@@ -0,0 +1,8 @@
+-- Contadores de versión por tabla (user_id = 0) y por (tabla, usuario) que usan los ETag de las listas
+-- y la caché de analítica. Al estar en la base de datos, todos los procesos ven las mismas versiones.
+CREATE TABLE data_versions (
+  `table_name` varchar(32) NOT NULL,
+  `user_id` int(11) NOT NULL DEFAULT 0 COMMENT '0 = cambio que afecta a todos los usuarios',
+  `version` bigint(20) unsigned NOT NULL DEFAULT 0,
+  PRIMARY KEY (`table_name`, `user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
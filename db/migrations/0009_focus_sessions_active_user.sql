@@ -0,0 +1,24 @@
+-- Sesión de enfoque activa compartida entre procesos: la base de datos garantiza una sola
+-- sesión abierta (end_time IS NULL) por usuario y la encuentra por índice único.
+
+-- Las sesiones abiertas no tienen fin ni duración todavía
+ALTER TABLE focus_sessions
+  MODIFY `end_time` datetime DEFAULT NULL,
+  MODIFY `duration_seconds` int(11) DEFAULT NULL;
+
+-- Si un usuario tuviera varias abiertas, se conserva la más reciente y las demás se cierran sin duración
+UPDATE focus_sessions fs
+JOIN (
+  SELECT user_id, MAX(session_id) AS keep_id
+  FROM focus_sessions
+  WHERE end_time IS NULL
+  GROUP BY user_id
+) latest ON latest.user_id = fs.user_id
+SET fs.end_time = fs.start_time, fs.duration_seconds = 0
+WHERE fs.end_time IS NULL AND fs.session_id <> latest.keep_id;
+
+-- user_id mientras la sesión está abierta y NULL al cerrarla (UNIQUE admite varios NULL)
+ALTER TABLE focus_sessions
+  ADD COLUMN `active_user_id` int(11) GENERATED ALWAYS AS (IF(`end_time` IS NULL, `user_id`, NULL)) STORED
+    COMMENT 'user_id mientras la sesión está abierta',
+  ADD UNIQUE INDEX uq_focus_sessions_active_user (active_user_id);
@@ -0,0 +1,11 @@
+-- Eventos de /api/stream compartidos entre procesos: cada proceso lee los nuevos por event_id y
+-- los clientes se reanudan con Last-Event-ID. Se purgan los más antiguos que STREAM_HISTORY_SECONDS.
+CREATE TABLE stream_events (
+  `event_id` bigint(20) unsigned NOT NULL AUTO_INCREMENT,
+  `event_type` varchar(32) NOT NULL,
+  `audience` json DEFAULT NULL COMMENT 'Lista de user_id destinatarios; NULL = todos los usuarios',
+  `payload` text NOT NULL COMMENT 'Datos del evento en JSON',
+  `created_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (`event_id`),
+  KEY `idx_stream_events_created` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
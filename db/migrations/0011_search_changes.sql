@@ -0,0 +1,67 @@
+-- Registro de cambios de los datos que indexa la búsqueda en memoria. Lo rellenan los triggers, en la
+-- misma transacción que el cambio, y cada proceso lo lee antes de responder una búsqueda para poner al
+-- día su índice (SearchIndex.sync). source = '*' pide a todos los procesos reconstruir el índice.
+-- Con el registro binario activo, crear triggers sin SUPER requiere log_bin_trust_function_creators = 1.
+-- Una sesión con @skip_search_changes definida (p. ej. `flask seed`) no registra sus cambios.
+CREATE TABLE search_changes (
+  `change_id` bigint(20) unsigned NOT NULL AUTO_INCREMENT,
+  `source` varchar(32) NOT NULL COMMENT 'Fuente de SEARCH_SOURCES (tasks, projects, notes...)',
+  `doc_id` int(11) NOT NULL,
+  `created_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (`change_id`),
+  KEY `idx_search_changes_created` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TRIGGER search_changes_tasks_insert AFTER INSERT ON tasks FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'tasks', NEW.task_id FROM DUAL WHERE @skip_search_changes IS NULL;
+CREATE TRIGGER search_changes_tasks_update AFTER UPDATE ON tasks FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'tasks', NEW.task_id FROM DUAL
+  WHERE @skip_search_changes IS NULL
+    AND NOT (NEW.title <=> OLD.title AND NEW.description <=> OLD.description
+             AND NEW.assigned_to <=> OLD.assigned_to AND NEW.created_by <=> OLD.created_by);
+CREATE TRIGGER search_changes_tasks_delete AFTER DELETE ON tasks FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'tasks', OLD.task_id FROM DUAL WHERE @skip_search_changes IS NULL;
+
+CREATE TRIGGER search_changes_projects_insert AFTER INSERT ON projects FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'projects', NEW.project_id FROM DUAL WHERE @skip_search_changes IS NULL;
+CREATE TRIGGER search_changes_projects_update AFTER UPDATE ON projects FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'projects', NEW.project_id FROM DUAL
+  WHERE @skip_search_changes IS NULL AND NOT (NEW.title <=> OLD.title AND NEW.description <=> OLD.description);
+CREATE TRIGGER search_changes_projects_delete AFTER DELETE ON projects FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'projects', OLD.project_id FROM DUAL WHERE @skip_search_changes IS NULL;
+
+CREATE TRIGGER search_changes_notes_insert AFTER INSERT ON notes FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'notes', NEW.note_id FROM DUAL WHERE @skip_search_changes IS NULL;
+CREATE TRIGGER search_changes_notes_update AFTER UPDATE ON notes FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'notes', NEW.note_id FROM DUAL
+  WHERE @skip_search_changes IS NULL
+    AND NOT (NEW.content <=> OLD.content AND NEW.user_id <=> OLD.user_id AND NEW.updated_at <=> OLD.updated_at);
+CREATE TRIGGER search_changes_notes_delete AFTER DELETE ON notes FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'notes', OLD.note_id FROM DUAL WHERE @skip_search_changes IS NULL;
+
+CREATE TRIGGER search_changes_resources_insert AFTER INSERT ON resources FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'resources', NEW.resource_id FROM DUAL WHERE @skip_search_changes IS NULL;
+CREATE TRIGGER search_changes_resources_update AFTER UPDATE ON resources FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'resources', NEW.resource_id FROM DUAL
+  WHERE @skip_search_changes IS NULL
+    AND NOT (NEW.title <=> OLD.title AND NEW.description <=> OLD.description
+             AND NEW.category <=> OLD.category AND NEW.user_id <=> OLD.user_id);
+CREATE TRIGGER search_changes_resources_delete AFTER DELETE ON resources FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'resources', OLD.resource_id FROM DUAL WHERE @skip_search_changes IS NULL;
+
+CREATE TRIGGER search_changes_focus_objectives_insert AFTER INSERT ON focus_objectives FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'focus_objectives', NEW.objective_id FROM DUAL WHERE @skip_search_changes IS NULL;
+CREATE TRIGGER search_changes_focus_objectives_update AFTER UPDATE ON focus_objectives FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'focus_objectives', NEW.objective_id FROM DUAL
+  WHERE @skip_search_changes IS NULL AND NOT (NEW.objective_text <=> OLD.objective_text AND NEW.task_id <=> OLD.task_id);
+CREATE TRIGGER search_changes_focus_objectives_delete AFTER DELETE ON focus_objectives FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'focus_objectives', OLD.objective_id FROM DUAL WHERE @skip_search_changes IS NULL;
+
+CREATE TRIGGER search_changes_users_insert AFTER INSERT ON users FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'users', NEW.user_id FROM DUAL WHERE @skip_search_changes IS NULL;
+CREATE TRIGGER search_changes_users_update AFTER UPDATE ON users FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'users', NEW.user_id FROM DUAL
+  WHERE @skip_search_changes IS NULL
+    AND NOT (NEW.username <=> OLD.username AND NEW.first_name <=> OLD.first_name AND NEW.last_name <=> OLD.last_name);
+CREATE TRIGGER search_changes_users_delete AFTER DELETE ON users FOR EACH ROW
+  INSERT INTO search_changes (source, doc_id) SELECT 'users', OLD.user_id FROM DUAL WHERE @skip_search_changes IS NULL;
@@ -0,0 +1,21 @@
+-- Estado de los trabajos en segundo plano compartido entre procesos: /api/jobs/<job_id> responde en
+-- cualquier worker, y la base de datos garantiza un solo trabajo pendiente o en curso por tipo y objetivo.
+CREATE TABLE background_jobs (
+  `job_id` char(16) NOT NULL,
+  `kind` varchar(32) NOT NULL COMMENT 'delete_project, delete_user...',
+  `target_id` int(11) NOT NULL,
+  `requested_by` int(11) DEFAULT NULL,
+  `status` enum('pending','running','completed','failed') NOT NULL DEFAULT 'pending',
+  `step` varchar(32) DEFAULT NULL,
+  `row_counts` text NOT NULL COMMENT 'JSON {tabla: filas procesadas}',
+  `error` text DEFAULT NULL,
+  `created_at` datetime NOT NULL,
+  `started_at` datetime DEFAULT NULL,
+  `finished_at` datetime DEFAULT NULL,
+  `heartbeat_at` datetime NOT NULL COMMENT 'Última señal del proceso que lo ejecuta',
+  -- tipo:objetivo mientras está pendiente o en curso y NULL al terminar (UNIQUE admite varios NULL)
+  `active_key` varchar(48) GENERATED ALWAYS AS (IF(`status` IN ('pending', 'running'), CONCAT(`kind`, ':', `target_id`), NULL)) STORED,
+  PRIMARY KEY (`job_id`),
+  UNIQUE KEY `uq_background_jobs_active` (`active_key`),
+  KEY `idx_background_jobs_finished` (`finished_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
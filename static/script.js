@@ -9,9 +9,12 @@ let currentFocusTaskId = null; // Se inicializa aquí, se actualiza al seleccion
 let focusObjectives = []; // Se inicializa aquí, se carga con objetivos de la tarea de enfoque
 let notesView = 'grid'; // Vista por defecto para las notas: 'grid' o 'list'
 let projectView = 'grid'; // Vista por defecto para los proyectos: 'grid' o 'list'
+let preloadedActiveSession = undefined; // Sesión activa del arranque del dashboard, hasta entrar en modo enfoque
 
 // --- VARIABLES GLOBALES PARA BÚSQUEDA ---
 let searchTimeout = null; // Para debounce de búsqueda
+let suggestController = null; // AbortController de la petición de sugerencias en curso
+let searchIndexReady = true; // false mientras el servidor construye el índice: se usa la búsqueda completa
 let isSearchActive = false; // Estado de búsqueda activa
 let searchResults = null; // Resultados de búsqueda actuales
 
@@ -225,6 +228,71 @@ function formatTimeAgo(dateString) {
     return `hace ${days} día(s)`;
 }
 
+/**
+ * Espera a que termine un trabajo en segundo plano del servidor (p. ej. el borrado de un proyecto).
+ * @param {string} jobId - El identificador devuelto al iniciar el trabajo.
+ * @param {number} intervalMs - Intervalo entre consultas de estado.
+ * @returns {Promise<object>} El estado final del trabajo.
+ */
+async function waitForJob(jobId, intervalMs = 1000) {
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        const job = await response.json();
+        if (!response.ok) throw new Error(job.error || 'No se pudo consultar el estado del trabajo');
+        if (job.status === 'completed') return job;
+        if (job.status === 'failed') throw new Error(job.error || 'El trabajo no pudo completarse');
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
+/**
+ * Se suscribe a /api/stream (Server-Sent Events) y recarga las secciones afectadas por los cambios
+ * de otros usuarios o de otras pestañas. Las recargas de un mismo tipo se agrupan para que una
+ * ráfaga de eventos produzca una sola petición (y las listas sin cambios responden 304).
+ */
+function subscribeToChanges() {
+    if (!window.EventSource) return;
+    const reloaders = {
+        task: () => { loadAndRenderTasks(); populateFocusTaskSelect(); },
+        project: () => loadAndRenderProjects(),
+        activity: () => loadRecentActivity(),
+        note: () => { loadAndRenderNotes(); loadAllNotes(); },
+        focus: () => loadFocusStats(),
+    };
+    const pending = new Set();
+    let flushTimer = null;
+    const schedule = (...kinds) => {
+        kinds.forEach(kind => pending.add(kind));
+        clearTimeout(flushTimer);
+        flushTimer = setTimeout(() => {
+            pending.forEach(kind => reloaders[kind]());
+            pending.clear();
+        }, 300);
+    };
+
+    const source = new EventSource('/api/stream');
+    const listeners = {
+        'task.created': ['task'],
+        'task.updated': ['task'],
+        'task.deleted': ['task'],
+        'task.batch': ['task'],
+        'task.completed': ['task', 'activity'],
+        'project.created': ['project', 'activity'],
+        'project.updated': ['project'],
+        'project.deleted': ['project', 'task'],
+        'note.created': ['note'],
+        'note.updated': ['note'],
+        'note.deleted': ['note'],
+        'focus.started': ['focus'],
+        'focus.stopped': ['focus'],
+        // El servidor no pudo entregar todos los eventos: se recarga todo
+        reset: Object.keys(reloaders),
+    };
+    Object.entries(listeners).forEach(([eventType, kinds]) => {
+        source.addEventListener(eventType, () => schedule(...kinds));
+    });
+}
+
 /**
  * Abre un modal específico.
  * @param {string} modalId - El ID del modal a abrir (ej. 'modalAddTask').
@@ -473,8 +541,9 @@ function addResourceCardToDOM(resource) {
 
 /**
  * Carga las notas ancladas desde la API y las muestra en el dashboard.
+ * @param {Array|null} preloadedNotes - Notas ya obtenidas (p. ej. del arranque del dashboard); si es null se piden a la API.
  */
-async function loadAndRenderNotes() {
+async function loadAndRenderNotes(preloadedNotes = null) {
     const importantNotesList = document.getElementById('important-notes-list');
     const viewAllNotesBtn = document.querySelector('.view-all-notes-btn');
     if (!importantNotesList) return;
@@ -482,11 +551,13 @@ async function loadAndRenderNotes() {
     importantNotesList.innerHTML = '<p class="loading-notes">Cargando notas...</p>';
 
     try {
-        // Solo pedimos las notas ancladas para el dashboard
-        const response = await fetch('/api/notes?pinned=true');
-        if (!response.ok) throw new Error('No se pudieron cargar las notas.');
-
-        const notes = await response.json();
+        let notes = preloadedNotes;
+        if (!notes) {
+            // Solo pedimos las notas ancladas para el dashboard
+            const response = await fetch('/api/notes?pinned=true');
+            if (!response.ok) throw new Error('No se pudieron cargar las notas.');
+            notes = await response.json();
+        }
         importantNotesList.innerHTML = ''; // Limpiar el contenedor
 
         if (notes.length === 0) {
@@ -544,14 +615,19 @@ function addNoteToDOM(note) {
 /**
  * Carga todas las tareas existentes desde la API y las muestra en la página,
  * aplicando filtros y ordenamiento.
+ * @param {Array|null} preloadedTasks - Tareas ya obtenidas (p. ej. del arranque del dashboard); si es null se piden a la API.
  */
-async function loadAndRenderTasks() {
+async function loadAndRenderTasks(preloadedTasks = null) {
     const taskListContainer = document.getElementById('task-list');
     if (!taskListContainer) return;
     try {
-        const response = await fetch('/tasks');
-        if (!response.ok) throw new Error('Error al cargar tareas');
-        allTasks = await response.json(); // Guardar todas las tareas en memoria
+        if (preloadedTasks) {
+            allTasks = preloadedTasks;
+        } else {
+            const response = await fetch('/tasks');
+            if (!response.ok) throw new Error('Error al cargar tareas');
+            allTasks = await response.json(); // Guardar todas las tareas en memoria
+        }
         applyFiltersAndSort(); // Renderizar la lista inicial aplicando filtros y orden por defecto
     } catch (error) {
         console.error('Error al cargar las tareas:', error);
@@ -721,19 +797,24 @@ function renderTaskList(tasks) {
 
 /**
  * Carga los colaboradores desde la API y los renderiza en el DOM.
+ * @param {Array|null} preloadedCollaborators - Colaboradores ya obtenidos (p. ej. del arranque del dashboard); si es null se piden a la API.
  */
-async function loadAndRenderCollaborators() {
+async function loadAndRenderCollaborators(preloadedCollaborators = null) {
     const collaboratorList = document.getElementById('collaborator-list');
     if (!collaboratorList) return;
 
     collaboratorList.innerHTML = '<div class="loading-state"><i class="fas fa-spinner fa-spin"></i><p>Cargando colaboradores...</p></div>'; // Mensaje de carga
 
     try {
-        const response = await fetch('/api/collaborators');
-        if (!response.ok) {
-            throw new Error('Respuesta del servidor no fue OK.');
+        if (preloadedCollaborators) {
+            allCollaborators = preloadedCollaborators;
+        } else {
+            const response = await fetch('/api/collaborators');
+            if (!response.ok) {
+                throw new Error('Respuesta del servidor no fue OK.');
+            }
+            allCollaborators = await response.json(); // Guardar en caché
         }
-        allCollaborators = await response.json(); // Guardar en caché
 
         populateRoleFilter(); // Poblar el selector de filtros
         applyCollaboratorFilters(); // Aplicar filtros iniciales (ninguno) y renderizar
@@ -945,7 +1026,8 @@ ${window.current_user_name || 'Usuario de TaskManager Pro'}`
                     });
                     const result = await resp.json();
                     if (!resp.ok) throw new Error(result.error || 'Error desconocido');
-                    await showAlert('Usuario eliminado', result.message);
+                    if (result.job_id) await waitForJob(result.job_id);
+                    await showAlert('Usuario eliminado', 'Usuario eliminado correctamente');
                     await loadAndRenderCollaborators();
                 } catch (e) {
                     await showAlert('Error', e.message);
@@ -1167,15 +1249,19 @@ async function loadFocusStats(days = 30) {
 
 /**
  * Carga las tareas pendientes en el selector de modo enfoque.
+ * @param {Array|null} preloadedTasks - Tareas ya obtenidas (p. ej. del arranque del dashboard); si es null se piden a la API.
  */
-async function populateFocusTaskSelect() {
+async function populateFocusTaskSelect(preloadedTasks = null) {
     const taskToFocusSelect = document.getElementById('task-to-focus');
     if (!taskToFocusSelect) return;
     taskToFocusSelect.innerHTML = '<option value="">Selecciona una tarea...</option>';
     try {
-        const resp = await fetch('/tasks');
-        if (!resp.ok) throw new Error('No se pudieron cargar las tareas');
-        const tasks = await resp.json();
+        let tasks = preloadedTasks;
+        if (!tasks) {
+            const resp = await fetch('/tasks');
+            if (!resp.ok) throw new Error('No se pudieron cargar las tareas');
+            tasks = await resp.json();
+        }
         tasks.forEach(task => {
             const option = document.createElement('option');
             option.value = task.task_id;
@@ -1354,7 +1440,7 @@ function updateTimerDisplay(timeRemaining) {
 /**
  * Realiza una búsqueda global en tareas, proyectos y notas.
  * @param {string} searchTerm - Término de búsqueda.
- * @param {string} searchType - Tipo de búsqueda ('all', 'tasks', 'projects', 'notes').
+ * @param {string} searchType - Tipo de búsqueda ('all', 'tasks', 'projects', 'notes', 'resources', 'focus_objectives').
  * @returns {Promise<object|null>} Resultados de búsqueda o null si hay error.
  */
 async function performGlobalSearch(searchTerm, searchType = 'all') {
@@ -1424,8 +1510,11 @@ function renderSearchResults(results) {
     
     if (!modalTitle || !modalBody) return;
 
-    // Actualizar título
-    modalTitle.textContent = `Resultados para "${results.query}" (${results.total_results} encontrados)`;
+    // Actualizar título: los totales de la primera página (con "+" si alguno no es exacto)
+    const totals = Object.values(results.totals || {});
+    const totalCount = totals.reduce((sum, total) => sum + total.count, 0);
+    const totalLabel = totals.some(total => !total.exact) ? `${totalCount}+` : totalCount;
+    modalTitle.textContent = `Resultados para "${results.query}" (${totalLabel} encontrados)`;
 
     // Limpiar contenido anterior
     modalBody.innerHTML = '';
@@ -1440,17 +1529,20 @@ function renderSearchResults(results) {
         `;
     } else {
         // Renderizar secciones de resultados
-        if (results.tasks && results.tasks.length > 0) {
-            modalBody.appendChild(createSearchSection('Tareas', results.tasks, 'task'));
-        }
-        
-        if (results.projects && results.projects.length > 0) {
-            modalBody.appendChild(createSearchSection('Proyectos', results.projects, 'project'));
-        }
-        
-        if (results.notes && results.notes.length > 0) {
-            modalBody.appendChild(createSearchSection('Notas', results.notes, 'note'));
-        }
+        const sections = [
+            ['tasks', 'Tareas', 'task'],
+            ['projects', 'Proyectos', 'project'],
+            ['notes', 'Notas', 'note'],
+            ['resources', 'Recursos', 'resource'],
+            ['focus_objectives', 'Objetivos de enfoque', 'objective'],
+        ];
+        sections.forEach(([source, title, type]) => {
+            if (results[source] && results[source].length > 0) {
+                const total = results.totals && results.totals[source];
+                const cursor = results.cursors && results.cursors[source];
+                modalBody.appendChild(createSearchSection(title, results[source], type, total, results.query, source, cursor));
+            }
+        });
     }
 
     // Mostrar modal
@@ -1462,16 +1554,21 @@ function renderSearchResults(results) {
  * Crea una sección de resultados para un tipo específico.
  * @param {string} title - Título de la sección.
  * @param {Array} items - Items a mostrar.
- * @param {string} type - Tipo de item ('task', 'project', 'note').
+ * @param {string} type - Tipo de item ('task', 'project', 'note', 'resource', 'objective').
+ * @param {object} [total] - Total de coincidencias del tipo ({count, exact}).
+ * @param {string} [query] - Término buscado, para pedir más resultados.
+ * @param {string} [source] - Tipo en la API ('tasks', 'projects', ...).
+ * @param {string} [cursor] - Cursor de la siguiente página de este tipo, si hay más.
  * @returns {HTMLElement} Elemento DOM de la sección.
  */
-function createSearchSection(title, items, type) {
+function createSearchSection(title, items, type, total, query, source, cursor) {
     const section = document.createElement('div');
     section.className = 'search-results-section';
     
     const sectionTitle = document.createElement('h4');
     sectionTitle.className = 'search-section-title';
-    sectionTitle.innerHTML = `<i class="fas fa-${getIconForType(type)}"></i> ${title} (${items.length})`;
+    const count = total ? `${total.count}${total.exact ? '' : '+'}` : items.length;
+    sectionTitle.innerHTML = `<i class="fas fa-${getIconForType(type)}"></i> ${title} (${count})`;
     section.appendChild(sectionTitle);
     
     const itemsList = document.createElement('div');
@@ -1483,6 +1580,35 @@ function createSearchSection(title, items, type) {
     });
     
     section.appendChild(itemsList);
+
+    // Botón para cargar la siguiente página de este tipo
+    if (cursor) {
+        let nextCursor = cursor;
+        const moreButton = document.createElement('button');
+        moreButton.className = 'btn search-more-btn';
+        moreButton.textContent = 'Ver más';
+        moreButton.addEventListener('click', async () => {
+            moreButton.disabled = true;
+            try {
+                const response = await fetch(`/api/search?q=${encodeURIComponent(query)}&type=${source}&cursor=${encodeURIComponent(nextCursor)}`);
+                if (!response.ok) {
+                    const errorData = await response.json();
+                    throw new Error(errorData.error || 'Error en la búsqueda');
+                }
+                const page = await response.json();
+                page[source].forEach(item => itemsList.appendChild(createSearchResultItem(item, type)));
+                nextCursor = page.cursors[source];
+                if (!nextCursor) {
+                    moreButton.remove();
+                }
+            } catch (error) {
+                console.error('Error cargando más resultados:', error);
+            } finally {
+                moreButton.disabled = false;
+            }
+        });
+        section.appendChild(moreButton);
+    }
     return section;
 }
 
@@ -1496,6 +1622,8 @@ function getIconForType(type) {
         case 'task': return 'tasks';
         case 'project': return 'project-diagram';
         case 'note': return 'sticky-note';
+        case 'resource': return 'link';
+        case 'objective': return 'bullseye';
         default: return 'file';
     }
 }
@@ -1522,7 +1650,7 @@ function createSearchResultItem(item, type) {
                     <h5 class="search-item-title">${item.task_title}</h5>
                     <span class="search-item-priority priority-${priorityClass}">${item.priority || 'Baja'}</span>
                 </div>
-                <p class="search-item-description">${item.description || 'Sin descripción'}</p>
+                <p class="search-item-description">${item.snippet || item.description || 'Sin descripción'}</p>
                 <div class="search-item-meta">
                     <span><i class="fas fa-calendar"></i> Vence: ${dueDate}</span>
                     ${item.project_name ? `<span><i class="fas fa-folder"></i> ${item.project_name}</span>` : ''}
@@ -1543,7 +1671,7 @@ function createSearchResultItem(item, type) {
                     <h5 class="search-item-title">${item.project_name}</h5>
                     <span class="search-item-status status-${item.status || 'pendiente'}">${item.status || 'Pendiente'}</span>
                 </div>
-                <p class="search-item-description">${item.description || 'Sin descripción'}</p>
+                <p class="search-item-description">${item.snippet || item.description || 'Sin descripción'}</p>
                 <div class="search-item-meta">
                     <span><i class="fas fa-calendar"></i> Creado: ${createdDate}</span>
                     <span><i class="fas fa-tasks"></i> ${item.task_count || 0} tareas</span>
@@ -1565,7 +1693,7 @@ function createSearchResultItem(item, type) {
                     <h5 class="search-item-title">Nota</h5>
                     ${item.is_pinned ? '<i class="fas fa-thumbtack search-pinned-icon" title="Nota anclada"></i>' : ''}
                 </div>
-                <p class="search-item-description">${truncatedContent}</p>
+                <p class="search-item-description">${item.snippet || truncatedContent}</p>
                 <div class="search-item-meta">
                     <span><i class="fas fa-calendar"></i> ${noteDate}</span>
                 </div>
@@ -1576,6 +1704,43 @@ function createSearchResultItem(item, type) {
                 </button>
             `;
             break;
+
+        case 'resource':
+            const resourceDate = new Date(item.created_at).toLocaleDateString('es-ES');
+            content = `
+                <div class="search-item-header">
+                    <h5 class="search-item-title">${item.title}</h5>
+                    <span class="search-item-status">${item.type}</span>
+                </div>
+                <p class="search-item-description">${item.snippet || item.description || 'Sin descripción'}</p>
+                <div class="search-item-meta">
+                    <span><i class="fas fa-calendar"></i> ${resourceDate}</span>
+                    ${item.category ? `<span><i class="fas fa-tag"></i> ${item.category}</span>` : ''}
+                </div>
+            `;
+            actions = `
+                <a class="search-action-btn" href="${item.url_or_path}" target="_blank" rel="noopener noreferrer" title="Abrir recurso">
+                    <i class="fas fa-external-link-alt"></i>
+                </a>
+            `;
+            break;
+
+        case 'objective':
+            content = `
+                <div class="search-item-header">
+                    <h5 class="search-item-title">${item.snippet || item.objective_text}</h5>
+                    <span class="search-item-status">${item.completed ? 'Completado' : 'Pendiente'}</span>
+                </div>
+                <div class="search-item-meta">
+                    <span><i class="fas fa-tasks"></i> ${item.task_title}</span>
+                </div>
+            `;
+            actions = `
+                <button class="search-action-btn" onclick="navigateToTask(${item.task_id})" title="Ver tarea">
+                    <i class="fas fa-eye"></i>
+                </button>
+            `;
+            break;
     }
     
     resultItem.innerHTML = `
@@ -1678,7 +1843,8 @@ function navigateToNote(noteId) {
 }
 
 /**
- * Maneja la entrada de texto en el campo de búsqueda con debounce.
+ * Maneja la entrada de texto en el campo de búsqueda con debounce: mientras se escribe muestra
+ * sugerencias de /api/search/suggest; la búsqueda completa se lanza con Enter o desde las sugerencias.
  * @param {string} searchTerm - Término de búsqueda.
  */
 function handleSearchInput(searchTerm) {
@@ -1687,37 +1853,153 @@ function handleSearchInput(searchTerm) {
         clearTimeout(searchTimeout);
     }
     
-    // Si el término está vacío, no hacer nada
-    if (!searchTerm || searchTerm.length < 2) {
+    // Si el término está vacío, ocultar las sugerencias
+    if (!searchTerm) {
+        hideSearchSuggestions();
         return;
     }
     
-    // Configurar nuevo timeout para debounce
-    searchTimeout = setTimeout(async () => {
-        const results = await performGlobalSearch(searchTerm);
-        if (results) {
-            searchResults = results;
-            renderSearchResults(results);
+    // Sin índice en el servidor se vuelve a la búsqueda completa (mínimo 2 caracteres, 300ms de debounce)
+    if (!searchIndexReady) {
+        if (searchTerm.length < 2) return;
+        searchTimeout = setTimeout(() => runGlobalSearch(searchTerm), 300);
+        return;
+    }
+    searchTimeout = setTimeout(() => loadSearchSuggestions(searchTerm), 80); // 80ms de debounce
+}
+
+/**
+ * Lanza la búsqueda completa y muestra el modal de resultados.
+ * @param {string} searchTerm - Término de búsqueda.
+ */
+async function runGlobalSearch(searchTerm) {
+    if (suggestController) {
+        suggestController.abort();
+    }
+    hideSearchSuggestions();
+    const results = await performGlobalSearch(searchTerm);
+    if (results) {
+        searchResults = results;
+        renderSearchResults(results);
+    }
+}
+
+/**
+ * Pide sugerencias de autocompletado; cancela la petición anterior si aún no ha terminado.
+ * @param {string} searchTerm - Texto escrito hasta ahora.
+ */
+async function loadSearchSuggestions(searchTerm) {
+    if (suggestController) {
+        suggestController.abort();
+    }
+    suggestController = new AbortController();
+    try {
+        const response = await fetch(`/api/search/suggest?q=${encodeURIComponent(searchTerm)}`, { signal: suggestController.signal });
+        if (!response.ok) {
+            throw new Error('Error al obtener sugerencias');
         }
-    }, 300); // 300ms de debounce
+        const data = await response.json();
+        searchIndexReady = data.ready;
+        if (!data.ready) {
+            handleSearchInput(searchTerm);
+            return;
+        }
+        // Si el usuario ya salió del campo o lanzó la búsqueda completa, no volver a abrir la lista
+        if (document.activeElement === document.getElementById('globalSearchInput')) {
+            renderSearchSuggestions(searchTerm, data.suggestions);
+        }
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error en sugerencias de búsqueda:', error);
+        }
+    }
+}
+
+/**
+ * Muestra las sugerencias bajo el campo de búsqueda, más una entrada para ver todos los resultados.
+ * @param {string} searchTerm - Texto escrito.
+ * @param {Array} suggestions - Sugerencias de la API ({type, id, label, highlight}).
+ */
+function renderSearchSuggestions(searchTerm, suggestions) {
+    const list = document.getElementById('searchSuggestions');
+    if (!list) return;
+    const icons = { tasks: 'tasks', projects: 'project-diagram', notes: 'sticky-note', users: 'user' };
+
+    list.innerHTML = suggestions.map(item => `
+        <li class="search-suggestion" role="option" data-type="${item.type}" data-id="${item.id}">
+            <i class="fas fa-${icons[item.type] || 'file'}"></i><span>${item.highlight}</span>
+        </li>
+    `).join('');
+    const allItem = document.createElement('li');
+    allItem.className = 'search-suggestion search-suggestion-all';
+    allItem.setAttribute('role', 'option');
+    allItem.innerHTML = '<i class="fas fa-search"></i><span></span>';
+    allItem.querySelector('span').textContent = `Ver todos los resultados de "${searchTerm}"`;
+    list.appendChild(allItem);
+    list.hidden = false;
+}
+
+function hideSearchSuggestions() {
+    const list = document.getElementById('searchSuggestions');
+    if (list) {
+        list.hidden = true;
+        list.innerHTML = '';
+    }
+}
+
+/**
+ * Abre el elemento de una sugerencia (o la búsqueda completa, para la última entrada).
+ * @param {HTMLElement} item - Elemento <li> de la sugerencia.
+ */
+function selectSearchSuggestion(item) {
+    const searchInput = document.getElementById('globalSearchInput');
+    hideSearchSuggestions();
+    const id = parseInt(item.dataset.id, 10);
+    switch (item.dataset.type) {
+        case 'tasks': navigateToTask(id); break;
+        case 'projects': navigateToProject(id); break;
+        case 'notes': navigateToNote(id); break;
+        case 'users': showCollaboratorProfile(id); break;
+        default:
+            if (searchInput && searchInput.value.trim().length >= 2) {
+                runGlobalSearch(searchInput.value.trim());
+            }
+    }
+}
+
+/**
+ * Mueve la sugerencia activa con las flechas del teclado.
+ * @param {number} step - 1 para bajar, -1 para subir.
+ */
+function moveSearchSuggestion(step) {
+    const list = document.getElementById('searchSuggestions');
+    if (!list || list.hidden) return;
+    const items = Array.from(list.querySelectorAll('.search-suggestion'));
+    const current = items.findIndex(item => item.classList.contains('active'));
+    const next = (current + step + items.length) % items.length;
+    items.forEach((item, index) => item.classList.toggle('active', index === next));
 }
 
 
 /**
  * Carga y muestra la actividad reciente del usuario.
+ * @param {Array|null} preloadedActivities - Actividad ya obtenida (p. ej. del arranque del dashboard); si es null se pide a la API.
  */
-async function loadRecentActivity() {
+async function loadRecentActivity(preloadedActivities = null) {
     const activityList = document.getElementById('recent-activity-list');
     if (!activityList) return;
 
     activityList.innerHTML = '<li class="loading-activity">Cargando actividad...</li>';
 
     try {
-        const response = await fetch('/api/activity/recent');
-        if (!response.ok) {
-            throw new Error('No se pudo cargar la actividad reciente');
+        let activities = preloadedActivities;
+        if (!activities) {
+            const response = await fetch('/api/activity/recent');
+            if (!response.ok) {
+                throw new Error('No se pudo cargar la actividad reciente');
+            }
+            activities = await response.json();
         }
-        const activities = await response.json();
 
         activityList.innerHTML = ''; // Limpiar mensaje de carga
 
@@ -1808,23 +2090,25 @@ function getWeekDateRange(weekString) {
  * @param {string|null} [startDate=null] - La fecha de inicio para el filtro (YYYY-MM-DD).
  * @param {string|null} [endDate=null] - La fecha de fin para el filtro (YYYY-MM-DD).
  */
-function loadChartJsAndRenderAnalytics(startDate = null, endDate = null) {
+function loadChartJsAndRenderAnalytics(startDate = null, endDate = null, preloaded = null) {
     if (!window.Chart) {
         const script = document.createElement('script');
         script.src = 'https://cdn.jsdelivr.net/npm/chart.js';
         // Envolvemos la llamada en una función para poder pasar los parámetros
-        script.onload = () => renderAnalyticsCharts(startDate, endDate);
+        script.onload = () => renderAnalyticsCharts(startDate, endDate, preloaded);
         document.head.appendChild(script);
     } else {
         // Si ya está cargado, simplemente llamamos a la función con los parámetros
-        renderAnalyticsCharts(startDate, endDate);
+        renderAnalyticsCharts(startDate, endDate, preloaded);
     }
 }
 
 /**
  * Renderiza los gráficos de analíticas y actualiza las tarjetas KPI.
+ * @param {object|null} preloaded - `{projects, tasks, summary}` ya obtenidos para el mismo periodo
+ * (p. ej. del arranque del dashboard); si es null se piden a la API.
  */
-async function renderAnalyticsCharts(startDate = null, endDate = null) {
+async function renderAnalyticsCharts(startDate = null, endDate = null, preloaded = null) {
     let projects = [];
     let tasks = [];
     let queryParams = '';
@@ -1832,18 +2116,23 @@ async function renderAnalyticsCharts(startDate = null, endDate = null) {
         queryParams = `?start_date=${startDate}&end_date=${endDate}`;
     }
 
-    try {
-        const [projectsResp, tasksResp] = await Promise.all([
-            fetch(`/projects${queryParams}`),
-            fetch(`/tasks${queryParams}`)
-        ]);
-        if (projectsResp.ok) projects = await projectsResp.json();
-        if (tasksResp.ok) tasks = await tasksResp.json();
-    } catch (e) {
-        console.error("Error fetching initial data for analytics:", e);
-        // Si falla, usar datos vacíos
-        projects = [];
-        tasks = [];
+    if (preloaded) {
+        projects = preloaded.projects;
+        tasks = preloaded.tasks;
+    } else {
+        try {
+            const [projectsResp, tasksResp] = await Promise.all([
+                fetch(`/projects${queryParams}`),
+                fetch(`/tasks${queryParams}`)
+            ]);
+            if (projectsResp.ok) projects = await projectsResp.json();
+            if (tasksResp.ok) tasks = await tasksResp.json();
+        } catch (e) {
+            console.error("Error fetching initial data for analytics:", e);
+            // Si falla, usar datos vacíos
+            projects = [];
+            tasks = [];
+        }
     }
 
     // --- ACTUALIZAR TARJETA DE TAREAS TOTALES EN EL DASHBOARD ---
@@ -2056,11 +2345,14 @@ async function renderAnalyticsCharts(startDate = null, endDate = null) {
 
     // --- Carga de KPIs (Indicadores Clave de Rendimiento) ---
     try {
-        const response = await fetch(`/api/analytics/summary${queryParams}`);
-        if (!response.ok) {
-            throw new Error('No se pudo cargar el resumen de analíticas');
+        let summaryData = preloaded && preloaded.summary;
+        if (!summaryData) {
+            const response = await fetch(`/api/analytics/summary${queryParams}`);
+            if (!response.ok) {
+                throw new Error('No se pudo cargar el resumen de analíticas');
+            }
+            summaryData = await response.json();
         }
-        const summaryData = await response.json();
         const {
             completedThisWeek,
             productivityChange,
@@ -2097,14 +2389,19 @@ async function renderAnalyticsCharts(startDate = null, endDate = null) {
 /**
  * Carga todos los proyectos existentes desde la API y los muestra en la página,
  * aplicando filtros y ordenamiento.
+ * @param {Array|null} preloadedProjects - Proyectos ya obtenidos (p. ej. del arranque del dashboard); si es null se piden a la API.
  */
-async function loadAndRenderProjects() {
+async function loadAndRenderProjects(preloadedProjects = null) {
     const projectGridContainer = document.getElementById('project-grid');
     if (!projectGridContainer) return;
     try {
-        const response = await fetch('/projects');
-        if (!response.ok) throw new Error('Error al cargar proyectos');
-        allProjects = await response.json(); // Guardar todos los proyectos en memoria
+        if (preloadedProjects) {
+            allProjects = preloadedProjects;
+        } else {
+            const response = await fetch('/projects');
+            if (!response.ok) throw new Error('Error al cargar proyectos');
+            allProjects = await response.json(); // Guardar todos los proyectos en memoria
+        }
 
         renderProjectListWithFilter(); // Renderizar la lista inicial aplicando filtros y orden por defecto
     } catch (error) {
@@ -2259,8 +2556,10 @@ function addProjectToDOM(project, view = 'grid') {
 
 /**
  * Rellena los selectores <select> de los modales (proyectos y usuarios).
+ * @param {Array|null} preloadedProjects - Proyectos ya obtenidos; si es null se piden a la API.
+ * @param {Array|null} preloadedUsers - Usuarios ya obtenidos; si es null se piden a la API.
  */
-async function populateDropdowns() {
+async function populateDropdowns(preloadedProjects = null, preloadedUsers = null) {
     const projectSelect = document.getElementById('addTaskProject');
     const userSelect = document.getElementById('addTaskAssignedTo');
 
@@ -2272,16 +2571,14 @@ async function populateDropdowns() {
 
     try {
         // Cargar Proyectos
-        const projectsResponse = await fetch('/projects');
-        const projects = await projectsResponse.json();
+        const projects = preloadedProjects || await (await fetch('/projects')).json();
         projects.forEach(project => {
             const option = new Option(project.project_name, project.project_id);
             projectSelect.add(option.cloneNode(true));
         });
 
         // Cargar Usuarios
-        const usersResponse = await fetch('/users');
-        const users = await usersResponse.json();
+        const users = preloadedUsers || await (await fetch('/users')).json();
         users.forEach(user => {
             const option = new Option(`${user.first_name} ${user.last_name} (@${user.username})`, user.user_id);
             userSelect.add(option.cloneNode(true));
@@ -2328,19 +2625,22 @@ window.removeObjective = async function(id) {
 /**
  * Verifica si hay una sesión de enfoque activa al cargar la página de enfoque
  * y permite al usuario descartarla si lo desea.
+ * @param {object|null|undefined} preloadedSession - Sesión ya obtenida (null si no hay); si es undefined se pide a la API.
  */
-async function checkAndHandleActiveFocusSession() {
+async function checkAndHandleActiveFocusSession(preloadedSession = undefined) {
     try {
-        const response = await fetch('/api/focus/active_session');
-        // Si el servidor devuelve un error (ej. 401, 500), no molestamos al usuario.
-        // Simplemente lo registramos en la consola y continuamos.
-        if (!response.ok) {
-            console.error('No se pudo verificar el estado de la sesión de enfoque.');
-            return;
+        let activeSession = preloadedSession;
+        if (activeSession === undefined) {
+            const response = await fetch('/api/focus/active_session');
+            // Si el servidor devuelve un error (ej. 401, 500), no molestamos al usuario.
+            // Simplemente lo registramos en la consola y continuamos.
+            if (!response.ok) {
+                console.error('No se pudo verificar el estado de la sesión de enfoque.');
+                return;
+            }
+            activeSession = await response.json();
         }
 
-        const activeSession = await response.json();
-
         // El endpoint devuelve `null` si no hay sesión activa.
         // Si devuelve un objeto, significa que hay una sesión colgada.
         if (activeSession && activeSession.session_id) {
@@ -2372,6 +2672,42 @@ async function checkAndHandleActiveFocusSession() {
     }
 }
 
+/**
+ * Carga el dashboard con una sola petición a /api/dashboard/bootstrap y reparte cada parte de la
+ * respuesta a su sección. Si el arranque falla, cada sección pide sus datos a su propia API.
+ */
+async function loadDashboard() {
+    let data = null;
+    try {
+        const response = await fetch('/api/dashboard/bootstrap');
+        if (!response.ok) throw new Error('No se pudo cargar el arranque del dashboard');
+        data = await response.json();
+    } catch (error) {
+        console.error('Error al cargar el dashboard:', error);
+    }
+
+    if (!data) {
+        loadAndRenderTasks();
+        loadAndRenderProjects();
+        populateDropdowns();
+        loadAndRenderNotes();
+        loadRecentActivity();
+        loadChartJsAndRenderAnalytics();
+        populateFocusTaskSelect();
+        return;
+    }
+
+    loadAndRenderTasks(data.tasks);
+    loadAndRenderProjects(data.projects);
+    populateDropdowns(data.projects, data.users); // Carga los datos para los selectores de los formularios
+    loadAndRenderNotes(data.pinnedNotes); // Notas importantes del dashboard
+    loadRecentActivity(data.recentActivity);
+    loadChartJsAndRenderAnalytics(null, null, { projects: data.projects, tasks: data.tasks, summary: data.analyticsSummary });
+    populateFocusTaskSelect(data.tasks); // Tareas para el selector de modo enfoque
+    loadAndRenderCollaborators(data.collaborators);
+    preloadedActiveSession = data.activeSession;
+}
+
 /**
  * Initializes all the main event listeners for the application.
  */
@@ -2459,7 +2795,7 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
     // --- INTEGRACIÓN DE CHART.JS PARA ANALÍTICAS ---
-    loadChartJsAndRenderAnalytics();
+    // La primera carga de las analíticas llega con el arranque del dashboard (loadDashboard)
 
     // --- Lógica para Exportar Datos ---
     const exportDataBtn = document.getElementById('export-data-btn');
@@ -2505,9 +2841,6 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    // --- LÓGICA DE ACTIVIDAD RECIENTE ---
-    loadRecentActivity();
-
     // --- Sección de Navegación y Vistas ---
     // Selecciona todos los elementos del menú y las secciones de contenido
     const menuItems = document.querySelectorAll('.sidebar .menu-item');
@@ -2517,7 +2850,7 @@ document.addEventListener('DOMContentLoaded', () => {
      * Cambia la vista a la sección especificada y carga los datos necesarios.
      * @param {string} sectionName - El nombre de la sección (ej. 'inicio', 'recursos').
      */
-    function showSection(sectionName) {
+    function showSection(sectionName, loadData = true) {
         const targetSectionId = sectionName + '-section';
 
         sections.forEach(section => {
@@ -2537,7 +2870,9 @@ document.addEventListener('DOMContentLoaded', () => {
         });
 
         // Cargar datos específicos de la sección al cambiar
-        if (sectionName === 'notas') {
+        if (!loadData) {
+            return;
+        } else if (sectionName === 'notas') {
             loadAllNotes(); // Carga todas las notas
         } else if (sectionName === 'colaboradores') {
             loadAndRenderCollaborators(); // Carga y renderiza colaboradores
@@ -2551,7 +2886,9 @@ document.addEventListener('DOMContentLoaded', () => {
             loadAndRenderProjects(); // Carga y renderiza los proyectos
         } else if (sectionName === 'modo-enfoque') {
             // Al entrar en el modo enfoque, verificar si hay sesiones colgadas.
-            checkAndHandleActiveFocusSession();
+            // La primera vez se usa la sesión que trajo el arranque del dashboard.
+            checkAndHandleActiveFocusSession(preloadedActiveSession);
+            preloadedActiveSession = undefined;
             // También es buena idea recargar las tareas para el selector y las estadísticas.
             loadTasksForFocus();
             loadFocusStats();
@@ -2572,7 +2909,7 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     // Asegurarse de que la sección 'inicio' esté activa al cargar y sus datos se carguen
-    showSection('inicio'); // Usar 'inicio' como nombre de sección para el showSection
+    showSection('inicio', false); // Usar 'inicio' como nombre de sección; sus datos llegan con loadDashboard
     loadAndRenderNotes(); // Cargar las notas ancladas para el dashboard al inicio
 
     // --- Lógica para Modales ---
@@ -2802,15 +3139,14 @@ document.addEventListener('DOMContentLoaded', () => {
             try {
                 const [projectResp, tasksResp] = await Promise.all([
                     fetch(`/projects/${projectId}`),
-                    fetch('/tasks') // Obtener todas las tareas y luego filtrar
+                    fetch(`/tasks?project_id=${encodeURIComponent(projectId)}`) // El servidor filtra por proyecto
                 ]);
 
                 if (!projectResp.ok) throw new Error('No se pudo cargar el proyecto.');
                 project = await projectResp.json();
 
                 if (tasksResp.ok) {
-                    const allUserTasks = await tasksResp.json();
-                    tasks = allUserTasks.filter(t => String(t.project_id) === String(projectId));
+                    tasks = await tasksResp.json();
                 }
 
             } catch (e) {
@@ -2978,10 +3314,12 @@ document.addEventListener('DOMContentLoaded', () => {
                             method: 'DELETE'
                         });
 
+                        const result = await response.json();
                         if (!response.ok) {
-                            const errorData = await response.json();
-                            throw new Error(errorData.error || 'Error al eliminar el proyecto');
+                            throw new Error(result.error || 'Error al eliminar el proyecto');
                         }
+                        // El borrado se hace en segundo plano por bloques
+                        if (result.job_id) await waitForJob(result.job_id);
 
                         // Si tiene éxito, recargar la lista de proyectos para reflejar el cambio
                         await loadAndRenderProjects();
@@ -3530,16 +3868,40 @@ document.addEventListener('DOMContentLoaded', () => {
             handleSearchInput(searchTerm);
         });
 
-        // También permitir búsqueda al presionar Enter
-        globalSearchInput.addEventListener('keypress', (event) => {
-            if (event.key === 'Enter') {
+        // Flechas para recorrer las sugerencias, Enter para abrir la activa o buscar, Escape para cerrarlas
+        globalSearchInput.addEventListener('keydown', (event) => {
+            if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
                 event.preventDefault();
+                moveSearchSuggestion(event.key === 'ArrowDown' ? 1 : -1);
+            } else if (event.key === 'Escape') {
+                hideSearchSuggestions();
+            } else if (event.key === 'Enter') {
+                event.preventDefault();
+                if (searchTimeout) {
+                    clearTimeout(searchTimeout);
+                }
+                const activeSuggestion = document.querySelector('#searchSuggestions .search-suggestion.active');
                 const searchTerm = event.target.value.trim();
-                if (searchTerm.length >= 2) {
-                    handleSearchInput(searchTerm);
+                if (activeSuggestion) {
+                    selectSearchSuggestion(activeSuggestion);
+                } else if (searchTerm.length >= 2) {
+                    runGlobalSearch(searchTerm);
                 }
             }
         });
+
+        const searchSuggestions = document.getElementById('searchSuggestions');
+        if (searchSuggestions) {
+            // mousedown en lugar de click: se dispara antes de que el campo pierda el foco
+            searchSuggestions.addEventListener('mousedown', (event) => {
+                const item = event.target.closest('.search-suggestion');
+                if (item) {
+                    event.preventDefault();
+                    selectSearchSuggestion(item);
+                }
+            });
+        }
+        globalSearchInput.addEventListener('blur', hideSearchSuggestions);
     }
     if (collaboratorRoleFilter) {
         collaboratorRoleFilter.addEventListener('change', applyCollaboratorFilters);
@@ -4391,15 +4753,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- INICIALIZACIÓN DE LA APLICACIÓN ---
     // Estas llamadas deben ir al final de DOMContentLoaded para asegurar que todos los elementos y funciones estén disponibles.
-    loadAndRenderTasks();
-    loadAndRenderProjects();
-    populateDropdowns(); // Carga los datos para los selectores de los formularios
+    loadDashboard(); // Tareas, proyectos, selectores, notas importantes, actividad, analíticas y colaboradores en una sola petición
     loadFocusStats(); // Cargar estadísticas de enfoque al iniciar
-    loadAndRenderNotes(); // Cargar notas importantes en el dashboard
-    loadRecentActivity();
     loadAllNotes(); // Cargar todas las notas para la sección de notas
     loadAllResources(); // Cargar todos los recursos para la sección de recursos
-    populateFocusTaskSelect(); // Cargar tareas para el selector de modo enfoque
+    if (document.getElementById('task-list')) subscribeToChanges(); // Cambios en vivo en lugar de recargar
     // Inicializar con la tarea seleccionada (si hay una por defecto)
     if (taskToFocusSelect && taskToFocusSelect.value) {
         currentFocusTaskId = taskToFocusSelect.value;
@@ -0,0 +1,107 @@
+"""
+Pruebas del pool de conexiones (ConnectionPool) con conexiones simuladas: no necesitan MySQL.
+"""
+import pytest
+
+import app as taskmanager
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.rolled_back = False
+        self.ping_error = None
+        self.unread_result = False
+        self.in_transaction = False
+
+    def ping(self, reconnect=False):
+        if self.ping_error:
+            raise self.ping_error
+
+    def rollback(self):
+        self.rolled_back = True
+        self.in_transaction = False
+
+    def consume_results(self):
+        self.unread_result = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def factory():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return taskmanager.ConnectionPool(factory, **kwargs), created
+
+
+def test_released_connection_is_reused():
+    pool, created = make_pool(size=2, max_overflow=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    stats = pool.stats()
+    assert stats['checkouts'] == 2
+    assert stats['connections_created'] == 1
+    assert stats['in_use'] == 1 and stats['open'] == 1
+    assert len(created) == 1
+
+
+def test_release_rolls_back_open_transaction():
+    pool, _ = make_pool(size=1, max_overflow=0)
+    conn = pool.acquire()
+    conn.in_transaction = True
+    conn.unread_result = True
+    pool.release(conn)
+    assert conn.rolled_back
+    assert not conn.unread_result
+    assert pool.stats()['idle'] == 1
+
+
+def test_overflow_connection_is_closed_on_release():
+    pool, _ = make_pool(size=1, max_overflow=1)
+    first, second = pool.acquire(), pool.acquire()
+    assert pool.stats()['peak_in_use'] == 2
+    pool.release(first)
+    pool.release(second)
+    assert second.closed and not first.closed
+    stats = pool.stats()
+    assert stats['idle'] == 1 and stats['open'] == 1
+
+
+def test_acquire_times_out_when_pool_is_exhausted():
+    pool, _ = make_pool(size=1, max_overflow=0, timeout=0.05)
+    pool.acquire()
+    with pytest.raises(taskmanager.PoolTimeoutError):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['in_use'] == 1
+
+
+def test_failed_ping_replaces_connection():
+    pool, created = make_pool(size=1, max_overflow=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.ping_error = OSError('conexión perdida')
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert conn.closed
+    assert len(created) == 2
+    assert pool.stats()['ping_failures'] == 1
+
+
+def test_factory_error_frees_the_slot():
+    def factory():
+        raise OSError('sin servidor')
+
+    pool = taskmanager.ConnectionPool(factory, size=1, max_overflow=0, timeout=0.05)
+    with pytest.raises(OSError):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats['open'] == 0 and stats['in_use'] == 0
@@ -0,0 +1,89 @@
+"""
+Pruebas de utilidades sin base de datos: cursores de paginación de tareas, normalización de SQL
+para el rastreo y el proveedor JSON de la aplicación.
+"""
+import decimal
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app as taskmanager
+
+
+def test_task_cursor_round_trip():
+    token = taskmanager._encode_task_cursor({'due_date': date(2026, 10, 18), 'task_id': 42})
+    assert '=' not in token
+    assert taskmanager._decode_task_cursor(token) == (date(2026, 10, 18), 42)
+
+
+@pytest.mark.parametrize('token', ['', 'no-es-un-cursor', 'MjAyNi0xMC0xOA', 'MjAyNi0xMy0wMXw0Mg'])
+def test_task_cursor_rejects_invalid_tokens(token):
+    with pytest.raises(ValueError):
+        taskmanager._decode_task_cursor(token)
+
+
+def test_normalize_sql_removes_literals():
+    assert taskmanager.normalize_sql(
+        "SELECT *  FROM tasks\n WHERE title = 'a''b' AND task_id = 12 AND status = %s;"
+    ) == 'SELECT * FROM tasks WHERE title = ? AND task_id = ? AND status = ?'
+
+
+def test_normalize_sql_collapses_in_lists():
+    short = taskmanager.normalize_sql('SELECT * FROM tasks WHERE task_id IN (%s, %s)')
+    long = taskmanager.normalize_sql('SELECT * FROM tasks WHERE task_id IN (1, 2, 3, 4)')
+    assert short == long == 'SELECT * FROM tasks WHERE task_id IN (...)'
+
+
+def test_normalize_sql_keeps_identifiers_with_digits():
+    assert taskmanager.normalize_sql('SELECT t1.task_id FROM tasks t1 LIMIT %(limit)s') == \
+        'SELECT t1.task_id FROM tasks t1 LIMIT ?'
+
+
+ROW = {
+    'created_at': datetime(2026, 10, 18, 9, 5, 3),
+    'due_date': date(2026, 10, 20),
+    'hours': decimal.Decimal('1.50'),
+    'elapsed': timedelta(hours=1, minutes=2),
+    'title': 'Canción',
+    'tags': [1, None, True],
+}
+
+
+@pytest.mark.parametrize('backend', [
+    'json',
+    pytest.param('orjson', marks=pytest.mark.skipif(taskmanager.orjson is None, reason='orjson no está instalado')),
+])
+def test_json_provider_matches_flask_format(backend):
+    provider = taskmanager.FastJSONProvider(taskmanager.app, backend=backend)
+    assert provider.use_orjson == (backend == 'orjson')
+    # Mismo formato que el proveedor por defecto de Flask, que además no sabe serializar timedelta
+    assert provider.loads(provider.dumps(ROW)) == {
+        'created_at': 'Sun, 18 Oct 2026 09:05:03 GMT',
+        'due_date': 'Tue, 20 Oct 2026 00:00:00 GMT',
+        'hours': '1.50',
+        'elapsed': '1:02:00',
+        'title': 'Canción',
+        'tags': [1, None, True],
+    }
+
+
+@pytest.mark.parametrize('backend', [
+    'json',
+    pytest.param('orjson', marks=pytest.mark.skipif(taskmanager.orjson is None, reason='orjson no está instalado')),
+])
+def test_json_provider_response(backend):
+    provider = taskmanager.FastJSONProvider(taskmanager.app, backend=backend)
+    with taskmanager.app.app_context():
+        response = provider.response({'hours': decimal.Decimal('2.5')})
+    assert response.mimetype == 'application/json'
+    assert provider.loads(response.get_data()) == {'hours': '2.5'}
+
+
+def test_metrics_render_failure_counters():
+    registry = taskmanager.MetricsRegistry()
+    registry.record_failure('search_index_sync')
+    registry.record_failure('search_index_sync')
+    registry.record_failure('event_bus_poll')
+    rendered = registry.render()
+    assert 'taskmanager_failures_total{component="event_bus_poll"} 1' in rendered
+    assert 'taskmanager_failures_total{component="search_index_sync"} 2' in rendered
@@ -0,0 +1,37 @@
+"""
+Revisión de los planes de consulta de las rutas principales (la misma que `flask check-query-plans`).
+
+Necesita la base de datos MySQL configurada en app.py, migrada y sembrada, por ejemplo:
+
+    flask --app app migrate
+    flask --app app seed --truncate --seed 42
+    python -m pytest tests/test_query_plans.py
+
+Se omite si la base de datos no está accesible o no tiene tareas.
+"""
+import mysql.connector
+import pytest
+
+import app as taskmanager
+
+
+@pytest.fixture(scope='module')
+def seeded_user_id():
+    try:
+        user_id = taskmanager._busiest_assignee()
+    except mysql.connector.Error as err:
+        pytest.skip(f'Base de datos no disponible: {err}')
+    if user_id is None:
+        pytest.skip('La base de datos no tiene tareas; siémbrela con `flask --app app seed`.')
+    return user_id
+
+
+def test_query_plans_use_indexes(seeded_user_id):
+    checked, violations = taskmanager._check_query_plans(seeded_user_id)
+    assert checked > 0
+    assert violations == []
+
+
+def test_query_plan_check_does_not_start_search_index(seeded_user_id):
+    taskmanager._check_query_plans(seeded_user_id)
+    assert not taskmanager.search_index._rebuilding
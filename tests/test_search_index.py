@@ -0,0 +1,165 @@
+"""
+Pruebas de los índices de búsqueda en memoria (InvertedIndex, SuggestionIndex) y de sus utilidades
+(_edit_distance, _search_snippet, cursores de búsqueda). No necesitan MySQL.
+"""
+from datetime import datetime
+
+import pytest
+
+import app as taskmanager
+
+
+def test_edit_distance():
+    assert taskmanager._edit_distance('informe', 'informe', 2) == 0
+    assert taskmanager._edit_distance('informe', 'imforme', 2) == 1
+    assert taskmanager._edit_distance('informe', 'infrome', 2) == 2
+    assert taskmanager._edit_distance('', 'abc', 3) == 3
+
+
+def test_edit_distance_stops_past_limit():
+    assert taskmanager._edit_distance('informe', 'presupuesto', 1) == 2
+    assert taskmanager._edit_distance('abc', 'abcdef', 1) == 2
+
+
+@pytest.fixture
+def index():
+    index = taskmanager.InvertedIndex()
+    index.upsert(1, [('Revisar informe', 2), ('Cifras del trimestre', 1)], None, datetime(2026, 1, 1))
+    index.upsert(2, [('Reunión', 2), ('Preparar el informe anual', 1)], None, datetime(2026, 3, 1))
+    index.upsert(3, [('Informe privado', 2)], (7,), datetime(2026, 2, 1))
+    return index
+
+
+def test_inverted_index_ranks_title_matches_first(index):
+    hits, total, matched = index.search(['informe'], None, 10)
+    assert [doc_id for _, _, doc_id in hits] == [1, 2]
+    assert total == 2
+    assert matched == {'informe'}
+
+
+def test_inverted_index_respects_owner_scope(index):
+    hits, _, _ = index.search(['informe'], 7, 10)
+    # Misma puntuación para 1 y 3: desempata la recencia
+    assert [doc_id for _, _, doc_id in hits] == [3, 1, 2]
+    assert index.search(['privado'], 8, 10)[1] == 0
+
+
+def test_inverted_index_matches_prefixes_and_typos(index):
+    assert [hit[2] for hit in index.search(['trimes'], None, 10)[0]] == [1]
+    hits, _, matched = index.search(['imforme'], None, 10)
+    assert [hit[2] for hit in hits] == [1, 2]
+    assert matched == {'informe'}
+
+
+def test_inverted_index_requires_every_term(index):
+    hits, total, _ = index.search(['informe', 'anual'], None, 10)
+    assert [hit[2] for hit in hits] == [2]
+    assert total == 1
+
+
+def test_inverted_index_pages_with_after(index):
+    first, total, _ = index.search(['informe'], 7, 2)
+    rest, _, _ = index.search(['informe'], 7, 2, after=first[-1])
+    assert total == 3
+    assert [hit[2] for hit in first + rest] == [3, 1, 2]
+
+
+def test_inverted_index_remove(index):
+    index.remove([1])
+    assert len(index) == 2
+    assert index.search(['trimestre'], None, 10) == ([], 0, set())
+    assert not index._vocabulary.get('trimestre')
+    assert [hit[2] for hit in index.search(['informe'], None, 10)[0]] == [2]
+
+
+def test_inverted_index_remove_owner(index):
+    index.upsert(4, [('Informe compartido', 2)], (7, 8), datetime(2026, 4, 1))
+    index.remove_owner(7)
+    assert 3 not in [hit[2] for hit in index.search(['informe'], 7, 10)[0]]
+    assert [hit[2] for hit in index.search(['compartido'], 8, 10)[0]] == [4]
+    assert len(index) == 3
+
+
+@pytest.fixture
+def suggestions():
+    suggestions = taskmanager.SuggestionIndex()
+    suggestions.upsert('tasks', 1, 'Revisar informe', ('Revisar informe',), (7,), datetime(2026, 1, 1))
+    suggestions.upsert('tasks', 2, 'Informe anual', ('Informe anual',), (7,), datetime(2025, 1, 1))
+    suggestions.upsert('projects', 3, 'Información pública', ('Información pública',), None, datetime(2026, 2, 1))
+    return suggestions
+
+
+def test_suggestions_rank_title_start_first(suggestions):
+    matches, complete = suggestions.candidates('inf', 7)
+    assert complete
+    # Primero las que empiezan por el prefijo (la más reciente antes); luego la que lo tiene en medio
+    assert suggestions.rank(matches, 10) == [
+        ('projects', 3, 'Información pública'),
+        ('tasks', 2, 'Informe anual'),
+        ('tasks', 1, 'Revisar informe'),
+    ]
+
+
+def test_suggestions_match_from_later_words(suggestions):
+    matches, _ = suggestions.candidates('revisar inf', 7)
+    assert suggestions.rank(matches, 10) == [('tasks', 1, 'Revisar informe')]
+
+
+def test_suggestions_respect_owner_scope(suggestions):
+    matches, _ = suggestions.candidates('inf', 8)
+    assert suggestions.rank(matches, 10) == [('projects', 3, 'Información pública')]
+
+
+def test_suggestions_remove_changes_generation(suggestions):
+    before = suggestions.generation(7)
+    suggestions.remove('tasks', [2])
+    assert suggestions.generation(7) != before
+    matches, _ = suggestions.candidates('inf', 7)
+    assert [doc_id for _, doc_id, _ in suggestions.rank(matches, 10)] == [3, 1]
+
+
+def test_suggestions_bulk_load(suggestions):
+    fresh = taskmanager.SuggestionIndex()
+    fresh.begin_load()
+    fresh.upsert('tasks', 1, 'Revisar informe', ('Revisar informe',), (7,), datetime(2026, 1, 1))
+    assert fresh.candidates('rev', 7) == ([], True)
+    fresh.end_load()
+    assert fresh.candidates('rev', 7)[0] == [('revisar informe', 'tasks', 1, True)]
+    assert fresh.generation(7)[0] != suggestions.generation(7)[0]
+
+
+def test_search_snippet_escapes_html():
+    snippet = taskmanager._search_snippet('Canción <script>alert(1)</script> & más', ['cancion', 'mas'])
+    assert snippet == '<mark>Canción</mark> &lt;script&gt;alert(1)&lt;/script&gt; &amp; <mark>más</mark>'
+
+
+def test_search_snippet_trims_long_text():
+    text = 'a ' * 200 + 'informe' + ' b' * 200
+    snippet = taskmanager._search_snippet(text, ['informe'])
+    assert snippet.startswith('…') and snippet.endswith('…')
+    assert '<mark>informe</mark>' in snippet
+    assert taskmanager._search_snippet(None, ['informe']) is None
+
+
+def test_search_cursor_round_trip():
+    positions = {'tasks': ['index', 1.6, 1767225600.0, 12], 'notes': ['mysql', 0.5, 3]}
+    token = taskmanager._encode_search_cursor(positions)
+    assert '=' not in token
+    assert taskmanager._decode_search_cursor(token) == positions
+
+
+@pytest.mark.parametrize('positions', [
+    {},
+    {'unknown': ['index', 1, 2, 3]},
+    {'tasks': ['index', 1, 2]},
+    {'tasks': ['mysql', 'a', 2]},
+    {'tasks': ['mysql', True, 2]},
+])
+def test_search_cursor_rejects_invalid_positions(positions):
+    with pytest.raises(ValueError):
+        taskmanager._decode_search_cursor(taskmanager._encode_search_cursor(positions))
+
+
+def test_search_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        taskmanager._decode_search_cursor('no-es-un-cursor')